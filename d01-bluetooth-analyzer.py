@@ -10,6 +10,8 @@ import struct
 import threading
 from collections import defaultdict
 
+from d01_sequence_miner import SequenceMiner, print_candidates
+
 # D01 Pro Bluetooth HID identifiers
 VENDOR_ID = 0x05AC
 PRODUCT_ID = 0x022C
@@ -219,6 +221,12 @@ class BluetoothHIDAnalyzer:
             
         for pattern, actions in button_patterns.items():
             print(f"  Pattern {pattern}: {actions}")
+        
+        # Recurring press and gesture signatures, with their hold/gap timing
+        miner = SequenceMiner()
+        for report in self.raw_reports:
+            miner.add_record(report)
+        print_candidates(miner.candidates(), miner)
 
 if __name__ == "__main__":
     print("🔬 D01 Bluetooth HID Protocol Analyzer")
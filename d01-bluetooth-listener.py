@@ -4,44 +4,74 @@ D01 Bluetooth HID Listener
 Captures raw Bluetooth HID signals from the D01 ring
 """
 
-import subprocess
 import threading
 import time
 import re
 import json
 import os
+import sys
 from collections import defaultdict
 
+from d01_bluetooth_inventory import get_inventory
+from d01_correlation import UNKNOWN, PressCorrelator, edge_kind, format_event as format_correlated_event
+from d01_devices import load_device_profiles
+from d01_log_supervisor import LogStreamSupervisor
+from d01_predicates import build_predicate, mapped_event_types
+from d01_scheduler import TimerScheduler
+from d01_shutdown import ShutdownCoordinator
+from d01_snapshots import SnapshotPoller, hidutil_source, ioreg_source, print_events
+
 class BluetoothHIDListener:
-    def __init__(self):
-        self.device_address = "58:5E:42:B3:2C:66"
+    def __init__(self, device_addresses=None, narrow=False):
+        self.config = self.load_config()
+        # Discovery wants everything HID-ish; --narrow keeps only what the config maps
+        self.narrow = narrow
+        if device_addresses is None:
+            device_addresses = [profile['address'] for profile in load_device_profiles(self.config)]
+        self.device_addresses = [address.upper() for address in device_addresses]
+        self.device_address = self.device_addresses[0]
         self.device_name = "D01 Pro"
         self.running = False
         self.raw_packets = []
         self.button_patterns = defaultdict(int)
         self.last_packet = None
         self.packet_count = 0
+        self.snapshot_pollers = []
+        self.log_supervisors = []
+        self.correlator = None  # Joins sightings across sources in 'all' mode
+        self.shutdown = None
         
+    def load_config(self):
+        """Load the shared D01 config (devices and which buttons/gestures are mapped)"""
+        config_file = os.path.expanduser("~/.d01-config.json")
+        try:
+            if os.path.exists(config_file):
+                with open(config_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {e}")
+        return {}
+    
     def check_bluetooth_connection(self):
         """Check if D01 ring is connected"""
         try:
-            result = subprocess.run([
-                'system_profiler', 'SPBluetoothDataType'
-            ], capture_output=True, text=True)
+            # Cached inventory; only the very first run waits for a scan
+            devices = get_inventory().devices(wait_if_empty=True)
             
-            # Check if device is listed (even if not explicitly "Connected: Yes")
-            if self.device_address in result.stdout and "D01 Pro" in result.stdout:
+            # Check if any ring is listed (even if not explicitly "Connected: Yes")
+            found = [address for address in self.device_addresses if address in devices]
+            if found:
                 print(f"✅ {self.device_name} found in Bluetooth devices")
-                print(f"   Address: {self.device_address}")
+                for address in found:
+                    state = "connected" if devices[address]['connected'] else "paired"
+                    print(f"   Address: {address} ({state})")
                 return True
             else:
                 print(f"❌ {self.device_name} not found in Bluetooth devices")
                 print("Available Bluetooth devices:")
                 # Show available devices for debugging
-                lines = result.stdout.split('\n')
-                for line in lines:
-                    if 'Address:' in line and '58:5E:42' not in line:
-                        print(f"   {line.strip()}")
+                for address, device in devices.items():
+                    print(f"   {device['name']}: {address}")
                 return False
                 
         except Exception as e:
@@ -59,48 +89,57 @@ class BluetoothHIDListener:
     
     def monitor_system_log(self):
         """Monitor macOS system log for HID events"""
+        supervisor = LogStreamSupervisor(
+            self.log_predicate(),
+            name='system log',
+            keywords=self.relevant_keywords()
+        )
+        supervisor.subscribe(self.handle_log_line)
+        self.log_supervisors.append(supervisor)
+        
+        self.running = True
+        supervisor.start()
+        
         try:
-            # Monitor system log for Bluetooth HID events
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem CONTAINS "bluetooth" OR subsystem CONTAINS "hid" OR '
-                'eventMessage CONTAINS "HID" OR eventMessage CONTAINS "58:5E:42:B3:2C:66"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            
-            self.running = True
-            
-            for line in process.stdout:
-                if not self.running:
-                    break
-                    
-                line = line.strip()
-                if line and self.is_relevant_hid_event(line):
-                    self.process_hid_event(line)
-                    
+            # The supervisor restarts `log stream` if it exits or stalls
+            supervisor.run_until(lambda: self.running, wakeup=self.shutdown.event if self.shutdown else None)
         except KeyboardInterrupt:
             print("\n🛑 Stopping packet capture...")
             self.running = False
-            process.terminate()
-            
-        except Exception as e:
-            print(f"Error monitoring system log: {e}")
-            self.running = False
+        print(f"📊 {supervisor.summary()}")
+    
+    def log_predicate(self):
+        """Wide Bluetooth/HID net for discovery, or only the mapped event types with narrow"""
+        if self.narrow:
+            return build_predicate('scan', device_match=self.device_addresses,
+                                   event_types=mapped_event_types(self.config))
+        # Monitor system log for Bluetooth HID events from every configured ring
+        address_terms = ''.join(f' OR eventMessage CONTAINS "{address}"' for address in self.device_addresses)
+        return ('subsystem CONTAINS "bluetooth" OR subsystem CONTAINS "hid" OR '
+                'eventMessage CONTAINS "HID"' + address_terms)
+    
+    def handle_log_line(self, line):
+        """Log stream subscriber: keep only HID-relevant lines"""
+        if self.is_relevant_hid_event(line):
+            self.process_hid_event(line)
+    
+    def relevant_keywords(self):
+        """Lowercase substrings that mark a log line as HID-relevant"""
+        return [
+            'hid', 'bluetooth', 'key', 'button', 'input', 'd01', 'keyboard'
+        ] + [address.lower() for address in self.device_addresses]
     
     def is_relevant_hid_event(self, line):
         """Check if log line contains relevant HID events"""
-        keywords = [
-            'hid', 'bluetooth', 'key', 'button', 'input',
-            self.device_address.lower(), 'd01', 'keyboard'
-        ]
-        
         line_lower = line.lower()
-        return any(keyword in line_lower for keyword in keywords)
+        return any(keyword in line_lower for keyword in self.relevant_keywords())
     
     def process_hid_event(self, line):
         """Process a HID event line from system log"""
         timestamp = time.strftime('%H:%M:%S')
         self.packet_count += 1
+        if self.correlator:
+            self.correlator.observe('log', edge_kind(line))
         
         print(f"[{timestamp}] Packet #{self.packet_count}")
         print(f"  Raw: {line}")
@@ -157,86 +196,34 @@ class BluetoothHIDListener:
     def monitor_hidutil_events(self):
         """Alternative method: Monitor hidutil for events"""
         print("🔍 Monitoring HID device events...")
-        
-        try:
-            # Get initial HID device list
-            result = subprocess.run(['hidutil', 'list'], capture_output=True, text=True)
-            initial_devices = set(result.stdout.split('\n'))
-            
-            while self.running:
-                # Check for changes in HID devices
-                result = subprocess.run(['hidutil', 'list'], capture_output=True, text=True)
-                current_devices = set(result.stdout.split('\n'))
-                
-                new_devices = current_devices - initial_devices
-                removed_devices = initial_devices - current_devices
-                
-                if new_devices:
-                    print("🔌 New HID device events:")
-                    for device in new_devices:
-                        if device.strip():
-                            print(f"  + {device}")
-                
-                if removed_devices:
-                    print("🔌 Removed HID device events:")
-                    for device in removed_devices:
-                        if device.strip():
-                            print(f"  - {device}")
-                
-                initial_devices = current_devices
-                time.sleep(0.5)
-                
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping HID monitoring...")
-            self.running = False
+        self.run_snapshot_poller(hidutil_source())
     
     def monitor_ioreg_changes(self):
         """Monitor IORegistry for changes"""
         print("🔍 Monitoring IORegistry for Bluetooth changes...")
+        self.run_snapshot_poller(ioreg_source('IOBluetoothHIDDriver'))
+    
+    def run_snapshot_poller(self, source):
+        """Poll a parsed snapshot source, printing semantic changes and backing off while idle"""
+        def on_events(source_name, events):
+            print_events(source_name, events)
+            if self.correlator:
+                # A poll only says the change happened since the previous one, not which edge
+                self.correlator.observe(source_name, UNKNOWN, uncertainty=poller.interval)
+        
+        poller = SnapshotPoller(source, on_events)
+        self.snapshot_pollers.append(poller)
         
         try:
-            # Initial state
-            result = subprocess.run([
-                'ioreg', '-n', 'IOBluetoothHIDDriver', '-r'
-            ], capture_output=True, text=True)
-            initial_state = result.stdout
-            
-            while self.running:
-                # Check current state
-                result = subprocess.run([
-                    'ioreg', '-n', 'IOBluetoothHIDDriver', '-r'
-                ], capture_output=True, text=True)
-                current_state = result.stdout
-                
-                if current_state != initial_state:
-                    print("🔄 IORegistry change detected!")
-                    # Find differences
-                    initial_lines = set(initial_state.split('\n'))
-                    current_lines = set(current_state.split('\n'))
-                    
-                    new_lines = current_lines - initial_lines
-                    removed_lines = initial_lines - current_lines
-                    
-                    if new_lines:
-                        print("➕ New entries:")
-                        for line in new_lines:
-                            if line.strip():
-                                print(f"  {line}")
-                    
-                    if removed_lines:
-                        print("➖ Removed entries:")
-                        for line in removed_lines:
-                            if line.strip():
-                                print(f"  {line}")
-                    
-                    initial_state = current_state
-                    print("-" * 60)
-                
-                time.sleep(1)
-                
+            poller.run(lambda: self.running)
         except KeyboardInterrupt:
-            print("\n🛑 Stopping IORegistry monitoring...")
+            print(f"\n🛑 Stopping {source.name} monitoring...")
             self.running = False
+        finally:
+            poller.stop()
+            stats = poller.stats
+            print(f"📊 {source.name}: {stats['polls']} polls, {stats['unchanged_output']} identical, "
+                  f"{stats['unchanged_tree']} volatile-only, {stats['events']} change events")
     
     def analyze_captured_data(self):
         """Analyze all captured packet data"""
@@ -290,6 +277,7 @@ class BluetoothHIDListener:
         data = {
             'device_info': {
                 'address': self.device_address,
+                'addresses': self.device_addresses,
                 'name': self.device_name
             },
             'capture_session': {
@@ -316,49 +304,75 @@ class BluetoothHIDListener:
             return False
         
         print(f"🚀 Starting Bluetooth HID listener (method: {method})")
+        self.running = True
         
-        try:
-            if method == 'log':
-                self.start_packet_capture()
-            elif method == 'hidutil':
-                self.monitor_hidutil_events()
-            elif method == 'ioreg':
-                self.monitor_ioreg_changes()
-            elif method == 'all':
-                # Start all methods in separate threads
-                threads = [
-                    threading.Thread(target=self.start_packet_capture),
-                    threading.Thread(target=self.monitor_hidutil_events),
-                    threading.Thread(target=self.monitor_ioreg_changes)
-                ]
-                
-                for thread in threads:
-                    thread.daemon = True
-                    thread.start()
-                
-                # Wait for keyboard interrupt
-                try:
-                    while self.running:
-                        time.sleep(1)
-                except KeyboardInterrupt:
-                    print("\n🛑 Stopping all monitoring threads...")
-                    self.running = False
-                    
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping Bluetooth HID listener...")
-            self.running = False
-        
-        finally:
-            if self.raw_packets:
-                self.analyze_captured_data()
+        sources = {
+            'log': [self.start_packet_capture],
+            'hidutil': [self.monitor_hidutil_events],
+            'ioreg': [self.monitor_ioreg_changes],
+            'all': [self.start_packet_capture, self.monitor_hidutil_events, self.monitor_ioreg_changes],
+        }[method]
         
+        # Sources block on their own threads (log stream supervisor, snapshot pollers);
+        # every method stops the same way: signal → stop sources → join → flush → stats
+        with ShutdownCoordinator('Bluetooth HID listener') as shutdown:
+            self.shutdown = shutdown
+            shutdown.on_stop(self.stop, 'sources')
+            
+            if method == 'all':
+                # One physical press shows up in several sources; report it once.
+                # Join windows close on scheduler timers instead of a polling main thread
+                scheduler = TimerScheduler()
+                scheduler.start()
+                self.correlator = PressCorrelator(
+                    window=0.1, mode='trailing',
+                    on_event=lambda event: print(format_correlated_event(event)),
+                    scheduler=scheduler
+                )
+                shutdown.on_flush(lambda: self.correlator.flush(now=float('inf')), 'correlator')
+                shutdown.on_stats(lambda: print(f"📊 Correlation: {self.correlator.summary()}"), 'correlation')
+                shutdown.on_stats(scheduler.stop, 'scheduler')
+            shutdown.on_flush(self.save_captured_data, 'capture data')
+            
+            remaining = [len(sources)]
+            lock = threading.Lock()
+            
+            def run_source(target):
+                try:
+                    target()
+                finally:
+                    with lock:
+                        remaining[0] -= 1
+                        if not remaining[0]:
+                            shutdown.request('sources ended')
+            
+            for target in sources:
+                thread = shutdown.add_thread(threading.Thread(target=run_source, args=(target,)))
+                thread.daemon = True
+                thread.start()
+            
+            shutdown.wait()
         return True
+    
+    def stop(self):
+        """Stop every source (shutdown step)"""
+        print("\n🛑 Stopping Bluetooth HID listener...")
+        self.running = False
+        for poller in self.snapshot_pollers:
+            poller.stop()
+        for supervisor in self.log_supervisors:
+            supervisor.stop()
+    
+    def save_captured_data(self):
+        if self.raw_packets:
+            self.analyze_captured_data()
 
 def main():
     print("🔬 D01 Bluetooth HID Listener")
     print("=" * 50)
     
-    listener = BluetoothHIDListener()
+    # --narrow: only the event types the config maps (default: the wide discovery net)
+    listener = BluetoothHIDListener(narrow='--narrow' in sys.argv)
     
     # Default to system log monitoring
     method = 'log'
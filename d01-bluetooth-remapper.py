@@ -10,11 +10,16 @@ import subprocess
 import threading
 from collections import defaultdict
 
+from d01_devices import DevicePipeline, PRESS, load_device_profiles
+from d01_log_supervisor import LogStreamSupervisor
+from d01_shutdown import ShutdownCoordinator
+
 class BluetoothRemapper:
     def __init__(self):
         self.config_file = os.path.expanduser("~/.d01-config.json")
         self.config = self.load_config()
         self.running = False
+        self.shutdown = None
         self.button_states = {}
         self.press_times = {}
         
@@ -182,21 +187,24 @@ class BluetoothRemapper:
             pass  # Notifications not critical
     
     def monitor_system_events(self):
-        """Monitor system events for D01 input"""
+        """Monitor the system log for D01 button events"""
         print("🔍 Monitoring system events for D01 ring input...")
-        print("This is a placeholder - actual Bluetooth HID monitoring would be implemented here")
+        pipeline = DevicePipeline(load_device_profiles(self.config)[0])
+        supervisor = LogStreamSupervisor(pipeline.predicate(), name='remapper')
         
-        # Placeholder for actual event monitoring
-        # In reality, this would capture HID reports from the D01 ring
+        def on_event(event):
+            if event['type'] != 'button_event':
+                return
+            result = pipeline.process_transition(event['old_state'], event['new_state'], time.time())
+            if result and result != PRESS:
+                button_type, _, duration = result
+                print(f"🔘 {button_type} ({duration * 1000:.0f}ms)")
+                self.handle_button_press(button_type)
         
-        try:
-            while self.running:
-                # Simulate button presses for testing
-                time.sleep(1)
-                
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping event monitoring...")
-            self.running = False
+        supervisor.subscribe_events(on_event)
+        supervisor.start()
+        # Ends (and terminates `log stream`) as soon as the coordinator is asked to stop
+        supervisor.run_until(lambda: self.running, wakeup=self.shutdown.event)
     
     def handle_button_press(self, button_type):
         """Handle button press based on configuration"""
@@ -224,18 +232,23 @@ class BluetoothRemapper:
         
         self.running = True
         
-        # Start monitoring in a separate thread
-        monitor_thread = threading.Thread(target=self.monitor_system_events)
-        monitor_thread.daemon = True
-        monitor_thread.start()
-        
-        # Keep main thread alive
-        try:
-            while self.running:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping D01 Bluetooth Remapper...")
-            self.running = False
+        # Ctrl+C/SIGTERM wake the main thread at once instead of on the next 1s tick
+        with ShutdownCoordinator('D01 Bluetooth Remapper') as shutdown:
+            self.shutdown = shutdown
+            shutdown.on_stop(self.stop, 'remapper')
+            
+            # Start monitoring in a separate thread
+            monitor_thread = threading.Thread(target=self.monitor_system_events)
+            monitor_thread.daemon = True
+            shutdown.add_thread(monitor_thread)
+            monitor_thread.start()
+            
+            shutdown.wait()
+    
+    def stop(self):
+        """Shutdown stop phase"""
+        print("\n🛑 Stopping D01 Bluetooth Remapper...")
+        self.running = False
 
 def main():
     print("🔬 D01 Bluetooth Remapper")
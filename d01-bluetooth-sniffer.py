@@ -7,7 +7,8 @@ Uses macOS Bluetooth tools to capture low-level packets
 import subprocess
 import time
 import re
-import json
+
+from d01_bluetooth_inventory import get_inventory
 
 class BluetoothSniffer:
     def __init__(self):
@@ -33,14 +34,10 @@ class BluetoothSniffer:
     def get_bluetooth_info(self):
         """Get Bluetooth device information"""
         try:
-            # Get Bluetooth device info
-            result = subprocess.run([
-                'system_profiler', 'SPBluetoothDataType', '-json'
-            ], capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                return data
+            # Served from the cached inventory, refreshed in the background when stale
+            inventory = get_inventory()
+            inventory.devices(wait_if_empty=True)
+            return inventory.raw
             
         except Exception as e:
             print(f"Error getting Bluetooth info: {e}")
@@ -116,14 +113,10 @@ def main():
     available_tools = sniffer.check_bluetooth_tools()
     
     # Get device info
-    bt_info = sniffer.get_bluetooth_info()
-    if bt_info:
+    if sniffer.get_bluetooth_info():
         print("\n📱 Bluetooth Device Info:")
-        # Extract D01 info from JSON if present
-        for device_type in bt_info.get('SPBluetoothDataType', []):
-            for key, value in device_type.items():
-                if isinstance(value, dict) and 'D01' in str(value):
-                    print(f"  {key}: {value}")
+        for device in get_inventory().find('D01'):
+            print(f"  {device['name']}: {device['properties']}")
     
     print("\nChoose analysis method:")
     print("1. Monitor HID events (log stream)")
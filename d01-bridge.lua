@@ -0,0 +1,178 @@
+-- D01 Hammerspoon Bridge
+-- Long-lived link to the Python pipeline (d01_hammerspoon_bridge.py):
+-- streams media keys and the key codes Python asks for as JSON lines and
+-- performs keystroke actions sent back over the same socket.
+-- The link is a Unix socket only this user can reach (~/.d01/bridge.sock);
+-- nothing but the handshake flows until Python has proven it knows the
+-- session token in ~/.d01/bridge.token, and Python checks ours the same way.
+-- Load once from ~/.hammerspoon/init.lua:  dofile("/path/to/d01-bridge.lua")
+
+local D01Bridge = {}
+
+D01Bridge.socketPath = _G.d01BridgeSocketPath or (os.getenv("HOME") .. "/.d01/bridge.sock")
+D01Bridge.tokenPath = D01Bridge.socketPath:gsub("%.sock$", "") .. ".token"
+D01Bridge.reconnectInterval = 2
+D01Bridge.authenticated = false
+D01Bridge.watchKeys = {}  -- keyDown/keyUp codes to forward, sent by Python after the handshake
+
+-- Send one message as a JSON line (only over an authenticated link)
+function D01Bridge.write(message)
+    if D01Bridge.socket and D01Bridge.socket:connected() then
+        D01Bridge.socket:write(hs.json.encode(message) .. "\n")
+    end
+end
+
+function D01Bridge.send(message)
+    if D01Bridge.authenticated then
+        D01Bridge.write(message)
+    end
+end
+
+function D01Bridge.readToken()
+    local file = io.open(D01Bridge.tokenPath, "r")
+    if not file then
+        return nil
+    end
+    local token = file:read("l")
+    file:close()
+    return token
+end
+
+-- Stream input events (never consumed); every other keystroke stays here
+function D01Bridge.handleEvent(event)
+    if not (D01Bridge.authenticated and D01Bridge.socket and D01Bridge.socket:connected()) then
+        return false
+    end
+
+    local eventType = event:getType()
+    local now = hs.timer.secondsSinceEpoch()
+
+    if eventType == hs.eventtap.event.types.keyDown or eventType == hs.eventtap.event.types.keyUp then
+        if not D01Bridge.watchKeys[event:getKeyCode()] then
+            return false
+        end
+        D01Bridge.send({
+            type = "key",
+            event = (eventType == hs.eventtap.event.types.keyDown) and "down" or "up",
+            code = event:getKeyCode(),
+            ts = now
+        })
+    elseif eventType == hs.eventtap.event.types.systemDefined then
+        local systemKey = event:systemKey()
+        if systemKey and systemKey.key then
+            D01Bridge.send({
+                type = "system_key",
+                key = systemKey.key,
+                down = systemKey.down and true or false,
+                ts = now
+            })
+        end
+    end
+
+    return false
+end
+
+-- The first message must be Python's welcome carrying the same session token
+function D01Bridge.handleWelcome(message)
+    if message.type ~= "welcome" or type(message.token) ~= "string" or message.token ~= D01Bridge.token then
+        print("⚠️  D01 bridge: peer did not present the session token, disconnecting")
+        D01Bridge.socket:disconnect()
+        return
+    end
+    D01Bridge.watchKeys = {}
+    for _, code in ipairs(message.keys or {}) do
+        D01Bridge.watchKeys[code] = true
+    end
+    D01Bridge.authenticated = true
+end
+
+-- Perform an action requested by Python and acknowledge it
+function D01Bridge.handleMessage(line)
+    local ok, message = pcall(hs.json.decode, line)
+    if not ok or type(message) ~= "table" then
+        return
+    end
+    if not D01Bridge.authenticated then
+        D01Bridge.handleWelcome(message)
+        return
+    end
+
+    local success = true
+    if message.type == "keystroke" then
+        hs.eventtap.keyStroke(message.mods or {}, message.key, 0)
+    elseif message.type == "key_code" then
+        hs.eventtap.event.newKeyEvent(message.mods or {}, message.code, true):post()
+        hs.eventtap.event.newKeyEvent(message.mods or {}, message.code, false):post()
+    elseif message.type == "alert" then
+        hs.alert.show(message.text or "", message.duration or 1)
+    elseif message.type == "ping" then
+        -- Acknowledged below
+    else
+        success = false
+    end
+
+    if message.id then
+        D01Bridge.send({type = "ack", id = message.id, ok = success, ts = hs.timer.secondsSinceEpoch()})
+    end
+end
+
+function D01Bridge.connect()
+    if D01Bridge.socket and D01Bridge.socket:connected() then
+        return
+    end
+
+    -- No token file means no Python bridge is running: try again later
+    D01Bridge.token = D01Bridge.readToken()
+    if not D01Bridge.token then
+        return
+    end
+
+    D01Bridge.authenticated = false
+    D01Bridge.socket = hs.socket.new(function(data)
+        D01Bridge.handleMessage(data)
+        if D01Bridge.socket and D01Bridge.socket:connected() then
+            D01Bridge.socket:read("\n")
+        end
+    end)
+    D01Bridge.socket:connect(D01Bridge.socketPath, function()
+        D01Bridge.write({type = "hello", version = 2, token = D01Bridge.token})
+        D01Bridge.socket:read("\n")
+    end)
+end
+
+function D01Bridge.start()
+    if D01Bridge.eventTap then
+        return
+    end
+
+    D01Bridge.eventTap = hs.eventtap.new({
+        hs.eventtap.event.types.keyDown,
+        hs.eventtap.event.types.keyUp,
+        hs.eventtap.event.types.systemDefined
+    }, D01Bridge.handleEvent)
+    D01Bridge.eventTap:start()
+
+    -- Keep (re)connecting so the Python side can come and go
+    D01Bridge.connect()
+    D01Bridge.timer = hs.timer.doEvery(D01Bridge.reconnectInterval, D01Bridge.connect)
+    print("🔗 D01 bridge listener started (" .. D01Bridge.socketPath .. ")")
+end
+
+function D01Bridge.stop()
+    if D01Bridge.timer then D01Bridge.timer:stop() end
+    if D01Bridge.eventTap then D01Bridge.eventTap:stop() end
+    if D01Bridge.socket then D01Bridge.socket:disconnect() end
+    D01Bridge.timer = nil
+    D01Bridge.eventTap = nil
+    D01Bridge.socket = nil
+    D01Bridge.authenticated = false
+end
+
+-- Reloading the file replaces any previous instance
+if _G.d01Bridge then
+    _G.d01Bridge.stop()
+end
+_G.d01Bridge = D01Bridge
+D01Bridge.start()
+
+return D01Bridge
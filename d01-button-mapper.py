@@ -6,6 +6,8 @@ D01 Button Mapper - Live button press detection and mapping
 import hid
 import time
 
+from d01_sequence_miner import SequenceMiner, print_candidates
+
 # D01 Pro identifiers
 VENDOR_ID = 0x05AC
 PRODUCT_ID = 0x022C
@@ -18,6 +20,8 @@ class D01ButtonMapper:
             # We'll discover these through testing
             'unknown_buttons': {}
         }
+        # Learns recurring press/gesture signatures while you test
+        self.miner = SequenceMiner()
         
     def connect(self):
         """Connect to D01 ring"""
@@ -99,6 +103,8 @@ class D01ButtonMapper:
                 data = self.device.read(64, timeout_ms=100)
                 
                 if data:
+                    self.miner.add_record({'timestamp': time.time(), 'raw_data': data})
+                    
                     # Check if this report is different from last
                     if data != self.last_report:
                         
@@ -135,6 +141,7 @@ class D01ButtonMapper:
                 self.device.close()
         
         print(f"\n📊 Session Summary: {button_count} button presses detected")
+        print_candidates(self.miner.candidates(), self.miner)
 
 if __name__ == "__main__":
     print("🔬 D01 Button Mapper")
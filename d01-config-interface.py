@@ -8,8 +8,50 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import json
 import os
+import sys
+import time
 from collections import defaultdict
 
+# Action catalog - per-category lists are materialised on first use
+ACTION_CATALOG = {
+    'Keyboard Shortcuts': (
+        'Cmd+C (Copy)', 'Cmd+V (Paste)', 'Cmd+Z (Undo)', 'Cmd+Y (Redo)',
+        'Cmd+A (Select All)', 'Cmd+S (Save)', 'Cmd+O (Open)', 'Cmd+N (New)',
+        'Cmd+W (Close)', 'Cmd+T (New Tab)', 'Cmd+Shift+T (Reopen Tab)',
+        'Cmd+L (Address Bar)', 'Cmd+R (Refresh)', 'Cmd+F (Find)',
+        'Cmd+Space (Spotlight)', 'Cmd+Tab (App Switch)', 'Cmd+` (Window Switch)',
+        'Space (Play/Pause)', 'Cmd+Up (Volume Up)', 'Cmd+Down (Volume Down)',
+        'F11 (Fullscreen)', 'Escape', 'Return (Enter)', 'Delete', 'Backspace'
+    ),
+    'WisprFlow Actions': (
+        'Start Recording', 'Stop Recording', 'Toggle Recording',
+        'Cancel Recording', 'Confirm Dictation', 'WisprFlow Control (Up Chevron)',
+        'Process and Insert', 'Clear Dictation', 'Repeat Last'
+    ),
+    'Application Control': (
+        'Next Tab (Cmd+Shift+])', 'Previous Tab (Cmd+Shift+[)',
+        'Close Tab (Cmd+W)', 'New Tab (Cmd+T)', 
+        'Termius Next Tab', 'Termius Previous Tab',
+        'Focus Address Bar', 'Focus Search', 'Scroll Up', 'Scroll Down',
+        'Page Up', 'Page Down', 'Home', 'End'
+    ),
+    'System Control': (
+        'Mission Control', 'Show Desktop', 'Launchpad', 'Notification Center',
+        'Screenshot (Cmd+Shift+3)', 'Screenshot Selection (Cmd+Shift+4)',
+        'Lock Screen', 'Sleep', 'Do Not Disturb Toggle',
+        'Brightness Up', 'Brightness Down', 'Keyboard Brightness Up', 'Keyboard Brightness Down'
+    ),
+    'Mouse Actions': (
+        'Left Click', 'Right Click', 'Middle Click', 'Double Click',
+        'Scroll Up', 'Scroll Down', 'Scroll Left', 'Scroll Right',
+        'Mouse Forward', 'Mouse Back'
+    ),
+    'Custom Commands': (
+        'Run AppleScript', 'Run Shell Command', 'Open Application',
+        'Open URL', 'Type Text', 'Wait/Delay', 'Send Notification'
+    )
+}
+
 class D01ConfigInterface:
     def __init__(self):
         self.root = tk.Tk()
@@ -19,45 +61,15 @@ class D01ConfigInterface:
         self.config_file = os.path.expanduser("~/.d01-config.json")
         self.config = self.load_config()
         
-        # Available actions
-        self.available_actions = {
-            'Keyboard Shortcuts': [
-                'Cmd+C (Copy)', 'Cmd+V (Paste)', 'Cmd+Z (Undo)', 'Cmd+Y (Redo)',
-                'Cmd+A (Select All)', 'Cmd+S (Save)', 'Cmd+O (Open)', 'Cmd+N (New)',
-                'Cmd+W (Close)', 'Cmd+T (New Tab)', 'Cmd+Shift+T (Reopen Tab)',
-                'Cmd+L (Address Bar)', 'Cmd+R (Refresh)', 'Cmd+F (Find)',
-                'Cmd+Space (Spotlight)', 'Cmd+Tab (App Switch)', 'Cmd+` (Window Switch)',
-                'Space (Play/Pause)', 'Cmd+Up (Volume Up)', 'Cmd+Down (Volume Down)',
-                'F11 (Fullscreen)', 'Escape', 'Return (Enter)', 'Delete', 'Backspace'
-            ],
-            'WisprFlow Actions': [
-                'Start Recording', 'Stop Recording', 'Toggle Recording',
-                'Cancel Recording', 'Confirm Dictation', 'WisprFlow Control (Up Chevron)',
-                'Process and Insert', 'Clear Dictation', 'Repeat Last'
-            ],
-            'Application Control': [
-                'Next Tab (Cmd+Shift+])', 'Previous Tab (Cmd+Shift+[)',
-                'Close Tab (Cmd+W)', 'New Tab (Cmd+T)', 
-                'Termius Next Tab', 'Termius Previous Tab',
-                'Focus Address Bar', 'Focus Search', 'Scroll Up', 'Scroll Down',
-                'Page Up', 'Page Down', 'Home', 'End'
-            ],
-            'System Control': [
-                'Mission Control', 'Show Desktop', 'Launchpad', 'Notification Center',
-                'Screenshot (Cmd+Shift+3)', 'Screenshot Selection (Cmd+Shift+4)',
-                'Lock Screen', 'Sleep', 'Do Not Disturb Toggle',
-                'Brightness Up', 'Brightness Down', 'Keyboard Brightness Up', 'Keyboard Brightness Down'
-            ],
-            'Mouse Actions': [
-                'Left Click', 'Right Click', 'Middle Click', 'Double Click',
-                'Scroll Up', 'Scroll Down', 'Scroll Left', 'Scroll Right',
-                'Mouse Forward', 'Mouse Back'
-            ],
-            'Custom Commands': [
-                'Run AppleScript', 'Run Shell Command', 'Open Application',
-                'Open URL', 'Type Text', 'Wait/Delay', 'Send Notification'
-            ]
-        }
+        # Action lists, built per category on demand (see get_actions)
+        self.available_actions = {}
+        
+        # Scanner instrumentation, created with the scanner (see start_device_scanner)
+        self.metrics = None
+        self.metrics_server = None
+        
+        # Bluetooth inventory, loaded on first "Detect Device" (see get_bluetooth_inventory)
+        self.bluetooth_inventory = None
         
         self.setup_ui()
         
@@ -76,6 +88,7 @@ class D01ConfigInterface:
             },
             'settings': {
                 'long_press_threshold': 800,  # milliseconds
+                'auto_calibrate_long_press': False,
                 'double_tap_threshold': 300,
                 'swipe_sensitivity': 30,
                 'enable_haptic_feedback': True,
@@ -102,6 +115,9 @@ class D01ConfigInterface:
                     for key, value in default_config.items():
                         if key not in loaded_config:
                             loaded_config[key] = value
+                    # Settings added since the file was written get their defaults
+                    for key, value in default_config['settings'].items():
+                        loaded_config['settings'].setdefault(key, value)
                     return loaded_config
         except Exception as e:
             print(f"Error loading config: {e}")
@@ -117,35 +133,69 @@ class D01ConfigInterface:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save configuration: {e}")
     
+    def get_actions(self, category):
+        """Return the action list for a category, materialising it on first use"""
+        if category not in self.available_actions:
+            self.available_actions[category] = list(ACTION_CATALOG.get(category, ()))
+        return self.available_actions[category]
+    
     def setup_ui(self):
         """Setup the user interface"""
-        # Create notebook for tabs
-        notebook = ttk.Notebook(self.root)
-        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Button Mappings Tab
-        self.setup_button_tab(notebook)
+        # Widget state that other methods rely on before a tab is built
+        self.button_vars = {}
+        self.gesture_vars = {}
+        self.setting_vars = {}
+        self.app_tree = None
+        self.device_id_var = tk.StringVar(value="58:5E:42:B3:2C:66")
+        self.scanner_supervisor = None
+        self.scanner_running = False
+        self.last_detected_event = None
         
-        # Gestures Tab  
-        self.setup_gesture_tab(notebook)
+        # Create notebook for tabs
+        self.notebook = ttk.Notebook(self.root)
+        self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Tabs are registered as empty frames and built on first selection
+        self.tab_builders = {}
+        tabs = [
+            ("Button Mappings", self.setup_button_tab),
+            ("Gestures", self.setup_gesture_tab),
+            ("App-Specific", self.setup_application_tab),
+            ("Settings", self.setup_settings_tab),
+            ("Device Scanner", self.setup_scanner_tab)
+        ]
         
-        # Application-Specific Tab
-        self.setup_application_tab(notebook)
+        for tab_name, builder in tabs:
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=tab_name)
+            self.tab_builders[str(frame)] = (frame, builder)
         
-        # Settings Tab
-        self.setup_settings_tab(notebook)
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
         
-        # Device Scanner Tab
-        self.setup_scanner_tab(notebook)
+        # Only the initially visible tab is built up front
+        self.build_tab(self.notebook.select())
         
         # Control buttons
         self.setup_control_buttons()
     
-    def setup_button_tab(self, notebook):
+    def on_tab_changed(self, event):
+        """Build the selected tab the first time it is shown"""
+        self.build_tab(self.notebook.select())
+    
+    def build_tab(self, tab_id):
+        """Build a notebook tab if it has not been built yet"""
+        entry = self.tab_builders.pop(str(tab_id), None)
+        if entry:
+            frame, builder = entry
+            builder(frame)
+    
+    def build_all_tabs(self):
+        """Build every remaining tab (used by the eager startup benchmark)"""
+        for tab_id in list(self.tab_builders):
+            self.build_tab(tab_id)
+    
+    def setup_button_tab(self, button_frame):
         """Setup button mapping tab"""
-        button_frame = ttk.Frame(notebook)
-        notebook.add(button_frame, text="Button Mappings")
-        
         # Title
         title = ttk.Label(button_frame, text="D01 Ring Button Mappings", font=('Arial', 16, 'bold'))
         title.pack(pady=10)
@@ -161,8 +211,6 @@ class D01ConfigInterface:
             ('middle', 'Middle Button')
         ]
         
-        self.button_vars = {}
-        
         for i, (button_id, button_name) in enumerate(buttons):
             # Button label
             label = ttk.Label(mapping_frame, text=button_name, font=('Arial', 12))
@@ -171,7 +219,7 @@ class D01ConfigInterface:
             # Category selection
             category_var = tk.StringVar()
             category_combo = ttk.Combobox(mapping_frame, textvariable=category_var, 
-                                        values=list(self.available_actions.keys()),
+                                        values=list(ACTION_CATALOG.keys()),
                                         width=20, state="readonly")
             category_combo.grid(row=i, column=1, pady=5, padx=5)
             
@@ -180,37 +228,39 @@ class D01ConfigInterface:
             action_combo = ttk.Combobox(mapping_frame, textvariable=action_var, width=30)
             action_combo.grid(row=i, column=2, pady=5, padx=5)
             
+            # Action list is only filled in when the dropdown is opened
+            def fill_actions(ac=action_combo, cv=category_var):
+                ac['values'] = self.get_actions(cv.get()) if cv.get() else []
+            
+            action_combo.configure(postcommand=fill_actions)
+            
             # Load current values
             current_config = self.config['buttons'].get(button_id, {})
             if 'category' in current_config:
                 category_var.set(current_config['category'])
-                action_combo['values'] = self.available_actions[current_config['category']]
             if 'action' in current_config:
                 action_var.set(current_config['action'])
             
             # Bind category change to update actions
-            def update_actions(event, av=action_var, ac=action_combo, cv=category_var):
+            def update_actions(event, av=action_var, cv=category_var):
                 if cv.get():
-                    ac['values'] = self.available_actions[cv.get()]
                     av.set('')  # Clear action when category changes
             
             category_combo.bind('<<ComboboxSelected>>', update_actions)
             
             self.button_vars[button_id] = (category_var, action_var)
     
-    def setup_gesture_tab(self, notebook):
+    def setup_gesture_tab(self, gesture_frame):
         """Setup gesture mapping tab"""
-        gesture_frame = ttk.Frame(notebook)
-        notebook.add(gesture_frame, text="Gestures")
-        
         title = ttk.Label(gesture_frame, text="Gesture Mappings", font=('Arial', 16, 'bold'))
         title.pack(pady=10)
         
         # Gesture info
         info_text = """
         Configure gestures detected by the D01 ring:
-        • Diagonal Swipe: Quick diagonal mouse movement
-        • Double Tap: Two rapid taps on the ring
+        • Diagonal Swipe: Quick diagonal mouse movement (any of the four diagonals)
+        • Swipe Up/Down/Left/Right: Straight strokes on the trackpad
+        • Tap / Double Tap: One or two rapid taps on the ring
         • Hold and Move: Hold button while moving ring
         """
         info_label = ttk.Label(gesture_frame, text=info_text, justify=tk.LEFT)
@@ -222,12 +272,15 @@ class D01ConfigInterface:
         
         gestures = [
             ('diagonal_swipe', 'Diagonal Swipe'),
+            ('swipe_up', 'Swipe Up'),
+            ('swipe_down', 'Swipe Down'),
+            ('swipe_left', 'Swipe Left'),
+            ('swipe_right', 'Swipe Right'),
+            ('tap', 'Tap'),
             ('double_tap', 'Double Tap'),
             ('hold_and_move', 'Hold and Move')
         ]
         
-        self.gesture_vars = {}
-        
         for i, (gesture_id, gesture_name) in enumerate(gestures):
             # Gesture label
             label = ttk.Label(gesture_mapping_frame, text=gesture_name, font=('Arial', 12))
@@ -236,7 +289,7 @@ class D01ConfigInterface:
             # Category selection
             category_var = tk.StringVar()
             category_combo = ttk.Combobox(gesture_mapping_frame, textvariable=category_var,
-                                        values=list(self.available_actions.keys()),
+                                        values=list(ACTION_CATALOG.keys()),
                                         width=20, state="readonly")
             category_combo.grid(row=i, column=1, pady=5, padx=5)
             
@@ -245,29 +298,30 @@ class D01ConfigInterface:
             action_combo = ttk.Combobox(gesture_mapping_frame, textvariable=action_var, width=30)
             action_combo.grid(row=i, column=2, pady=5, padx=5)
             
+            # Action list is only filled in when the dropdown is opened
+            def fill_actions(ac=action_combo, cv=category_var):
+                ac['values'] = self.get_actions(cv.get()) if cv.get() else []
+            
+            action_combo.configure(postcommand=fill_actions)
+            
             # Load current values
             current_config = self.config['gestures'].get(gesture_id, {})
             if 'category' in current_config:
                 category_var.set(current_config['category'])
-                action_combo['values'] = self.available_actions[current_config['category']]
             if 'action' in current_config:
                 action_var.set(current_config['action'])
             
             # Bind category change
-            def update_gesture_actions(event, av=action_var, ac=action_combo, cv=category_var):
+            def update_gesture_actions(event, av=action_var, cv=category_var):
                 if cv.get():
-                    ac['values'] = self.available_actions[cv.get()]
                     av.set('')
             
             category_combo.bind('<<ComboboxSelected>>', update_gesture_actions)
             
             self.gesture_vars[gesture_id] = (category_var, action_var)
     
-    def setup_application_tab(self, notebook):
+    def setup_application_tab(self, app_frame):
         """Setup application-specific mappings"""
-        app_frame = ttk.Frame(notebook)
-        notebook.add(app_frame, text="App-Specific")
-        
         title = ttk.Label(app_frame, text="Application-Specific Mappings", font=('Arial', 16, 'bold'))
         title.pack(pady=10)
         
@@ -305,11 +359,8 @@ class D01ConfigInterface:
         ttk.Button(app_button_frame, text="Remove Selected", 
                   command=self.remove_app_mapping).pack(side=tk.LEFT, padx=5)
     
-    def setup_settings_tab(self, notebook):
+    def setup_settings_tab(self, settings_frame):
         """Setup settings tab"""
-        settings_frame = ttk.Frame(notebook)
-        notebook.add(settings_frame, text="Settings")
-        
         title = ttk.Label(settings_frame, text="D01 Ring Settings", font=('Arial', 16, 'bold'))
         title.pack(pady=10)
         
@@ -317,10 +368,9 @@ class D01ConfigInterface:
         settings_grid = ttk.Frame(settings_frame)
         settings_grid.pack(fill=tk.BOTH, expand=True, padx=20)
         
-        self.setting_vars = {}
-        
         settings = [
             ('long_press_threshold', 'Long Press Threshold (ms)', 'int', 100, 2000),
+            ('auto_calibrate_long_press', 'Auto-apply Calibrated Threshold', 'bool', None, None),
             ('double_tap_threshold', 'Double Tap Threshold (ms)', 'int', 100, 1000),
             ('swipe_sensitivity', 'Swipe Sensitivity', 'int', 10, 100),
             ('enable_haptic_feedback', 'Enable Haptic Feedback', 'bool', None, None),
@@ -347,12 +397,17 @@ class D01ConfigInterface:
                 checkbox.grid(row=i, column=1, pady=5, padx=5)
             
             self.setting_vars[setting_id] = var
+        
+        # What the remapper has learned from real presses, per ring
+        suggestions = [f"{address}: {state['suggested_ms']}ms"
+                       for address, state in self.config.get('press_calibration', {}).items()
+                       if state.get('suggested_ms')]
+        if suggestions:
+            hint = ttk.Label(settings_grid, text="Suggested from your presses: " + ", ".join(suggestions))
+            hint.grid(row=len(settings), column=0, columnspan=3, sticky=tk.W, pady=5, padx=5)
     
-    def setup_scanner_tab(self, notebook):
+    def setup_scanner_tab(self, scanner_frame):
         """Setup device scanner tab"""
-        scanner_frame = ttk.Frame(notebook)
-        notebook.add(scanner_frame, text="Device Scanner")
-        
         title = ttk.Label(scanner_frame, text="D01 Ring Device Scanner", font=('Arial', 16, 'bold'))
         title.pack(pady=10)
         
@@ -368,7 +423,6 @@ class D01ConfigInterface:
         device_frame.pack(pady=5)
         
         ttk.Label(device_frame, text="D01 Device ID (optional):").pack(side=tk.LEFT)
-        self.device_id_var = tk.StringVar(value="58:5E:42:B3:2C:66")
         device_entry = ttk.Entry(device_frame, textvariable=self.device_id_var, width=20)
         device_entry.pack(side=tk.LEFT, padx=5)
         
@@ -430,11 +484,6 @@ class D01ConfigInterface:
                   command=lambda: self.quick_map_button('top')).pack(side=tk.LEFT, padx=5)
         ttk.Button(quick_frame, text="Map to Middle", 
                   command=lambda: self.quick_map_button('middle')).pack(side=tk.LEFT, padx=5)
-        
-        # Scanner state
-        self.scanner_process = None
-        self.scanner_running = False
-        self.last_detected_event = None
     
     def setup_control_buttons(self):
         """Setup control buttons at bottom"""
@@ -482,7 +531,7 @@ class D01ConfigInterface:
         ttk.Label(dialog, text="Action Category:").pack(pady=5)
         category_var = tk.StringVar()
         category_combo = ttk.Combobox(dialog, textvariable=category_var,
-                                     values=list(self.available_actions.keys()))
+                                     values=list(ACTION_CATALOG.keys()))
         category_combo.pack(pady=5)
         
         ttk.Label(dialog, text="Action:").pack(pady=5)
@@ -492,7 +541,7 @@ class D01ConfigInterface:
         
         def update_actions_dialog(event):
             if category_var.get():
-                action_combo['values'] = self.available_actions[category_var.get()]
+                action_combo['values'] = self.get_actions(category_var.get())
         
         category_combo.bind('<<ComboboxSelected>>', update_actions_dialog)
         
@@ -599,64 +648,56 @@ class D01ConfigInterface:
         for setting_id, var in self.setting_vars.items():
             var.set(self.config['settings'].get(setting_id, var.get()))
         
-        # Refresh app tree
-        self.app_tree.delete(*self.app_tree.get_children())
-        self.load_app_mappings()
+        # Refresh app tree (only if that tab has been built)
+        if self.app_tree is not None:
+            self.app_tree.delete(*self.app_tree.get_children())
+            self.load_app_mappings()
     
     def start_device_scanner(self):
         """Start the device scanner"""
-        import subprocess
+        # Heavy modules are only imported once the scanner is started
         import threading
-        import time
+        from d01_log_supervisor import LogStreamSupervisor
+        from d01_metrics import StageMetrics, MetricsServer, metrics_enabled
+        from d01_predicates import build_predicate
         
         if self.scanner_running:
             return
+        
+        if self.metrics is None:
+            # No-op unless enabled
+            self.metrics = StageMetrics('scanner', enabled=metrics_enabled(self.config))
             
         self.scanner_running = True
         self.scan_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.scanner_status.config(text="🔍 Scanner running - Press buttons on D01 ring!")
         
+        if self.metrics.enabled and not self.metrics_server:
+            self.metrics_server = MetricsServer(self.config['settings'].get('metrics_port', 9464))
+            self.metrics_server.start()
+        
         def scanner_thread():
             try:
                 # Get device ID from UI
                 device_id = self.device_id_var.get().strip()
                 
-                # Start the HID scanner process - cast a wide net for D01 events
-                if device_id:
-                    # If we have device ID, look for ANY events from that device
-                    predicate = f'eventMessage CONTAINS "{device_id}"'
-                else:
-                    # Otherwise look for D01-specific patterns
-                    predicate = (
-                        'eventMessage CONTAINS "D01" OR '
-                        'eventMessage CONTAINS "0x05ac" OR '
-                        'eventMessage CONTAINS "buttonState" OR '
-                        'eventMessage CONTAINS "input report" OR '
-                        'eventMessage CONTAINS "HID" OR '
-                        'eventMessage CONTAINS "keyboard" OR '
-                        'eventMessage CONTAINS "SenderID"'
-                    )
+                # D01 events plus, with a device ID, every line that mentions the ring
+                predicate = build_predicate('scan', device_match=device_id or None)
                 
-                self.scanner_process = subprocess.Popen([
-                    'log', 'stream', '--predicate', predicate,
-                    '--style', 'compact'
-                ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                
-                while self.scanner_running:
-                    line = self.scanner_process.stdout.readline()
-                    if not line:
-                        break
-                        
-                    line = line.strip()
-                    if line:
-                        self.process_scanner_line(line)
+                # The supervisor drains stderr and restarts a failed or stalled stream
+                self.scanner_supervisor = LogStreamSupervisor(predicate, name='scanner', metrics=self.metrics)
+                self.scanner_supervisor.subscribe(scanner_line)
+                self.scanner_supervisor.start()
+                self.scanner_supervisor.run_until(lambda: self.scanner_running)
                         
             except Exception as e:
                 self.scanner_results.insert(tk.END, f"Scanner error: {e}\n")
-            finally:
-                if self.scanner_process:
-                    self.scanner_process.terminate()
+        
+        def scanner_line(line):
+            started = self.metrics.start()
+            self.process_scanner_line(line)
+            self.metrics.observe('classify', started)
         
         # Start scanner in background thread
         thread = threading.Thread(target=scanner_thread)
@@ -667,9 +708,9 @@ class D01ConfigInterface:
         """Stop the device scanner"""
         self.scanner_running = False
         
-        if self.scanner_process:
-            self.scanner_process.terminate()
-            self.scanner_process = None
+        if self.scanner_supervisor:
+            self.scanner_supervisor.stop()
+            self.scanner_supervisor = None
             
         self.scan_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
@@ -678,7 +719,6 @@ class D01ConfigInterface:
     def process_scanner_line(self, line):
         """Process a line from the scanner"""
         import re
-        import time
         
         timestamp = time.strftime('%H:%M:%S')
         
@@ -779,34 +819,51 @@ class D01ConfigInterface:
                                        f"✅ MAPPED: {event_info['type']} → {button_type}\n\n")
             self.scanner_results.see(tk.END)
     
+    def get_bluetooth_inventory(self):
+        """The shared Bluetooth inventory; imported and refreshed (if stale) on first use"""
+        if self.bluetooth_inventory is None:
+            from d01_bluetooth_inventory import get_inventory
+            self.bluetooth_inventory = get_inventory()
+            if not self.bluetooth_inventory.is_fresh():
+                self.bluetooth_inventory.refresh()
+        return self.bluetooth_inventory
+    
     def detect_d01_device(self):
         """Detect D01 ring device and update device ID field"""
-        import subprocess
+        inventory = self.get_bluetooth_inventory()
         
+        if not inventory.has_data():
+            # First scan still running - check back without blocking the UI
+            self.scanner_results.insert(tk.END, "🔍 Scanning Bluetooth devices...\n")
+            self.root.after(200, self.finish_detect, inventory.refresh())
+            return
+        
+        self.show_detected_device()
+    
+    def finish_detect(self, scan_done):
+        """Show the detection result once the background scan completes"""
+        if not scan_done.is_set():
+            self.root.after(200, self.finish_detect, scan_done)
+            return
+        
+        if not self.bluetooth_inventory.has_data():
+            messagebox.showerror("Detection Error", "Bluetooth scan failed, see console for details")
+            return
+        self.show_detected_device()
+    
+    def show_detected_device(self):
+        """Fill in the device ID from the Bluetooth inventory"""
         try:
-            # Check Bluetooth devices
-            result = subprocess.run([
-                'system_profiler', 'SPBluetoothDataType'
-            ], capture_output=True, text=True)
-            
-            if "D01 Pro" in result.stdout:
-                # Extract address from Bluetooth info
-                lines = result.stdout.split('\n')
-                for i, line in enumerate(lines):
-                    if "D01 Pro" in line:
-                        # Look for address in nearby lines
-                        for j in range(max(0, i-5), min(len(lines), i+5)):
-                            if "Address:" in lines[j]:
-                                address = lines[j].split("Address:")[1].strip()
-                                self.device_id_var.set(address)
-                                self.scanner_results.insert(tk.END, 
-                                    f"✅ D01 Pro detected: {address}\n")
-                                messagebox.showinfo("Device Found", 
-                                    f"D01 Pro found!\nAddress: {address}")
-                                return
-                
+            matches = self.bluetooth_inventory.find("D01")
+            if matches:
+                # Prefer a connected ring
+                device = sorted(matches, key=lambda d: not d['connected'])[0]
+                address = device['address']
+                self.device_id_var.set(address)
+                self.scanner_results.insert(tk.END, 
+                    f"✅ {device['name']} detected: {address}\n")
                 messagebox.showinfo("Device Found", 
-                    "D01 Pro found but couldn't extract address")
+                    f"{device['name']} found!\nAddress: {address}")
             else:
                 messagebox.showwarning("Device Not Found", 
                     "D01 Pro not found in Bluetooth devices.\n"
@@ -819,6 +876,63 @@ class D01ConfigInterface:
         """Run the configuration interface"""
         self.root.mainloop()
 
+def start_virtual_display():
+    """Start an Xvfb stand-in display when no display is available"""
+    if sys.platform == 'darwin' or os.environ.get('DISPLAY'):
+        return None
+    
+    import shutil
+    import subprocess
+    
+    if not shutil.which('Xvfb'):
+        return None
+    
+    display = ':99'
+    process = subprocess.Popen(['Xvfb', display, '-screen', '0', '1024x768x24'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ['DISPLAY'] = display
+    time.sleep(0.5)  # Give the server a moment to accept connections
+    return process
+
+def benchmark_startup(runs=5, eager=False):
+    """Measure time-to-first-frame for the configuration interface"""
+    print("⏱️  D01 Config Interface startup benchmark")
+    print(f"Runs: {runs}, mode: {'eager (all tabs)' if eager else 'lazy'}")
+    
+    display_process = start_virtual_display()
+    samples = []
+    
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            app = D01ConfigInterface()
+            if eager:
+                app.build_all_tabs()
+            
+            # First frame: geometry computed and drawn once
+            app.root.update_idletasks()
+            app.root.update()
+            samples.append(time.perf_counter() - start)
+            
+            app.root.destroy()
+            
+    except tk.TclError as e:
+        print(f"❌ No display available ({e})")
+        print("Install Xvfb or run on a machine with a display")
+        return None
+    finally:
+        if display_process:
+            display_process.terminate()
+    
+    samples.sort()
+    print(f"  Best:   {samples[0] * 1000:.1f} ms")
+    print(f"  Median: {samples[len(samples) // 2] * 1000:.1f} ms")
+    print(f"  Worst:  {samples[-1] * 1000:.1f} ms")
+    return samples
+
 if __name__ == "__main__":
-    app = D01ConfigInterface()
-    app.run()
\ No newline at end of file
+    if '--benchmark-startup' in sys.argv:
+        benchmark_startup(eager='--eager' in sys.argv)
+    else:
+        app = D01ConfigInterface()
+        app.run()
\ No newline at end of file
@@ -7,12 +7,34 @@ import subprocess
 import json
 import time
 import sys
+import os
+
+from d01_devices import load_device_profiles
 
 class D01DeviceMonitor:
     def __init__(self):
         self.known_devices = set()
-        self.d01_vendor_id = "0x05ac"
-        self.d01_product_id = "0x022c"
+        # (vendor_id, product_id) of every configured ring, as '0x05ac' strings
+        self.device_ids = self.load_device_ids()
+        self.d01_vendor_id, self.d01_product_id = self.device_ids[0]
+        
+    def load_device_ids(self):
+        """Read the configured rings from ~/.d01-config.json"""
+        config = {}
+        config_file = os.path.expanduser("~/.d01-config.json")
+        try:
+            if os.path.exists(config_file):
+                with open(config_file, 'r') as f:
+                    config = json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {e}")
+        
+        ids = []
+        for profile in load_device_profiles(config):
+            pair = (f"0x{profile['vendor_id']:04x}", f"0x{profile['product_id']:04x}")
+            if pair not in ids:
+                ids.append(pair)
+        return ids
         
     def get_current_usb_devices(self):
         """Get current USB devices as JSON"""
@@ -54,9 +76,9 @@ class D01DeviceMonitor:
         # Check HID devices
         if hid_data:
             for line in hid_data.split('\n'):
-                if self.d01_vendor_id in line and self.d01_product_id in line:
+                if any(vendor in line and product in line for vendor, product in self.device_ids):
                     found_devices.append(('HID', line.strip()))
-                elif self.d01_vendor_id in line:
+                elif any(vendor in line for vendor, _ in self.device_ids):
                     # Might be a related Apple device
                     found_devices.append(('HID_APPLE', line.strip()))
         
@@ -83,12 +105,13 @@ class D01DeviceMonitor:
         vendor_id = device.get('vendor_id', '').lower()
         product_id = device.get('product_id', '').lower()
         
-        # Check for exact match
-        if self.d01_vendor_id.lower() in vendor_id and self.d01_product_id.lower() in product_id:
-            return True
+        # Check for exact match against any configured ring
+        for d01_vendor_id, d01_product_id in self.device_ids:
+            if d01_vendor_id in vendor_id and d01_product_id in product_id:
+                return True
         
         # Check for potential charging case (might have different product ID)
-        if self.d01_vendor_id.lower() in vendor_id:
+        if any(d01_vendor_id in vendor_id for d01_vendor_id, _ in self.device_ids):
             return True
             
         return False
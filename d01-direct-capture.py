@@ -3,87 +3,67 @@
 D01 Direct Input Capture - Monitor system input events directly
 """
 
-import subprocess
 import time
-import threading
-import json
 import os
-import signal
-import sys
 from collections import defaultdict
 
+from d01_correlation import PressCorrelator, edge_kind, format_event as format_correlated_event
+from d01_journal import JournalWriter, read_journal
+from d01_log_shipper import shipper_from_config
+from d01_log_supervisor import log_command
+from d01_runtime import Runtime
+
 class D01DirectCapture:
-    def __init__(self):
+    def __init__(self, binary_journal=False):
         self.running = False
         self.events = []
         self.event_count = 0
-        self.log_file = os.path.expanduser("~/d01_capture.log")
+        self.log_file = os.path.expanduser("~/d01_capture.bin" if binary_journal else "~/d01_capture.log")
+        self.correlator = None  # Joins keyboard/media sightings in 'all' mode
         
         # Clear previous log
         open(self.log_file, 'w').close()
         
+        # Events are buffered and written by a background thread
+        self.journal = JournalWriter(self.log_file, binary=binary_journal)
+        
+        # Optional log-server.js feed (set D01_LOG_SERVER)
+        self.shipper = shipper_from_config('d01-direct-capture')
+        
+        # Every monitor is a source on one event loop; handlers never run concurrently
+        self.runtime = Runtime('direct-capture')
+        
     def monitor_key_events(self):
         """Monitor keyboard events using caffeinate to detect key presses"""
         print("🎯 Monitoring keyboard events...")
         print("Press buttons on your D01 ring - you should see events appear below:")
         print()
         
-        try:
-            # Use log stream to monitor keyboard events
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'eventMessage CONTAINS "keyCode" OR '
-                'eventMessage CONTAINS "keyDown" OR '
-                'eventMessage CONTAINS "keyUp" OR '
-                'subsystem == "com.apple.HIToolbox"',
-                '--style', 'compact',
-                '--color', 'none'
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            
-            self.running = True
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                line = line.strip()
-                if line and self.is_input_event(line):
-                    self.process_input_event(line)
-                    
-        except Exception as e:
-            print(f"Error monitoring events: {e}")
-        finally:
-            process.terminate()
+        def on_line(line):
+            if self.is_input_event(line):
+                self.process_input_event(line)
+        
+        # Use log stream to monitor keyboard events
+        self.runtime.add_log_stream(
+            'eventMessage CONTAINS "keyCode" OR '
+            'eventMessage CONTAINS "keyDown" OR '
+            'eventMessage CONTAINS "keyUp" OR '
+            'subsystem == "com.apple.HIToolbox"',
+            on_line, name='keyboard events', extra=('--color', 'none')
+        )
     
     def monitor_volume_keys(self):
         """Monitor volume key events which the D01 might send"""
         print("🔊 Monitoring volume/media key events...")
         
-        try:
-            # Monitor for system-defined events (volume keys)
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'eventMessage CONTAINS "volume" OR '
-                'eventMessage CONTAINS "media" OR '
-                'eventMessage CONTAINS "NX_KEYTYPE" OR '
-                'subsystem == "com.apple.audio"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                line = line.strip()
-                if line:
-                    self.process_media_event(line)
-                    
-        except Exception as e:
-            print(f"Error monitoring media events: {e}")
-        finally:
-            process.terminate()
+        # Monitor for system-defined events (volume keys)
+        self.runtime.add_log_stream(
+            'eventMessage CONTAINS "volume" OR '
+            'eventMessage CONTAINS "media" OR '
+            'eventMessage CONTAINS "NX_KEYTYPE" OR '
+            'subsystem == "com.apple.audio"',
+            self.process_media_event, name='media events'
+        )
     
     def is_input_event(self, line):
         """Check if line contains input event"""
@@ -100,6 +80,9 @@ class D01DirectCapture:
         self.event_count += 1
         timestamp = time.strftime('%H:%M:%S')
         
+        if self.correlator:
+            self.correlator.observe('keyboard', edge_kind(line))
+        
         print(f"[{timestamp}] 🎹 INPUT EVENT #{self.event_count}")
         print(f"  {line}")
         
@@ -119,6 +102,9 @@ class D01DirectCapture:
         self.event_count += 1
         timestamp = time.strftime('%H:%M:%S')
         
+        if self.correlator:
+            self.correlator.observe('media', edge_kind(line))
+        
         print(f"[{timestamp}] 📻 MEDIA EVENT #{self.event_count}")
         print(f"  {line}")
         
@@ -133,13 +119,22 @@ class D01DirectCapture:
         self.log_event(event_data)
         print("-" * 60)
     
+    def log_correlated_event(self, event):
+        """Record one canonical press built from several sightings"""
+        print(format_correlated_event(event))
+        self.log_event({
+            'timestamp': event['timestamp'],
+            'type': 'PRESS',
+            'sources': event['sources'],
+            'confidence': event['confidence']
+        })
+    
     def log_event(self, event_data):
         """Log event to file"""
-        try:
-            with open(self.log_file, 'a') as f:
-                f.write(json.dumps(event_data) + '\n')
-        except Exception as e:
-            print(f"Error logging event: {e}")
+        if not self.journal.write(event_data):
+            print("⚠️  Journal queue full - event dropped")
+        if self.shipper:
+            self.shipper.ship_event(event_data)
     
     def monitor_simple_test(self):
         """Simple test - just monitor for any system changes"""
@@ -148,35 +143,24 @@ class D01DirectCapture:
         print("You should see immediate feedback for keyboard keys")
         print()
         
-        try:
-            # Monitor general system events
-            process = subprocess.Popen([
-                'log', 'stream', '--level', 'info',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            self.running = True
-            line_count = 0
-            
-            while self.running and line_count < 50:  # Limit output
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                line = line.strip()
-                if line and ('key' in line.lower() or 'input' in line.lower() or 'event' in line.lower()):
-                    line_count += 1
-                    timestamp = time.strftime('%H:%M:%S')
-                    print(f"[{timestamp}] {line}")
-                    
-                    # Log significant events
-                    if any(word in line.lower() for word in ['keycode', 'button', 'press']):
-                        print("  ^^ This looks like a key/button event!")
-                        
-        except Exception as e:
-            print(f"Error in simple test: {e}")
-        finally:
-            process.terminate()
+        line_count = 0
+        
+        def on_line(line):
+            nonlocal line_count
+            if 'key' in line.lower() or 'input' in line.lower() or 'event' in line.lower():
+                line_count += 1
+                timestamp = time.strftime('%H:%M:%S')
+                print(f"[{timestamp}] {line}")
+                
+                # Log significant events
+                if any(word in line.lower() for word in ['keycode', 'button', 'press']):
+                    print("  ^^ This looks like a key/button event!")
+                if line_count >= 50:  # Limit output
+                    self.runtime.stop()
+        
+        # Monitor general system events
+        self.runtime.add_process(log_command() + ['stream', '--level', 'info', '--style', 'compact'],
+                                 on_line, name='simple test', restart=False)
     
     def start_capture(self, mode='simple'):
         """Start input capture"""
@@ -185,14 +169,7 @@ class D01DirectCapture:
         print(f"Log file: {self.log_file}")
         print()
         
-        # Set up signal handler for clean exit
-        def signal_handler(sig, frame):
-            print("\n🛑 Stopping capture...")
-            self.running = False
-            self.show_summary()
-            sys.exit(0)
-        
-        signal.signal(signal.SIGINT, signal_handler)
+        self.running = True
         
         if mode == 'simple':
             self.monitor_simple_test()
@@ -201,24 +178,34 @@ class D01DirectCapture:
         elif mode == 'media':
             self.monitor_volume_keys()
         elif mode == 'all':
-            # Run multiple monitors in threads
-            threads = [
-                threading.Thread(target=self.monitor_key_events),
-                threading.Thread(target=self.monitor_volume_keys)
-            ]
-            
-            for thread in threads:
-                thread.daemon = True
-                thread.start()
-            
-            # Keep main thread alive
-            try:
-                while self.running:
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                pass
+            # The same press can show up as both a key and a media event;
+            # each join window is closed by a timer on the loop, not by polling
+            self.correlator = PressCorrelator(window=0.1, mode='trailing', on_event=self.log_correlated_event,
+                                              scheduler=self.runtime.scheduler)
+            self.monitor_key_events()
+            self.monitor_volume_keys()
         
-        self.show_summary()
+        # Runs until Ctrl+C (or the simple test's line limit), then the runtime's shutdown:
+        # sources stop and are reaped, open correlations and outputs are flushed, then the summary
+        shutdown = self.runtime.shutdown
+        shutdown.on_stop(self.stop, 'capture')
+        if self.correlator:
+            shutdown.on_flush(lambda: self.correlator.flush(now=float('inf')), 'correlator')
+            shutdown.on_stats(lambda: print(f"Correlation: {self.correlator.summary()}"), 'correlation')
+        shutdown.on_flush(self.close_outputs, 'outputs')
+        shutdown.on_stats(self.show_summary, 'summary')
+        self.runtime.run()
+    
+    def stop(self):
+        self.running = False
+        print("\n🛑 Stopping capture...")
+    
+    def close_outputs(self):
+        """Flush the journal and the log server feed"""
+        self.journal.close()
+        if self.shipper:
+            self.shipper.close()
+            print(f"Log server: {self.shipper.summary()}")
     
     def show_summary(self):
         """Show capture summary"""
@@ -229,16 +216,11 @@ class D01DirectCapture:
         # Analyze log file
         if os.path.exists(self.log_file):
             try:
-                with open(self.log_file, 'r') as f:
-                    lines = f.readlines()
+                lines = list(read_journal(self.log_file))
                     
                 event_types = defaultdict(int)
-                for line in lines:
-                    try:
-                        event = json.loads(line.strip())
-                        event_types[event['type']] += 1
-                    except:
-                        continue
+                for event in lines:
+                    event_types[event.get('type', 'UNKNOWN')] += 1
                 
                 if event_types:
                     print("Event breakdown:")
@@ -5,22 +5,62 @@ Intercepts HID reports and modifies them before OS processing
 """
 
 import hid
+import json
+import os
 import struct
 import time
 
+from d01_metrics import DEFAULT_PORT, StageMetrics, MetricsServer, metrics_enabled
+from d01_output import CodeScripts, output_from_spec
+from d01_flight_recorder import FlightRecorder
+from d01_bit_correlation import load_report_masks
+
 # D01 Pro HID identifiers (from Bluetooth scan)
 VENDOR_ID = 0x05AC  # Apple VID (likely rebranded)
 PRODUCT_ID = 0x022C
 DEVICE_ADDRESS = "58:5E:42:B3:2C:66"
 
+# Custom codes in remapped report byte 1 -> keystrokes
+REMAP_SCRIPTS = {
+    0x10: 'tell application "System Events" to keystroke "r" using {command down, shift down}',  # Start recording
+    0x20: 'tell application "System Events" to keystroke "s" using {command down, shift down}',  # Stop recording
+    0x40: 'tell application "System Events" to keystroke "]" using {command down, shift down}',  # Middle button
+    0x80: 'tell application "System Events" to key code 126 using {control down}',  # Long press: Ctrl+Up
+}
+
 class D01Remapper:
-    def __init__(self):
+    def __init__(self, output=None, report_masks=None):
         self.device = None
         self.running = False
         self.button_states = {}
         self.press_times = {}
         self.long_press_threshold = 0.8  # 800ms for long press
         
+        # Which byte/bit is which button (learn with: d01_bit_correlation.py --guided --save)
+        self.report_masks = report_masks or load_report_masks()
+        
+        # Per-stage instrumentation (enable with D01_METRICS=1 or settings.enable_metrics)
+        self.config = self.load_config()
+        self.metrics = StageMetrics('remapper', enabled=metrics_enabled(self.config))
+        self.metrics_server = None
+        
+        # Output backend: keystroke scripts by default, D01_OUTPUT=sink:<path> to record reports
+        self.output = output or output_from_spec(os.environ.get('D01_OUTPUT'), CodeScripts(REMAP_SCRIPTS))
+        
+        # Always-on history of raw and remapped reports (dump: kill -USR1, error, control socket)
+        self.recorder = FlightRecorder('remapper')
+        
+    def load_config(self):
+        """Load the shared D01 config (only the metrics settings are used here)"""
+        config_file = os.path.expanduser("~/.d01-config.json")
+        try:
+            if os.path.exists(config_file):
+                with open(config_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {e}")
+        return {}
+    
     def connect(self):
         """Connect to D01 ring via HID"""
         try:
@@ -43,13 +83,12 @@ class D01Remapper:
             
         # Parse HID report (device-specific format)
         report_id = raw_report[0]
-        button_state = raw_report[1]
         current_time = time.time()
         
         # Track button press timing
-        bottom_pressed = bool(button_state & 0x01)
-        top_pressed = bool(button_state & 0x02)
-        middle_pressed = bool(button_state & 0x04)
+        bottom_pressed = self.is_pressed(raw_report, 'bottom')
+        top_pressed = self.is_pressed(raw_report, 'top')
+        middle_pressed = self.is_pressed(raw_report, 'middle')
         
         # Handle bottom button (hold to record, release to stop)
         remapped = 0
@@ -101,6 +140,11 @@ class D01Remapper:
         
         return bytes(new_report)
     
+    def is_pressed(self, report, button):
+        """Test the button's bit per the report mask table"""
+        mask = self.report_masks.get(button)
+        return bool(mask) and len(report) > mask['byte'] and bool(report[mask['byte']] & mask['mask'])
+    
     def start_remapping(self):
         """Main remapping loop"""
         if not self.connect():
@@ -109,51 +153,66 @@ class D01Remapper:
         self.running = True
         print("Starting firmware-level remapping...")
         
+        metrics = self.metrics
+        if metrics.enabled:
+            port = self.config.get('settings', {}).get('metrics_port', DEFAULT_PORT)
+            self.metrics_server = MetricsServer(port)
+            self.recorder.add_routes(self.metrics_server)
+            self.metrics_server.start()
+        
+        recorder = self.recorder
+        recorder.install_signal()
+        try:
+            print(f"📼 Flight recorder: kill -USR1 {os.getpid()} or {recorder.serve_control()}")
+        except OSError as e:
+            print(f"Flight recorder control socket unavailable: {e}")
+        
         try:
             while self.running:
                 # Read raw HID report
+                started = metrics.start()
                 raw_data = self.device.read(64, timeout_ms=100)
                 
                 if raw_data:
+                    metrics.observe('hid_read', started)
+                    metrics.count('reports_read')
+                    recorder.record('report', raw_data)
+                    
                     # Remap at firmware level
+                    started = metrics.start()
                     remapped_data = self.remap_buttons(raw_data)
+                    metrics.observe('remap', started)
+                    recorder.record('remapped', remapped_data)
                     
                     # Send modified report to virtual HID device
                     # (Would need virtual HID driver implementation)
+                    started = metrics.start()
                     self.send_virtual_hid(remapped_data)
+                    metrics.observe('output', started)
                     
         except KeyboardInterrupt:
             print("Stopping remapper...")
+        except Exception as e:
+            recorder.dump_on_error(e)
+            raise
         finally:
             if self.device:
                 self.device.close()
+            self.output.close()
+            recorder.close()
+            if self.metrics_server:
+                self.metrics_server.stop()
+                self.metrics_server = None
+            metrics.close()
     
     def send_virtual_hid(self, data):
-        """Send remapped HID data as virtual device"""
-        # Method 1: Use AppleScript to send keystrokes
-        self.send_via_applescript(data)
-        
-        # Method 2: Future - actual virtual HID device
-        # self.send_via_virtual_device(data)
-        
-    def send_via_applescript(self, data):
-        """Send keystrokes via AppleScript (temporary solution)"""
+        """Send remapped HID data through the output backend"""
         if len(data) < 2:
             return
             
-        keycode = data[1]
-        
-        # Map our custom codes to AppleScript keystrokes
-        if keycode == 0x10:  # Start recording
-            os.system('osascript -e "tell application \\"System Events\\" to keystroke \\"r\\" using {command down, shift down}"')
-        elif keycode == 0x20:  # Stop recording
-            os.system('osascript -e "tell application \\"System Events\\" to keystroke \\"s\\" using {command down, shift down}"')
-        elif keycode == 0x40:  # Middle button
-            os.system('osascript -e "tell application \\"System Events\\" to keystroke \\"]\\\" using {command down, shift down}"')
-        elif keycode == 0x80:  # Long press control
-            os.system('osascript -e "tell application \\"System Events\\" to key code 126 using {control down}"')  # Ctrl+Up
-            
-        print(f"Sent keycode via AppleScript: 0x{keycode:02x}")
+        if data[1]:
+            self.metrics.count('keystrokes_sent')
+        self.output.send_report(data)
 
 if __name__ == "__main__":
     remapper = D01Remapper()
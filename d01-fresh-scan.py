@@ -3,120 +3,66 @@
 D01 Fresh Scanner - Try multiple detection methods
 """
 
-import subprocess
 import time
-import threading
+
+from d01_runtime import Runtime
 
 class D01FreshScanner:
     def __init__(self):
         self.running = False
         self.event_count = 0
+        # Every method's log stream is read on one event loop
+        self.runtime = Runtime('fresh-scan')
         
     def method1_bluetooth_hid(self):
         """Method 1: Monitor Bluetooth HID subsystem"""
         print("🔍 Method 1: Bluetooth HID monitoring...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem == "com.apple.bluetooth" AND category == "HID"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("BT-HID", line.strip())
-                    
-        except Exception as e:
-            print(f"Method 1 error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'subsystem == "com.apple.bluetooth" AND category == "HID"',
+            lambda line: self.log_event("BT-HID", line),
+            name="Method 1"
+        )
     
     def method2_window_server(self):
         """Method 2: Monitor WindowServer events"""
         print("🔍 Method 2: WindowServer event monitoring...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'process == "WindowServer" AND ('
-                'eventMessage CONTAINS "button" OR '
-                'eventMessage CONTAINS "key" OR '
-                'eventMessage CONTAINS "input"'
-                ')',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("WindowServer", line.strip())
-                    
-        except Exception as e:
-            print(f"Method 2 error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'process == "WindowServer" AND ('
+            'eventMessage CONTAINS "button" OR '
+            'eventMessage CONTAINS "key" OR '
+            'eventMessage CONTAINS "input"'
+            ')',
+            lambda line: self.log_event("WindowServer", line),
+            name="Method 2"
+        )
     
     def method3_hid_system(self):
         """Method 3: Monitor HID system events"""
         print("🔍 Method 3: HID system monitoring...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem == "com.apple.iokit" AND ('
-                'eventMessage CONTAINS "HID" OR '
-                'eventMessage CONTAINS "input"'
-                ')',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("HID-System", line.strip())
-                    
-        except Exception as e:
-            print(f"Method 3 error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'subsystem == "com.apple.iokit" AND ('
+            'eventMessage CONTAINS "HID" OR '
+            'eventMessage CONTAINS "input"'
+            ')',
+            lambda line: self.log_event("HID-System", line),
+            name="Method 3"
+        )
     
     def method4_keyboard_events(self):
         """Method 4: Monitor keyboard/input events"""
         print("🔍 Method 4: Keyboard event monitoring...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'eventMessage CONTAINS "keyCode" OR '
-                'eventMessage CONTAINS "keyDown" OR '
-                'eventMessage CONTAINS "keyUp" OR '
-                'eventMessage CONTAINS "systemDefined"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("Keyboard", line.strip())
-                    
-        except Exception as e:
-            print(f"Method 4 error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'eventMessage CONTAINS "keyCode" OR '
+            'eventMessage CONTAINS "keyDown" OR '
+            'eventMessage CONTAINS "keyUp" OR '
+            'eventMessage CONTAINS "systemDefined"',
+            lambda line: self.log_event("Keyboard", line),
+            name="Method 4"
+        )
     
     def log_event(self, method, line):
         """Log an event with timestamp"""
@@ -142,7 +88,7 @@ class D01FreshScanner:
         
         self.running = True
         
-        # Start all methods in separate threads
+        # Register all methods as sources of the runtime
         methods = [
             self.method1_bluetooth_hid,
             self.method2_window_server,
@@ -150,23 +96,19 @@ class D01FreshScanner:
             self.method4_keyboard_events
         ]
         
-        threads = []
         for method in methods:
-            thread = threading.Thread(target=method)
-            thread.daemon = True
-            threads.append(thread)
-            thread.start()
+            method()
         
-        try:
-            # Keep main thread alive
-            while self.running:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print(f"\n🛑 Stopping all scanners... Total events: {self.event_count}")
-            self.running = False
-            
-            # Wait a bit for threads to finish
-            time.sleep(1)
+        # Runs until Ctrl+C; the runtime's shutdown reaps every log stream, then reports
+        self.runtime.shutdown.on_stop(self.stop, 'scanners')
+        self.runtime.shutdown.on_stats(self.show_summary, 'summary')
+        self.runtime.run()
+    
+    def stop(self):
+        self.running = False
+    
+    def show_summary(self):
+        print(f"\n🛑 Stopped all scanners... Total events: {self.event_count}")
 
 def main():
     scanner = D01FreshScanner()
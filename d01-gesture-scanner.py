@@ -3,184 +3,121 @@
 D01 Gesture Scanner - Look for iOS-style gestures and touch events
 """
 
-import subprocess
 import time
-import threading
+
+from d01_gestures import GestureRecognizer, MOTION_REPORT_LENGTH
+from d01_runtime import Runtime
 
 class D01GestureScanner:
     def __init__(self):
         self.running = False
         self.event_count = 0
+        # Log streams and the motion reports are all read on one event loop
+        self.runtime = Runtime('gesture-scan')
         
     def monitor_touch_events(self):
         """Monitor for touch and gesture events"""
         print("🔍 Monitoring touch/gesture events...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'eventMessage CONTAINS "touch" OR '
-                'eventMessage CONTAINS "gesture" OR '
-                'eventMessage CONTAINS "swipe" OR '
-                'eventMessage CONTAINS "tap" OR '
-                'eventMessage CONTAINS "pinch" OR '
-                'eventMessage CONTAINS "rotate" OR '
-                'eventMessage CONTAINS "zoom"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("TOUCH/GESTURE", line.strip())
-                    
-        except Exception as e:
-            print(f"Touch monitoring error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'eventMessage CONTAINS "touch" OR '
+            'eventMessage CONTAINS "gesture" OR '
+            'eventMessage CONTAINS "swipe" OR '
+            'eventMessage CONTAINS "tap" OR '
+            'eventMessage CONTAINS "pinch" OR '
+            'eventMessage CONTAINS "rotate" OR '
+            'eventMessage CONTAINS "zoom"',
+            lambda line: self.log_event("TOUCH/GESTURE", line),
+            name="Touch monitoring"
+        )
     
     def monitor_multitouch_events(self):
         """Monitor multitouch framework events"""
         print("🔍 Monitoring multitouch events...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem CONTAINS "multitouch" OR '
-                'subsystem CONTAINS "MultitouchSupport" OR '
-                'eventMessage CONTAINS "MTDevice" OR '
-                'eventMessage CONTAINS "multitouch"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("MULTITOUCH", line.strip())
-                    
-        except Exception as e:
-            print(f"Multitouch monitoring error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'subsystem CONTAINS "multitouch" OR '
+            'subsystem CONTAINS "MultitouchSupport" OR '
+            'eventMessage CONTAINS "MTDevice" OR '
+            'eventMessage CONTAINS "multitouch"',
+            lambda line: self.log_event("MULTITOUCH", line),
+            name="Multitouch monitoring"
+        )
     
     def monitor_coremedia_events(self):
         """Monitor Core Media and AVFoundation events"""
         print("🔍 Monitoring Core Media events...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem CONTAINS "coremedia" OR '
-                'subsystem CONTAINS "avfoundation" OR '
-                'eventMessage CONTAINS "AVCapture" OR '
-                'eventMessage CONTAINS "camera" OR '
-                'eventMessage CONTAINS "media"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("COREMEDIA", line.strip())
-                    
-        except Exception as e:
-            print(f"Core Media monitoring error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'subsystem CONTAINS "coremedia" OR '
+            'subsystem CONTAINS "avfoundation" OR '
+            'eventMessage CONTAINS "AVCapture" OR '
+            'eventMessage CONTAINS "camera" OR '
+            'eventMessage CONTAINS "media"',
+            lambda line: self.log_event("COREMEDIA", line),
+            name="Core Media monitoring"
+        )
     
     def monitor_accessibility_events(self):
         """Monitor accessibility and assistive technology events"""
         print("🔍 Monitoring accessibility events...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem CONTAINS "accessibility" OR '
-                'eventMessage CONTAINS "AX" OR '
-                'eventMessage CONTAINS "VoiceOver" OR '
-                'eventMessage CONTAINS "assistive" OR '
-                'eventMessage CONTAINS "switch" OR '
-                'eventMessage CONTAINS "control"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("ACCESSIBILITY", line.strip())
-                    
-        except Exception as e:
-            print(f"Accessibility monitoring error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'subsystem CONTAINS "accessibility" OR '
+            'eventMessage CONTAINS "AX" OR '
+            'eventMessage CONTAINS "VoiceOver" OR '
+            'eventMessage CONTAINS "assistive" OR '
+            'eventMessage CONTAINS "switch" OR '
+            'eventMessage CONTAINS "control"',
+            lambda line: self.log_event("ACCESSIBILITY", line),
+            name="Accessibility monitoring"
+        )
     
     def monitor_iokit_events(self):
         """Monitor IOKit events for device-specific protocols"""
         print("🔍 Monitoring IOKit events...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem == "com.apple.iokit" AND ('
-                'eventMessage CONTAINS "AppleMultitouch" OR '
-                'eventMessage CONTAINS "AppleHID" OR '
-                'eventMessage CONTAINS "device" OR '
-                'eventMessage CONTAINS "report"'
-                ')',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("IOKIT", line.strip())
-                    
-        except Exception as e:
-            print(f"IOKit monitoring error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'subsystem == "com.apple.iokit" AND ('
+            'eventMessage CONTAINS "AppleMultitouch" OR '
+            'eventMessage CONTAINS "AppleHID" OR '
+            'eventMessage CONTAINS "device" OR '
+            'eventMessage CONTAINS "report"'
+            ')',
+            lambda line: self.log_event("IOKIT", line),
+            name="IOKit monitoring"
+        )
     
     def monitor_system_events(self):
         """Monitor System Events for custom gestures"""
         print("🔍 Monitoring System Events...")
         
-        try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'process == "System Events" OR '
-                'eventMessage CONTAINS "SystemEvents" OR '
-                'eventMessage CONTAINS "AppleScript" OR '
-                'eventMessage CONTAINS "automation"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if line.strip():
-                    self.log_event("SYSTEM_EVENTS", line.strip())
-                    
-        except Exception as e:
-            print(f"System Events monitoring error: {e}")
-        finally:
-            process.terminate()
+        self.runtime.add_log_stream(
+            'process == "System Events" OR '
+            'eventMessage CONTAINS "SystemEvents" OR '
+            'eventMessage CONTAINS "AppleScript" OR '
+            'eventMessage CONTAINS "automation"',
+            lambda line: self.log_event("SYSTEM_EVENTS", line),
+            name="System Events monitoring"
+        )
+    
+    def monitor_motion_reports(self):
+        """Recognize gestures directly from raw 30-byte motion reports"""
+        print("🔍 Monitoring raw motion reports...")
+        
+        def on_gesture(event):
+            self.log_event("GESTURE", f"{event['gesture']} gesture "
+                           f"(dx={event['dx']}, dy={event['dy']}, "
+                           f"{event['duration'] * 1000:.0f}ms)")
+        
+        # Single taps are released by the loop's scheduler once no double tap can follow
+        recognizer = GestureRecognizer(on_gesture=on_gesture, scheduler=self.runtime.scheduler)
+        # A tap still held back when the loop stops is reported, not dropped
+        self.runtime.shutdown.on_flush(lambda: recognizer.flush(float('inf')), 'pending tap')
+        
+        # D01 Pro; the recognizer runs on the loop, only the blocking read has a thread
+        self.runtime.add_hid(0x05AC, 0x022C, recognizer.process_report, length=MOTION_REPORT_LENGTH,
+                             name="Motion monitoring")
     
     def log_event(self, category, line):
         """Log an event with filtering for D01-related content"""
@@ -222,30 +159,30 @@ class D01GestureScanner:
         
         self.running = True
         
-        # Start all monitoring methods
+        # Register all monitoring methods as runtime sources
         methods = [
             self.monitor_touch_events,
             self.monitor_multitouch_events,
             self.monitor_coremedia_events,
             self.monitor_accessibility_events,
             self.monitor_iokit_events,
-            self.monitor_system_events
+            self.monitor_system_events,
+            self.monitor_motion_reports
         ]
         
-        threads = []
         for method in methods:
-            thread = threading.Thread(target=method)
-            thread.daemon = True
-            threads.append(thread)
-            thread.start()
+            method()
         
-        try:
-            while self.running:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print(f"\n🛑 Stopping gesture scanner... Found {self.event_count} relevant events")
-            self.running = False
-            time.sleep(1)
+        # Runs until Ctrl+C; the runtime's shutdown reaps every log stream, then reports
+        self.runtime.shutdown.on_stop(self.stop, 'scanners')
+        self.runtime.shutdown.on_stats(self.show_summary, 'summary')
+        self.runtime.run()
+    
+    def stop(self):
+        self.running = False
+    
+    def show_summary(self):
+        print(f"\n🛑 Stopped gesture scanner... Found {self.event_count} relevant events")
 
 def main():
     scanner = D01GestureScanner()
@@ -7,15 +7,31 @@ import subprocess
 import time
 import threading
 import json
-import os
 from collections import defaultdict
 
+from d01_log_supervisor import LogStreamSupervisor, log_command
+from d01_predicates import build_predicate
+from d01_hammerspoon_bridge import HammerspoonBridge, LISTENER_SCRIPT, format_event, lua_string
+from d01_shutdown import ShutdownCoordinator
+
+HID_KEYWORDS = [
+    'hid', 'keyboard', 'input', 'key', 'button', 
+    'report', 'press', 'release', 'event'
+]
+
+# Ignore noise from Bluetooth daemon
+NOISE_KEYWORDS = [
+    'desense', 'coex', 'wlan', 'wifi', 'usb', 'core0', 'core1',
+    'minimum nf value', 'connected usbs'
+]
+
 class D01HIDCapture:
     def __init__(self):
         self.device_address = "58:5E:42:B3:2C:66"
         self.running = False
         self.hid_events = []
         self.button_patterns = defaultdict(int)
+        self.shutdown = None
         
     def monitor_hid_events(self):
         """Monitor HID-specific events using system log"""
@@ -23,78 +39,57 @@ class D01HIDCapture:
         print("Press buttons on the D01 ring now!")
         print("Press Ctrl+C to stop and analyze\n")
         
-        try:
-            # Focus on HID input events specifically
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem CONTAINS "hid" OR '
-                'category CONTAINS "HID" OR '
-                'eventMessage CONTAINS "key" OR '
-                'eventMessage CONTAINS "input" OR '
-                'eventMessage CONTAINS "report"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            
-            self.running = True
-            event_count = 0
-            
-            for line in process.stdout:
-                if not self.running:
-                    break
-                    
-                line = line.strip()
-                if line and self.is_hid_input_event(line):
-                    event_count += 1
-                    timestamp = time.strftime('%H:%M:%S')
-                    
-                    print(f"[{timestamp}] HID Event #{event_count}")
-                    print(f"  {line}")
-                    
-                    # Store event
-                    event_data = {
-                        'timestamp': time.time(),
-                        'raw_line': line,
-                        'event_number': event_count
-                    }
-                    self.hid_events.append(event_data)
-                    
-                    # Extract key information
-                    if 'key' in line.lower():
-                        print(f"  🔑 KEY EVENT DETECTED")
-                    if 'report' in line.lower():
-                        print(f"  📊 HID REPORT DETECTED")
-                    if 'input' in line.lower():
-                        print(f"  📥 INPUT EVENT DETECTED")
-                        
-                    print("-" * 60)
-                    
-        except KeyboardInterrupt:
-            print(f"\n🛑 Stopping HID capture... Captured {len(self.hid_events)} events")
-            self.running = False
-            process.terminate()
+        # Only the ring's HID reports and button events, filtered by `log` itself
+        supervisor = LogStreamSupervisor(
+            build_predicate('capture'),
+            name='HID log',
+            keywords=HID_KEYWORDS
+        )
+        supervisor.subscribe(self.handle_hid_line)
+        
+        self.running = True
+        supervisor.start()
+        self.shutdown.on_stop(supervisor.stop, 'HID log')
+        self.shutdown.on_stats(lambda: print(f"📊 {supervisor.summary()}"), 'HID log summary')
+        
+        supervisor.run_until(self.shutdown.running, wakeup=self.shutdown.event)
+    
+    def handle_hid_line(self, line):
+        """Log stream subscriber: print and store HID input events"""
+        if not self.is_hid_input_event(line):
+            return
+        
+        event_count = len(self.hid_events) + 1
+        timestamp = time.strftime('%H:%M:%S')
+        
+        print(f"[{timestamp}] HID Event #{event_count}")
+        print(f"  {line}")
+        
+        # Store event
+        event_data = {
+            'timestamp': time.time(),
+            'raw_line': line,
+            'event_number': event_count
+        }
+        self.hid_events.append(event_data)
+        
+        # Extract key information
+        if 'key' in line.lower():
+            print(f"  🔑 KEY EVENT DETECTED")
+        if 'report' in line.lower():
+            print(f"  📊 HID REPORT DETECTED")
+        if 'input' in line.lower():
+            print(f"  📥 INPUT EVENT DETECTED")
             
-        except Exception as e:
-            print(f"Error monitoring HID events: {e}")
-            self.running = False
+        print("-" * 60)
     
     def is_hid_input_event(self, line):
         """Check if line contains HID input event"""
-        hid_keywords = [
-            'hid', 'keyboard', 'input', 'key', 'button', 
-            'report', 'press', 'release', 'event'
-        ]
-        
-        # Ignore noise from Bluetooth daemon
-        noise_keywords = [
-            'desense', 'coex', 'wlan', 'wifi', 'usb', 'core0', 'core1',
-            'minimum nf value', 'connected usbs'
-        ]
-        
         line_lower = line.lower()
         
         # Must contain HID keywords and not be noise
-        has_hid_keyword = any(keyword in line_lower for keyword in hid_keywords)
-        is_noise = any(keyword in line_lower for keyword in noise_keywords)
+        has_hid_keyword = any(keyword in line_lower for keyword in HID_KEYWORDS)
+        is_noise = any(keyword in line_lower for keyword in NOISE_KEYWORDS)
         
         return has_hid_keyword and not is_noise
     
@@ -102,93 +97,64 @@ class D01HIDCapture:
         """Use Hammerspoon to monitor events"""
         print("🔨 Starting Hammerspoon-based HID monitoring...")
         
-        # Create temporary Hammerspoon script
-        hammerspoon_script = '''
-        local function logEvent(event)
-            local eventType = event:getType()
-            local timestamp = os.date("%H:%M:%S")
-            
-            if eventType == hs.eventtap.event.types.keyDown then
-                local keyCode = event:getKeyCode()
-                print(string.format("[%s] KEY DOWN: %d", timestamp, keyCode))
-            elseif eventType == hs.eventtap.event.types.keyUp then
-                local keyCode = event:getKeyCode()
-                print(string.format("[%s] KEY UP: %d", timestamp, keyCode))
-            elseif eventType == hs.eventtap.event.types.systemDefined then
-                local systemKey = event:systemKey()
-                if systemKey then
-                    print(string.format("[%s] SYSTEM KEY: %d (%s)", 
-                          timestamp, systemKey.key, systemKey.down and "DOWN" or "UP"))
-                end
-            end
-            
-            return false  -- Don't consume the event
-        end
-        
-        local eventTap = hs.eventtap.new({
-            hs.eventtap.event.types.keyDown,
-            hs.eventtap.event.types.keyUp,
-            hs.eventtap.event.types.systemDefined
-        }, logEvent)
+        # Persistent bridge: the d01-bridge.lua listener streams events live
+        bridge = HammerspoonBridge()
+        if not bridge.start():
+            return
         
-        eventTap:start()
-        print("Hammerspoon event monitoring started. Press buttons on D01 ring.")
-        '''
+        def on_event(message):
+            line = format_event(message)
+            print(line)
+            self.hid_events.append({
+                'timestamp': message.get('ts', time.time()),
+                'raw_line': line,
+                'event_number': len(self.hid_events) + 1,
+                'bridge_event': message
+            })
         
-        # Write to temporary file
-        script_path = "/tmp/d01_monitor.lua"
-        with open(script_path, 'w') as f:
-            f.write(hammerspoon_script)
+        bridge.add_listener(on_event)
         
         try:
-            # Execute via Hammerspoon
-            result = subprocess.run([
-                'hs', '-c', f'dofile("{script_path}")'
-            ], capture_output=True, text=True, timeout=30)
+            if not bridge.wait_connected(3):
+                # Load the listener into the running Hammerspoon once; it stays resident
+                print("Loading d01-bridge.lua into Hammerspoon...")
+                if not bridge.load_listener() or not bridge.wait_connected(5):
+                    print("Hammerspoon listener did not connect. Add this to ~/.hammerspoon/init.lua:")
+                    print(f'  dofile({lua_string(LISTENER_SCRIPT)})')
+                    return
             
-            print("Hammerspoon output:")
-            print(result.stdout)
-            if result.stderr:
-                print("Errors:")
-                print(result.stderr)
+            print("Hammerspoon event monitoring started. Press buttons on D01 ring.")
+            self.running = True
+            self.shutdown.wait()
+            print(f"\n🛑 Stopping Hammerspoon monitoring... {bridge.stats['events']} events received")
                 
-        except subprocess.TimeoutExpired:
-            print("Hammerspoon monitoring timed out")
-        except FileNotFoundError:
-            print("Hammerspoon CLI not found. Install with: brew install hammerspoon")
         finally:
-            # Clean up
-            if os.path.exists(script_path):
-                os.remove(script_path)
+            bridge.stop()
     
     def monitor_input_method(self):
         """Monitor using Input Method framework"""
         print("⌨️  Monitoring using Input Method events...")
         
-        try:
-            # Monitor for input method events
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'subsystem CONTAINS "inputmethod" OR '
-                'subsystem CONTAINS "TextInput" OR '
-                'process == "TextInputMenuAgent"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
-            
-            self.running = True
-            
-            for line in process.stdout:
-                if not self.running:
-                    break
-                    
-                if line.strip():
-                    timestamp = time.strftime('%H:%M:%S')
-                    print(f"[{timestamp}] {line.strip()}")
-                    
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping Input Method monitoring...")
-            self.running = False
-            process.terminate()
+        # Monitor for input method events
+        process = subprocess.Popen(log_command() + [
+            'stream', '--predicate',
+            'subsystem CONTAINS "inputmethod" OR '
+            'subsystem CONTAINS "TextInput" OR '
+            'process == "TextInputMenuAgent"',
+            '--style', 'compact'
+        ], stdout=subprocess.PIPE, text=True)
+        # Reaped on every exit path; terminating it is also what ends the read below
+        self.shutdown.add_process(process)
+        
+        self.running = True
+        
+        for line in process.stdout:
+            if not self.running:
+                break
+                
+            if line.strip():
+                timestamp = time.strftime('%H:%M:%S')
+                print(f"[{timestamp}] {line.strip()}")
     
     def direct_key_monitoring(self):
         """Direct key event monitoring using multiple approaches"""
@@ -196,34 +162,46 @@ class D01HIDCapture:
         print("This will try multiple methods simultaneously")
         print("Press buttons on the D01 ring and watch for events\n")
         
-        # Start multiple monitoring threads
-        threads = []
-        
-        # Method 1: HID events
-        thread1 = threading.Thread(target=self.monitor_hid_events)
-        thread1.daemon = True
-        threads.append(thread1)
+        # Method 1: HID events, Method 2: Input Method events
+        self.run_sources([self.monitor_hid_events, self.monitor_input_method])
+    
+    def run_sources(self, methods):
+        """Each source on its own thread; the main thread only waits for shutdown"""
+        remaining = [len(methods)]
+        lock = threading.Lock()
         
-        # Method 2: Input Method events  
-        thread2 = threading.Thread(target=self.monitor_input_method)
-        thread2.daemon = True
-        threads.append(thread2)
+        def run(method):
+            try:
+                method()
+            except Exception as e:
+                print(f"Error in {method.__name__}: {e}")
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    if not remaining[0]:
+                        self.shutdown.request('sources ended')
         
-        # Start all threads
-        for thread in threads:
+        for method in methods:
+            thread = threading.Thread(target=run, args=(method,), daemon=True)
+            self.shutdown.add_thread(thread)
             thread.start()
         
-        try:
-            # Keep main thread alive
-            while self.running:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping all monitoring threads...")
-            self.running = False
+        self.shutdown.wait()
+    
+    def stop(self):
+        """Shutdown stop phase: readers drop whatever arrives from here on"""
+        self.running = False
+        print(f"\n🛑 Stopping HID capture... Captured {len(self.hid_events)} events")
+    
+    def save_captured_events(self):
+        """Shutdown flush phase: write the capture before anything analyses it"""
+        if not self.hid_events:
+            return
         
-        # Wait for threads to finish
-        for thread in threads:
-            thread.join(timeout=1)
+        filename = f"d01_hid_events_{int(time.time())}.json"
+        with open(filename, 'w') as f:
+            json.dump({'device_address': self.device_address, 'events': list(self.hid_events)}, f, indent=2)
+        print(f"💾 {len(self.hid_events)} captured events saved to: {filename}")
     
     def analyze_captured_events(self):
         """Analyze captured HID events"""
@@ -259,18 +237,22 @@ class D01HIDCapture:
         print(f"Method: {method}")
         print("Make sure to press buttons on your D01 ring!\n")
         
-        try:
+        # Ctrl+C, SIGTERM, an error or a source ending all run the same shutdown:
+        # stop sources, reap `log`, join readers, save the capture, then analyse it
+        with ShutdownCoordinator('HID capture') as shutdown:
+            self.shutdown = shutdown
+            shutdown.on_stop(self.stop, 'capture')
+            shutdown.on_flush(self.save_captured_events, 'captured events')
+            shutdown.on_stats(self.analyze_captured_events, 'analysis')
+            
             if method == 'hid':
-                self.monitor_hid_events()
+                self.run_sources([self.monitor_hid_events])
             elif method == 'hammerspoon':
-                self.monitor_with_hammerspoon()
+                self.run_sources([self.monitor_with_hammerspoon])
             elif method == 'input':
-                self.monitor_input_method()
+                self.run_sources([self.monitor_input_method])
             elif method == 'all':
                 self.direct_key_monitoring()
-                
-        finally:
-            self.analyze_captured_events()
 
 def main():
     print("🔬 D01 HID Event Capture")
@@ -9,6 +9,8 @@ import json
 import re
 from collections import defaultdict
 
+from d01_calibration import split_presses
+
 class D01HIDParser:
     def __init__(self):
         self.running = False
@@ -186,12 +188,13 @@ class D01HIDParser:
                     avg_press_time = sum(press_times) / len(press_times)
                     print(f"✅ Average button press duration: {avg_press_time:.3f} seconds")
                     
-                    # Categorize presses
-                    short_presses = [t for t in press_times if t < 0.5]
-                    long_presses = [t for t in press_times if t >= 0.5]
+                    # Categorize presses (split fitted to this capture when it shows two clusters)
+                    threshold, short_presses, long_presses, calibrated = split_presses(press_times)
+                    if calibrated:
+                        print(f"🎚️  Fitted long-press threshold: {threshold:.2f}s")
                     
-                    print(f"📊 Short presses (< 0.5s): {len(short_presses)}")
-                    print(f"📊 Long presses (≥ 0.5s): {len(long_presses)}")
+                    print(f"📊 Short presses (< {threshold:.2f}s): {len(short_presses)}")
+                    print(f"📊 Long presses (≥ {threshold:.2f}s): {len(long_presses)}")
         else:
             print("❌ No button events captured")
             print("💡 Try pressing different buttons on the D01 ring")
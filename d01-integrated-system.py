@@ -7,10 +7,45 @@ Combines HID signal capture with button remapping functionality
 import subprocess
 import time
 import json
-import re
 import threading
 import os
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from d01_devices import BOUNCE, DUPLICATE, DeviceMultiplexer, DevicePipeline, PRESS, load_device_profiles, routable
+from d01_gestures import gesture_config_keys, MOTION_REPORT_LENGTH
+from d01_hammerspoon_bridge import DEFAULT_SOCKET, HammerspoonBridge, script_to_action
+from d01_log_ingest import EVENT_MARKERS, classify_message
+from d01_log_supervisor import LogStreamSupervisor, log_command
+from d01_macros import MacroEngine
+from d01_predicates import build_predicate
+from d01_scheduler import TimerScheduler
+from d01_metrics import StageMetrics, MetricsServer, metrics_enabled
+from d01_log_shipper import shipper_from_config
+from d01_flight_recorder import FlightRecorder
+from d01_calibration import save_calibration, split_presses
+from d01_shutdown import ShutdownCoordinator
+
+# AppleScript per catalog action, by category
+ACTION_SCRIPTS = {
+    'WisprFlow Actions': {
+        'Start Recording': 'tell application "System Events" to keystroke "r" using {command down, shift down}',
+        'Stop Recording': 'tell application "System Events" to keystroke "s" using {command down, shift down}',
+        'WisprFlow Control (Up Chevron)': 'tell application "System Events" to key code 126 using {control down}',
+        'Toggle Recording': 'tell application "System Events" to keystroke space using {command down, shift down}',
+    },
+    'Application Control': {
+        'Termius Next Tab': 'tell application "System Events" to keystroke "]" using {command down, shift down}',
+        'Next Tab (Cmd+Shift+])': 'tell application "System Events" to keystroke "]" using {command down, shift down}',
+        'Previous Tab (Cmd+Shift+[)': 'tell application "System Events" to keystroke "[" using {command down, shift down}',
+    },
+    'Keyboard Shortcuts': {
+        'Cmd+C (Copy)': 'tell application "System Events" to keystroke "c" using command down',
+        'Cmd+V (Paste)': 'tell application "System Events" to keystroke "v" using command down',
+        'Return (Enter)': 'tell application "System Events" to key code 36',
+        'Escape': 'tell application "System Events" to key code 53',
+    }
+}
 
 class D01IntegratedSystem:
     def __init__(self):
@@ -20,11 +55,55 @@ class D01IntegratedSystem:
         self.hid_reports = []
         self.button_events = []
         self.active_remapping = True
+        self.shutdown = None
+        
+        # One isolated pipeline (state machines + config profile) per ring
+        self.pipelines = [DevicePipeline(profile) for profile in load_device_profiles(self.config)]
+        self.default_pipeline = self.pipelines[0]
+        
+        # Per-stage instrumentation (no-op unless enabled)
+        self.metrics = StageMetrics('integrated', enabled=metrics_enabled(self.config))
+        self.metrics_server = None
+        
+        # Optional log-server.js feed (D01_LOG_SERVER or settings.log_server_url)
+        self.shipper = shipper_from_config('d01-integrated', self.config)
+        
+        # Always-on history of lines, events and actions (dump: kill -USR1, error, control socket)
+        settings = self.config.get('settings', {})
+        self.recorder = FlightRecorder('integrated', capacity=settings.get('flight_recorder_events', 4096),
+                                       seconds=settings.get('flight_recorder_seconds', 60))
+        
+        # Optional Hammerspoon bridge: keystrokes without an osascript per action
+        self.bridge = None
+        if self.config.get('settings', {}).get('enable_hammerspoon_bridge', False):
+            self.bridge = HammerspoonBridge(self.config['settings'].get('hammerspoon_socket', DEFAULT_SOCKET))
+            if not self.bridge.start():
+                self.bridge = None
         
-        # Button state tracking
-        self.button_states = {}
-        self.press_times = {}
-        self.long_press_threshold = self.config.get('settings', {}).get('long_press_threshold', 800) / 1000
+        # Actions (osascript can take 100ms+) run here, never on a reader or the selector loop;
+        # one worker keeps them in press order
+        self.actions = ThreadPoolExecutor(max_workers=1, thread_name_prefix='d01-actions')
+        
+        # Multi-step Custom Commands, compiled once; delays run on the scheduler
+        self.scheduler = TimerScheduler()
+        self.scheduler.start()
+        self.macros = MacroEngine(self.scheduler, resolve=self.applescript_for, metrics=self.metrics,
+                                  bridge=self.bridge)
+        self.macros.compile_config(self.config)
+        self.mapping_macros = {}
+        for pipeline in self.pipelines:
+            # Confirmed edges arrive after the minimum hold/release time, from the scheduler
+            pipeline.debouncer.scheduler = self.scheduler
+            pipeline.debouncer.on_edge = (lambda old_state, new_state, timestamp, pipeline=pipeline:
+                                          self.handle_debounced_state(old_state, new_state, timestamp, pipeline))
+            # A single tap is released after the double-tap window, from the scheduler
+            pipeline.gesture_recognizer.scheduler = self.scheduler
+            pipeline.gesture_recognizer.on_gesture = (lambda event, pipeline=pipeline:
+                                                      self.handle_gesture(event, pipeline))
+            for section in ('buttons', 'gestures'):
+                for mapping in pipeline.config.get(section, {}).values():
+                    if mapping.get('category') == 'Custom Commands':
+                        self.macro_for(mapping)
         
     def load_config(self):
         """Load button mapping configuration"""
@@ -35,10 +114,21 @@ class D01IntegratedSystem:
                 'top': {'action': 'Stop Recording', 'category': 'WisprFlow Actions'},
                 'middle': {'action': 'Termius Next Tab', 'category': 'Application Control'},
             },
+            'gestures': {
+                'diagonal_swipe': {'action': 'Return (Enter)', 'category': 'Keyboard Shortcuts'},
+                'double_tap': {'action': 'Escape', 'category': 'Keyboard Shortcuts'},
+            },
             'settings': {
                 'long_press_threshold': 800,
+                'double_tap_threshold': 300,
+                'swipe_sensitivity': 30,
+                'enable_gestures': True,
                 'enable_visual_feedback': True,
-                'enable_capture_mode': False
+                'enable_capture_mode': False,
+                'log_style': 'compact',
+                'correlation_window_ms': 80,
+                'debounce': {'hold_ms': 10, 'release_ms': 20},
+                'auto_calibrate_long_press': False
             }
         }
         
@@ -62,6 +152,19 @@ class D01IntegratedSystem:
         print("=" * 50)
         print()
         
+        # Expose stage metrics locally when instrumentation is on
+        if self.metrics.enabled:
+            port = self.config.get('settings', {}).get('metrics_port', 9464)
+            self.metrics_server = MetricsServer(port)
+            self.recorder.add_routes(self.metrics_server)
+            self.metrics_server.start()
+        
+        self.recorder.install_signal()
+        try:
+            print(f"📼 Flight recorder: kill -USR1 {os.getpid()} or {self.recorder.serve_control()}")
+        except OSError as e:
+            print(f"Flight recorder control socket unavailable: {e}")
+        
         # Check mode
         capture_mode = self.config.get('settings', {}).get('enable_capture_mode', False)
         
@@ -79,36 +182,52 @@ class D01IntegratedSystem:
         print("The system will learn the button patterns")
         print("Press Ctrl+C to stop and see analysis\n")
         
-        try:
+        # Reading happens on a thread so Ctrl+C never waits for the next log line
+        with ShutdownCoordinator('D01 capture') as shutdown:
+            self.shutdown = shutdown
+            shutdown.on_stop(self.stop_capture, 'capture')
+            shutdown.on_flush(self.recorder.close, 'flight recorder')
+            shutdown.on_stats(self.show_capture_analysis, 'analysis')
+            
             # Monitor for HID reports and button events
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'eventMessage CONTAINS "Received input report indication" OR '
-                'eventMessage CONTAINS "buttonState changed" OR '
-                'eventMessage CONTAINS "Process button state"',
+            process = shutdown.add_process(subprocess.Popen(log_command() + [
+                'stream', '--predicate', build_predicate('capture'),
                 '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
+            ], stdout=subprocess.PIPE, text=True))
             
             self.running = True
-            report_count = 0
-            
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                line = line.strip()
-                if line:
-                    result = self.analyze_hid_line(line)
-                    if result:
-                        report_count += 1
-                        print(f"Event #{report_count}: {result}")
-                        
-        except KeyboardInterrupt:
-            print(f"\n🛑 Capture complete! Analyzed {len(self.button_events)} button events")
-            self.running = False
-            process.terminate()
-            self.show_capture_analysis()
+            reader = shutdown.add_thread(threading.Thread(target=self.read_capture, args=(process,)))
+            reader.daemon = True
+            reader.start()
+            shutdown.wait()
+    
+    def read_capture(self, process):
+        """Classify capture lines until shutdown or the end of the stream"""
+        report_count = 0
+        metrics = self.metrics
+        
+        while self.running:
+            started = metrics.start()
+            line = process.stdout.readline()
+            metrics.observe('pipe_read', started)
+            if not line:
+                break
+                
+            line = line.strip()
+            if line:
+                started = metrics.start()
+                result = self.analyze_hid_line(line)
+                metrics.observe('classify', started)
+                if result:
+                    report_count += 1
+                    print(f"Event #{report_count}: {result}")
+        
+        self.shutdown.request('log stream ended')
+    
+    def stop_capture(self):
+        """Shutdown stop phase for capture mode"""
+        self.running = False
+        print(f"\n🛑 Capture complete! Analyzed {len(self.button_events)} button events")
     
     def start_remapping_mode(self):
         """Start active button remapping"""
@@ -118,137 +237,295 @@ class D01IntegratedSystem:
             print(f"  {button}: {config['action']}")
         print()
         
-        # Start HID monitoring in background for remapping
-        hid_thread = threading.Thread(target=self.monitor_for_remapping)
-        hid_thread.daemon = True
-        hid_thread.start()
+        self.running = True
         
-        try:
-            while self.running:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping D01 remapping system...")
-            self.running = False
+        # One shutdown path for Ctrl+C, SIGTERM and errors: stop sources and timers,
+        # reap `log`, join readers, flush recorder/calibration/shipper, then report
+        with ShutdownCoordinator('D01 remapping') as shutdown:
+            self.shutdown = shutdown
+            shutdown.on_stop(self.stop_remapping, 'sources')
+            # Queued actions are dropped, a running one is allowed to finish
+            shutdown.add_step('join', lambda: self.actions.shutdown(wait=True, cancel_futures=True), 'actions')
+            shutdown.on_flush(self.recorder.close, 'flight recorder')
+            shutdown.on_flush(self.save_calibrations, 'calibration')
+            if self.shipper:
+                shutdown.on_flush(self.shipper.close, 'log shipper')
+            if self.bridge:
+                shutdown.on_flush(self.bridge.stop, 'Hammerspoon bridge')
+            shutdown.on_stats(self.show_shutdown_stats, 'stats')
+            # Last: a calibration save queued on it must not be dropped
+            shutdown.on_stats(self.scheduler.stop, 'scheduler')
+            
+            # Start HID monitoring in background for remapping
+            if routable([pipeline.match for pipeline in self.pipelines]):
+                print(f"Serving {len(self.pipelines)} rings: " +
+                      ", ".join(f"{p.name} [{p.address}]" for p in self.pipelines))
+                hid_thread = threading.Thread(target=self.monitor_devices)
+            else:
+                if len(self.pipelines) > 1:
+                    # Button lines can't be told apart; motion reports are still per ring (HID serial)
+                    print(f"⚠️  Rings need their own 'match' text to route log button events - "
+                          f"all go to {self.default_pipeline.name}")
+                hid_thread = threading.Thread(target=self.monitor_for_remapping)
+            hid_thread.daemon = True
+            shutdown.add_thread(hid_thread)
+            hid_thread.start()
+            
+            # Raw motion reports feed the gesture recognizer
+            if self.config.get('settings', {}).get('enable_gestures', True):
+                motion_thread = threading.Thread(target=self.monitor_motion_reports)
+                motion_thread.daemon = True
+                shutdown.add_thread(motion_thread)
+                motion_thread.start()
+            
+            shutdown.wait()
+    
+    def stop_remapping(self):
+        """Shutdown stop phase: every monitor loop ends on its next check"""
+        print("\n🛑 Stopping D01 remapping system...")
+        self.running = False
+    
+    def save_calibrations(self):
+        for pipeline in self.pipelines:
+            if pipeline.calibrator.unsaved:
+                pipeline.calibrator.unsaved = 0
+                save_calibration(self.config_file, pipeline.address, pipeline.calibrator)
+    
+    def show_shutdown_stats(self):
+        for pipeline in self.pipelines:
+            print(f"Debounce ({pipeline.name}): {pipeline.debouncer.summary()}")
+        if self.shipper:
+            print(f"Log server: {self.shipper.summary()}")
     
     def monitor_for_remapping(self):
         """Monitor HID events for active remapping"""
+        # 'compact' or 'ndjson' - both parse to the same typed events
+        style = self.config.get('settings', {}).get('log_style', 'compact')
+        supervisor = LogStreamSupervisor(
+            self.default_pipeline.predicate(),
+            name='remapping', style=style, keywords=EVENT_MARKERS, metrics=self.metrics
+        )
+        
+        def on_event(event):
+            self.recorder.record('event', event)
+            if event['type'] == 'button_event':
+                self.metrics.count('button_events')
+                try:
+                    self.handle_button_state(event['old_state'], event['new_state'])
+                except Exception as e:
+                    self.recorder.dump_on_error(e)
+                    raise
+        
+        supervisor.subscribe(lambda line: self.recorder.record('line', line))
+        supervisor.subscribe_events(on_event)
+        self.running = True
+        supervisor.start()
+        supervisor.run_until(lambda: self.running, wakeup=self.shutdown.event if self.shutdown else None)
+    
+    def monitor_devices(self):
+        """Serve every configured ring from one selector loop"""
+        multiplexer = DeviceMultiplexer()
+        processes = []
+        
         try:
-            process = subprocess.Popen([
-                'log', 'stream', '--predicate',
-                'eventMessage CONTAINS "buttonState changed"',
-                '--style', 'compact'
-            ], stdout=subprocess.PIPE, text=True)
+            for pipeline in self.pipelines:
+                # Each ring gets its own narrowed log stream reader
+                process = subprocess.Popen(log_command() + [
+                    'stream', '--predicate', pipeline.predicate(shared=False),
+                    '--style', 'compact'
+                ], stdout=subprocess.PIPE)
+                processes.append(process)
+                if self.shutdown:
+                    self.shutdown.add_process(process)
+                
+                def on_line(line, pipeline=pipeline):
+                    self.metrics.count('lines_read')
+                    self.recorder.record('line', line)
+                    if "buttonState changed" in line:
+                        self.handle_button_event(line, pipeline)
+                
+                multiplexer.add_source(process.stdout, on_line)
             
-            self.running = True
+            if self.shutdown:
+                multiplexer.add_wakeup(self.shutdown.wakeup_fd)
+            multiplexer.run(lambda: self.running)
+            
+        except Exception as e:
+            print(f"Error in multi-device monitor: {e}")
+            self.recorder.dump_on_error(e)
+        finally:
+            multiplexer.close()
+            for process in processes:
+                process.terminate()
+    
+    def monitor_motion_reports(self):
+        """Read raw HID reports from every ring and recognize gestures from motion data"""
+        try:
+            import hid
+        except ImportError:
+            print("hidapi not installed - gesture recognition disabled (pip3 install hidapi)")
+            return
+        
+        readers = [threading.Thread(target=self.read_motion_reports, args=(hid, pipeline), daemon=True)
+                   for pipeline in self.pipelines]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+    
+    def motion_device_path(self, hid, pipeline):
+        """HID path of a ring: matched by serial (its Bluetooth address) when rings share VID/PID"""
+        devices = hid.enumerate(pipeline.vendor_id, pipeline.product_id)
+        address = pipeline.address.lower().replace('-', ':')
+        for info in devices:
+            if (info.get('serial_number') or '').lower().replace('-', ':') == address:
+                return info['path']
+        
+        same_ids = [other for other in self.pipelines
+                    if (other.vendor_id, other.product_id) == (pipeline.vendor_id, pipeline.product_id)]
+        if devices and len(same_ids) == 1:
+            return devices[0]['path']
+        return None
+    
+    def read_motion_reports(self, hid, pipeline):
+        """One ring's motion reports into its own gesture recognizer"""
+        device = None
+        try:
+            path = self.motion_device_path(hid, pipeline)
+            if path is None:
+                print(f"Gesture monitor unavailable for {pipeline.name}: no HID device for [{pipeline.address}]")
+                return
+            
+            device = hid.device()
+            device.open_path(path)
             
             while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                    
-                if "buttonState changed" in line:
-                    self.handle_button_event(line)
+                report = device.read(64, timeout_ms=100)
+                if report and len(report) == MOTION_REPORT_LENGTH:
+                    self.handle_motion_report(report, pipeline=pipeline)
                     
         except Exception as e:
-            print(f"Error in remapping monitor: {e}")
+            print(f"Gesture monitor unavailable for {pipeline.name}: {e}")
         finally:
-            process.terminate()
+            if device:
+                device.close()
+    
+    def handle_motion_report(self, report, timestamp=None, pipeline=None):
+        """Feed a raw motion report to the ring's gesture recognizer"""
+        pipeline = pipeline or self.default_pipeline
+        started = self.metrics.start()
+        # Recognized gestures arrive in handle_gesture through on_gesture
+        events = pipeline.gesture_recognizer.process_report(report, timestamp)
+        self.metrics.observe('gesture', started)
+        return events
+    
+    def handle_gesture(self, event, pipeline=None):
+        """Execute the action mapped to a recognized gesture"""
+        pipeline = pipeline or self.default_pipeline
+        self.metrics.count('gestures')
+        gestures = pipeline.config.get('gestures', {})
+        
+        for key in gesture_config_keys(event['gesture']):
+            if gestures.get(key, {}).get('action'):
+                self.dispatch_action(self.execute_mapping, gestures[key],
+                                     event['gesture'].replace('_', ' ').title())
+                return
+        
+        print(f"Gesture {event['gesture']} has no mapping")
     
     def analyze_hid_line(self, line):
         """Analyze HID line and return structured data"""
-        timestamp = time.time()
+        event = classify_message(line)
+        if not event:
+            return None
+        event['timestamp'] = time.time()
         
-        if "Received input report indication" in line:
-            # Parse HID report
-            handle_match = re.search(r'handle=(\d+)', line)
-            length_match = re.search(r'length=(\d+)', line)
-            
-            if handle_match and length_match:
-                handle = handle_match.group(1)
-                length = int(length_match.group(1))
-                
-                report_data = {
-                    'type': 'hid_report',
-                    'timestamp': timestamp,
-                    'handle': handle,
-                    'length': length
-                }
-                
-                self.hid_reports.append(report_data)
-                return f"HID Report - Handle: {handle}, Length: {length} bytes"
-                
-        elif "buttonState changed" in line:
-            # Parse button state change
-            state_match = re.search(r'buttonState changed \((\d+)->(\d+)\)', line)
-            if state_match:
-                old_state = int(state_match.group(1))
-                new_state = int(state_match.group(2))
-                
-                button_event = {
-                    'type': 'button_event',
-                    'timestamp': timestamp,
-                    'old_state': old_state,
-                    'new_state': new_state,
-                    'action': 'press' if new_state > old_state else 'release'
-                }
-                
-                self.button_events.append(button_event)
-                
-                action = "PRESS" if new_state > old_state else "RELEASE"
-                return f"Button {action} - State: {old_state}→{new_state}"
+        if event['type'] == 'hid_report':
+            self.hid_reports.append(event)
+            return f"HID Report - Handle: {event['handle']}, Length: {event['length']} bytes"
         
-        return None
+        self.button_events.append(event)
+        return f"Button {event['action'].upper()} - State: {event['old_state']}→{event['new_state']}"
     
-    def handle_button_event(self, line):
+    def handle_button_event(self, line, pipeline=None):
         """Handle button event for remapping"""
-        state_match = re.search(r'buttonState changed \((\d+)->(\d+)\)', line)
-        if not state_match:
+        started = self.metrics.start()
+        event = classify_message(line)
+        self.metrics.observe('classify', started)
+        if not event or event['type'] != 'button_event':
             return
-            
-        old_state = int(state_match.group(1))
-        new_state = int(state_match.group(2))
-        current_time = time.time()
         
-        if new_state > old_state:
+        self.metrics.count('button_events')
+        self.handle_button_state(event['old_state'], event['new_state'], pipeline)
+    
+    def handle_button_state(self, old_state, new_state, pipeline=None, source='log', timestamp=None):
+        """Run a button state transition through the ring's press state machine"""
+        pipeline = pipeline or self.default_pipeline
+        
+        result = pipeline.observe_transition(old_state, new_state, source, timestamp)
+        if result == DUPLICATE:
+            self.metrics.count('duplicates_suppressed')
+        elif result == BOUNCE:
+            self.metrics.count('bounces_suppressed')
+    
+    def handle_debounced_state(self, old_state, new_state, timestamp, pipeline):
+        """Advance the press state machine with a confirmed edge (stamped when first seen)"""
+        started = self.metrics.start()
+        
+        result = pipeline.process_transition(old_state, new_state, timestamp)
+        self.metrics.observe('press_state', started)
+        
+        if result == PRESS:
             # Button pressed
-            self.button_states['last_button'] = 'pressing'
-            self.press_times['last_button'] = current_time
-            
-            if self.config.get('settings', {}).get('enable_visual_feedback', True):
-                self.show_notification("D01: Button Pressed")
+            if pipeline.config.get('settings', {}).get('enable_visual_feedback', True):
+                self.dispatch_action(self.show_notification, "D01: Button Pressed")
                 
-        else:
-            # Button released
-            if 'last_button' in self.press_times:
-                press_duration = current_time - self.press_times['last_button']
-                
-                # Determine button type based on duration
-                if press_duration >= self.long_press_threshold:
-                    button_type = 'bottom_long'
-                    action_name = "Long Press"
-                else:
-                    button_type = 'bottom_short'  # Assume bottom for now
-                    action_name = "Short Press"
-                
-                # Execute mapped action
-                self.execute_button_action(button_type, action_name)
-                
-                # Clean up
-                del self.press_times['last_button']
-                if 'last_button' in self.button_states:
-                    del self.button_states['last_button']
+        elif result:
+            # Button released - execute mapped action
+            button_type, action_name, _ = result
+            self.dispatch_action(self.execute_button_action, button_type, action_name, pipeline)
+            
+            # Persist the learned press durations now and then, off the input path
+            if pipeline.calibrator.unsaved >= 10:
+                pipeline.calibrator.unsaved = 0
+                self.scheduler.call_later(0, save_calibration, self.config_file,
+                                          pipeline.address, pipeline.calibrator)
+    
+    def dispatch_action(self, action, *args):
+        """Hand an action to the action worker so one slow osascript never stalls a ring"""
+        try:
+            self.actions.submit(self.run_action, action, *args)
+        except RuntimeError:
+            pass  # Shutting down: the action executor no longer takes work
     
-    def execute_button_action(self, button_type, action_name):
+    def run_action(self, action, *args):
+        try:
+            action(*args)
+        except Exception as e:
+            print(f"Error executing action: {e}")
+            self.recorder.dump_on_error(e)
+    
+    def execute_button_action(self, button_type, action_name, pipeline=None):
         """Execute the configured action for a button"""
-        button_config = self.config['buttons'].get(button_type, {})
-        action = button_config.get('action')
-        category = button_config.get('category')
+        config = (pipeline or self.default_pipeline).config
+        button_config = config['buttons'].get(button_type, {})
         
-        if not action:
+        if not button_config.get('action'):
             print(f"No action configured for {button_type}")
             return
-            
+        
+        self.execute_mapping(button_config, action_name)
+    
+    def execute_mapping(self, mapping, action_name):
+        """Execute a configured {action, category} mapping"""
+        action = mapping.get('action', mapping.get('macro'))
+        category = mapping.get('category')
+        
         print(f"🎯 Executing: {action_name} → {action}")
+        self.metrics.count('actions_executed')
+        self.recorder.record('action', {'button': action_name, 'action': action, 'category': category})
+        if self.shipper:
+            self.shipper.log('info', f"{action_name} → {action}", {'action': action, 'category': category})
         
         # Execute via AppleScript based on category
         if category == 'WisprFlow Actions':
@@ -257,6 +534,12 @@ class D01IntegratedSystem:
             self.execute_app_control(action)
         elif category == 'Keyboard Shortcuts':
             self.execute_keyboard_shortcut(action)
+        elif category == 'Custom Commands':
+            macro = self.macro_for(mapping)
+            if macro:
+                self.macros.run(macro)
+            else:
+                print(f"Unknown macro: {mapping.get('macro')}")
             
         # Show feedback
         if self.config.get('settings', {}).get('enable_visual_feedback', True):
@@ -264,48 +547,53 @@ class D01IntegratedSystem:
     
     def execute_wisprflow_action(self, action):
         """Execute WisprFlow actions"""
-        wisprflow_commands = {
-            'Start Recording': 'tell application "System Events" to keystroke "r" using {command down, shift down}',
-            'Stop Recording': 'tell application "System Events" to keystroke "s" using {command down, shift down}',
-            'WisprFlow Control (Up Chevron)': 'tell application "System Events" to key code 126 using {control down}',
-            'Toggle Recording': 'tell application "System Events" to keystroke space using {command down, shift down}',
-        }
-        
-        if action in wisprflow_commands:
-            self.run_applescript(wisprflow_commands[action])
+        if action in ACTION_SCRIPTS['WisprFlow Actions']:
+            self.run_applescript(ACTION_SCRIPTS['WisprFlow Actions'][action])
     
     def execute_app_control(self, action):
         """Execute application control actions"""
-        app_commands = {
-            'Termius Next Tab': 'tell application "System Events" to keystroke "]" using {command down, shift down}',
-            'Next Tab (Cmd+Shift+])': 'tell application "System Events" to keystroke "]" using {command down, shift down}',
-            'Previous Tab (Cmd+Shift+[)': 'tell application "System Events" to keystroke "[" using {command down, shift down}',
-        }
-        
-        if action in app_commands:
-            self.run_applescript(app_commands[action])
+        if action in ACTION_SCRIPTS['Application Control']:
+            self.run_applescript(ACTION_SCRIPTS['Application Control'][action])
     
     def execute_keyboard_shortcut(self, action):
         """Execute keyboard shortcuts"""
-        shortcuts = {
-            'Cmd+C (Copy)': 'tell application "System Events" to keystroke "c" using command down',
-            'Cmd+V (Paste)': 'tell application "System Events" to keystroke "v" using command down',
-            'Return (Enter)': 'tell application "System Events" to key code 36',
-            'Escape': 'tell application "System Events" to key code 53',
-        }
-        
-        if action in shortcuts:
-            self.run_applescript(shortcuts[action])
+        if action in ACTION_SCRIPTS['Keyboard Shortcuts']:
+            self.run_applescript(ACTION_SCRIPTS['Keyboard Shortcuts'][action])
+    
+    def applescript_for(self, category, action):
+        """AppleScript line for a catalog action (used when fusing macro steps)"""
+        return ACTION_SCRIPTS.get(category, {}).get(action)
+    
+    def macro_for(self, mapping):
+        """Compiled macro for a Custom Commands mapping"""
+        if 'macro' in mapping:
+            return self.macros.compiled.get(mapping['macro'])
+        key = json.dumps(mapping, sort_keys=True)
+        macro = self.mapping_macros.get(key)
+        if macro is None:
+            macro = self.mapping_macros[key] = self.macros.compile_mapping(mapping)
+        return macro
     
     def run_applescript(self, script):
         """Execute AppleScript command"""
+        if self.bridge and self.bridge.is_connected():
+            action = script_to_action(script)
+            if action and self.bridge.send(action):
+                self.metrics.count('bridge_actions')
+                return
+        
+        started = self.metrics.start()
         try:
             subprocess.run(['osascript', '-e', script], check=True)
         except subprocess.CalledProcessError as e:
             print(f"AppleScript error: {e}")
+            self.recorder.dump_on_error(e)
+        finally:
+            self.metrics.observe('osascript', started)
     
     def show_notification(self, message):
         """Show system notification"""
+        started = self.metrics.start()
         try:
             subprocess.run([
                 'osascript', '-e', 
@@ -313,6 +601,8 @@ class D01IntegratedSystem:
             ], check=True)
         except subprocess.CalledProcessError:
             pass
+        finally:
+            self.metrics.observe('notification', started)
     
     def show_capture_analysis(self):
         """Show analysis of captured data"""
@@ -342,13 +632,14 @@ class D01IntegratedSystem:
             
             if press_durations:
                 avg_duration = sum(press_durations) / len(press_durations)
-                short_presses = len([d for d in press_durations if d < 0.5])
-                long_presses = len([d for d in press_durations if d >= 0.5])
+                threshold, short_presses, long_presses, calibrated = split_presses(
+                    press_durations, fallback=self.default_pipeline.long_press_threshold)
                 
                 print(f"\nPress analysis:")
                 print(f"  Average duration: {avg_duration:.3f}s")
-                print(f"  Short presses (< 0.5s): {short_presses}")
-                print(f"  Long presses (≥ 0.5s): {long_presses}")
+                print(f"  Threshold: {threshold:.2f}s ({'fitted to these presses' if calibrated else 'configured'})")
+                print(f"  Short presses (< {threshold:.2f}s): {len(short_presses)}")
+                print(f"  Long presses (≥ {threshold:.2f}s): {len(long_presses)}")
         
         print(f"\n🎯 System Status: Ready for button remapping!")
         print(f"Configuration file: {self.config_file}")
@@ -6,18 +6,52 @@ Long press = Hold mic/record, Short press = Enter
 
 import time
 import subprocess
+import threading
 import json
 import os
 
+from d01_calibration import PressDurationCalibrator
+from d01_macros import MacroEngine
+from d01_scheduler import TimerScheduler, VirtualClock
+
 class D01SimpleRemapper:
-    def __init__(self):
+    def __init__(self, scheduler=None):
         self.config_file = os.path.expanduser("~/.d01-simple-config.json")
         self.button_state = False
         self.press_start_time = None
-        self.long_press_threshold = 0.8  # 800ms
+        
+        # Delays and press timeouts run on the scheduler, never on the input path
+        self.scheduler = scheduler or TimerScheduler()
+        self.long_press_timer = None
+        self.pending_sequence = None
+        self.simulating = False  # Simulated presses never train the calibrator
         
         # Load or create simple config
         self.config = self.load_simple_config()
+        self.compile_release_macros()
+        
+        # Learns where this user's short and long presses split
+        settings = self.config['settings']
+        self.calibrator = PressDurationCalibrator(
+            threshold=settings.get('long_press_threshold_ms', 800) / 1000,
+            auto_apply=settings.get('auto_calibrate_long_press', False),
+            state=self.config.get('press_calibration', {}).get('default')
+        )
+        self.long_press_threshold = self.calibrator.threshold
+        
+    def compile_release_macros(self):
+        """Release actions as macros: keystroke + notification share one osascript"""
+        self.macros = MacroEngine(self.scheduler)
+        notify = self.config['settings']['enable_notifications']
+        stop = [{'action': 'Keystroke', 'key': 's', 'modifiers': ['command', 'shift']}]
+        if notify:
+            stop.append({'action': 'Send Notification', 'value': 'D01: Recording Stopped'})
+        enter = [{'action': 'Key Code', 'code': 36}]
+        if notify:
+            enter.append({'action': 'Send Notification', 'value': 'D01: Enter'})
+        
+        self.macros.compile('long_release', stop)
+        self.macros.compile('short_release', stop + [{'action': 'Wait/Delay', 'seconds': 0.1}] + enter)
         
     def load_simple_config(self):
         """Load simple configuration"""
@@ -34,6 +68,7 @@ class D01SimpleRemapper:
             },
             "settings": {
                 "long_press_threshold_ms": 800,
+                "auto_calibrate_long_press": False,
                 "enable_notifications": True
             }
         }
@@ -41,7 +76,14 @@ class D01SimpleRemapper:
         try:
             if os.path.exists(self.config_file):
                 with open(self.config_file, 'r') as f:
-                    return json.load(f)
+                    loaded_config = json.load(f)
+                    # Merge with defaults (older or partial files lack sections/settings)
+                    for key, value in default_config.items():
+                        if key not in loaded_config:
+                            loaded_config[key] = value
+                    for key, value in default_config['settings'].items():
+                        loaded_config['settings'].setdefault(key, value)
+                    return loaded_config
         except Exception as e:
             print(f"Config load error: {e}")
             
@@ -119,35 +161,67 @@ class D01SimpleRemapper:
     def handle_button_press(self):
         """Handle button press start"""
         if not self.button_state:
+            # A new press cancels the rest of a still-running release sequence
+            if self.pending_sequence and self.pending_sequence.pending:
+                self.pending_sequence.cancel()
+                print("⏭️ Cancelled pending action sequence")
+            
             self.button_state = True
-            self.press_start_time = time.time()
+            self.press_start_time = self.scheduler.now()
+            self.long_press_timer = self.scheduler.call_later(
+                self.long_press_threshold, self.on_long_press)
             print(f"🔴 Button pressed at {time.strftime('%H:%M:%S')}")
             
             # Start recording immediately for long press
             self.start_wisprflow_recording()
     
+    def on_long_press(self):
+        """Long press threshold reached while the button is still held"""
+        print("⏺️ Long press - holding recording")
+    
     def handle_button_release(self):
         """Handle button release"""
-        if self.button_state and self.press_start_time:
-            press_duration = time.time() - self.press_start_time
+        if self.button_state and self.press_start_time is not None:
+            press_duration = self.scheduler.now() - self.press_start_time
             
-            if press_duration >= self.long_press_threshold:
+            if self.long_press_timer.fired:
                 # Long press - stop recording
                 print(f"🔵 Long press released ({press_duration:.2f}s)")
-                self.stop_wisprflow_recording()
+                self.pending_sequence = self.macros.run('long_release')
             else:
-                # Short press - stop recording and send Enter
+                # Short press - stop recording and send Enter after a brief delay
+                self.long_press_timer.cancel()
                 print(f"🔵 Short press released ({press_duration:.2f}s)")
-                self.stop_wisprflow_recording()
-                time.sleep(0.1)  # Brief delay
-                self.execute_enter_key()
+                self.pending_sequence = self.macros.run('short_release')
+            
+            if not self.simulating:
+                threshold = self.calibrator.observe(press_duration)
+                if threshold is not None:
+                    print(f"🎚️  Long-press threshold calibrated to {threshold * 1000:.0f}ms")
+                    self.long_press_threshold = threshold
+                if self.calibrator.unsaved >= 10:
+                    self.calibrator.unsaved = 0
+                    self.scheduler.call_later(0, self.persist_calibration)
             
             # Reset state
             self.button_state = False
             self.press_start_time = None
+            self.long_press_timer = None
+    
+    def persist_calibration(self):
+        """Store the learned press durations with the (complete) config"""
+        self.config.setdefault('press_calibration', {})['default'] = self.calibrator.state()
+        self.save_config()
     
-    def simulate_button_test(self):
-        """Simulate button presses for testing"""
+    def simulate_button_test(self, virtual=False):
+        """Simulate button presses for testing (virtual=True runs on a virtual clock instantly)"""
+        if virtual:
+            self.scheduler = TimerScheduler(VirtualClock())
+            self.compile_release_macros()
+        else:
+            self.scheduler.start()
+        self.simulating = True
+        
         print("🧪 D01 Button Simulation Test")
         print("=" * 40)
         print("Current mappings:")
@@ -156,19 +230,22 @@ class D01SimpleRemapper:
         print(f"  Threshold: {self.config['settings']['long_press_threshold_ms']}ms")
         print()
         
-        # Test short press
-        print("Testing SHORT press...")
-        self.handle_button_press()
-        time.sleep(0.3)  # 300ms press
-        self.handle_button_release()
-        
-        time.sleep(2)
+        done = threading.Event()
+        self.scheduler.sequence([
+            lambda: print("Testing SHORT press..."),
+            self.handle_button_press, 0.3,   # 300ms press
+            self.handle_button_release, 2,
+            lambda: print("Testing LONG press..."),
+            self.handle_button_press, 1.2,   # 1200ms press
+            self.handle_button_release, 0.2,
+        ], name='simulation', on_done=lambda sequence: done.set())
         
-        # Test long press
-        print("Testing LONG press...")
-        self.handle_button_press()
-        time.sleep(1.2)  # 1200ms press
-        self.handle_button_release()
+        if virtual:
+            self.scheduler.run_until_idle()
+        else:
+            done.wait()
+            self.scheduler.stop()
+        self.simulating = False
         
         print("\n✅ Test complete!")
     
@@ -178,6 +255,9 @@ class D01SimpleRemapper:
         print("=" * 40)
         print(f"Config file: {self.config_file}")
         print(f"Long press threshold: {self.config['settings']['long_press_threshold_ms']}ms")
+        suggested = self.config.get('press_calibration', {}).get('default', {}).get('suggested_ms')
+        if suggested:
+            print(f"Suggested threshold: {suggested}ms (from your presses)")
         print(f"Notifications: {self.config['settings']['enable_notifications']}")
         print()
         print("Button mappings:")
@@ -199,8 +279,9 @@ def main():
     print("1. Show status")
     print("2. Test button simulation") 
     print("3. Save current config")
+    print("4. Test button simulation (virtual clock, instant)")
     
-    choice = input("Choose option (1-3): ").strip()
+    choice = input("Choose option (1-4): ").strip()
     
     if choice == '1':
         remapper.show_status()
@@ -208,6 +289,8 @@ def main():
         remapper.simulate_button_test()
     elif choice == '3':
         remapper.save_config()
+    elif choice == '4':
+        remapper.simulate_button_test(virtual=True)
     else:
         remapper.show_status()
 
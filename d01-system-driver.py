@@ -9,6 +9,8 @@ from ctypes import cdll, c_void_p, c_int, c_char_p, POINTER, Structure
 import subprocess
 import os
 
+from d01_output import PrintBackend, keyboard_report, keyboard_report_scripts, output_from_spec
+
 class IOKitDriver:
     """Interface with macOS IOKit for low-level HID access"""
     
@@ -25,7 +27,7 @@ class IOKitDriver:
 class VirtualHIDDevice:
     """Virtual HID device that presents remapped D01 input to the system"""
     
-    def __init__(self):
+    def __init__(self, output=None):
         self.device_descriptor = {
             'vendor_id': 0x1234,  # Custom vendor ID
             'product_id': 0x5678,  # Custom product ID
@@ -34,23 +36,18 @@ class VirtualHIDDevice:
             'usage_page': 0x01,    # Generic Desktop
             'usage': 0x06,         # Keyboard
         }
+        # Where reports go: D01_OUTPUT=keystroke|sink:<path>|sink-hex:<path>|hidapi:<vid>:<pid>
+        spec = os.environ.get('D01_OUTPUT')
+        self.output = output or (output_from_spec(spec, keyboard_report_scripts) if spec else PrintBackend())
     
     def send_keycode(self, keycode, modifier=0):
         """Send remapped keycode to system as virtual keyboard"""
-        # HID report structure for keyboard
-        report = bytes([
-            modifier,    # Modifier keys (Ctrl, Alt, etc.)
-            0x00,        # Reserved
-            keycode,     # Key code
-            0x00, 0x00, 0x00, 0x00, 0x00  # Additional keys
-        ])
-        return self.send_hid_report(report)
+        # HID report structure for keyboard: modifiers, reserved, key code, additional keys
+        return self.send_hid_report(keyboard_report(keycode, modifier))
     
     def send_hid_report(self, report):
         """Send HID report to virtual device"""
-        # This would interface with the virtual HID driver
-        print(f"Sending HID report: {report.hex()}")
-        return True
+        return self.output.send_report(report)
 
 class D01SystemDriver:
     """System-wide D01 ring driver with firmware-level remapping"""
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+D01 Batch Analyzer - Offline analysis of a directory of capture sessions
+Shards files across a process pool, streams each file record by record and
+caches per-file aggregates by content hash so only new captures are processed
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Bump when the aggregate layout changes so stale cache entries are ignored
+CACHE_VERSION = 2
+
+DEFAULT_CACHE = os.path.expanduser("~/.d01-analysis-cache.json")
+# The cache is shared by every corpus; beyond this the least recently used files go
+MAX_CACHE_ENTRIES = 4096
+DEFAULT_GLOBS = ('d01_capture_*.json', 'd01_capture*.log', '*.ndjson', '*.jsonl')
+
+# Press duration histogram upper bounds in seconds (last bucket is open-ended)
+DURATION_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.8, 1.2, 2.0, 5.0)
+
+# Top-level arrays of records in the capture JSON formats
+RECORD_KEYS = ('packets', 'reports', 'hid_reports', 'button_events', 'events')
+
+READ_CHUNK = 1 << 16
+
+HANDLE_RE = re.compile(r'handle=(\d+)')
+BUTTON_RE = re.compile(r'buttonState changed \((\d+)->(\d+)\)')
+ARRAY_START_RE = re.compile(r'"(' + '|'.join(RECORD_KEYS) + r')"\s*:\s*\[')
+
+def file_digest(path):
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+            digest.update(chunk)
+    return path, digest.hexdigest()
+
+def iter_json_records(f):
+    """Yield the items of the known top-level record arrays without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+
+    def fill():
+        nonlocal buffer, eof
+        chunk = f.read(READ_CHUNK)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+    while True:
+        # Find the next record array
+        match = ARRAY_START_RE.search(buffer)
+        if not match:
+            if eof:
+                return
+            buffer = buffer[-32:]  # Keep enough to match a key split across chunks
+            fill()
+            continue
+
+        position = match.end()
+        while True:
+            # Skip separators between items
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer):
+                if eof:
+                    return
+                buffer = buffer[position:]
+                position = 0
+                fill()
+                continue
+            if buffer[position] == ']':
+                buffer = buffer[position + 1:]
+                break
+
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    return
+                # Item spans the chunk boundary
+                buffer = buffer[position:]
+                position = 0
+                fill()
+                continue
+
+            yield item
+            position = end
+            if position > READ_CHUNK:
+                buffer = buffer[position:]
+                position = 0
+
+def iter_ndjson_records(f):
+    """Yield one record per line, keeping raw text lines as log records"""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == '{':
+            try:
+                yield json.loads(line)
+                continue
+            except json.JSONDecodeError:
+                pass
+        yield {'type': 'raw', 'raw_line': line}
+
+def iter_records(path):
+    """Stream the records of a capture file in any supported format"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+
+        if head == '[':
+            # Bare array of records
+            yield from iter_json_records(_Prefixed('{"events": ', f))
+        elif path.endswith('.json'):
+            yield from iter_json_records(f)
+        else:
+            yield from iter_ndjson_records(f)
+
+class _Prefixed:
+    """File wrapper that returns a prefix before the file's own content"""
+
+    def __init__(self, prefix, f):
+        self.prefix = prefix
+        self.f = f
+
+    def read(self, size):
+        if self.prefix:
+            prefix, self.prefix = self.prefix, ''
+            return prefix + self.f.read(size)
+        return self.f.read(size)
+
+def new_aggregate():
+    """Empty per-file aggregate (JSON serialisable)"""
+    return {
+        'files': 0,
+        'records': 0,
+        'presses': 0,
+        'durations': [0] * (len(DURATION_BUCKETS) + 1),
+        'duration_total': 0.0,
+        'patterns': {},
+        'handles': {},
+        'event_types': {},
+        'first_timestamp': None,
+        'last_timestamp': None
+    }
+
+def duration_bucket(duration):
+    """Index of the histogram bucket for a press duration"""
+    for index, bound in enumerate(DURATION_BUCKETS):
+        if duration < bound:
+            return index
+    return len(DURATION_BUCKETS)
+
+def analyze_file(path):
+    """Stream one capture file into an aggregate"""
+    aggregate = new_aggregate()
+    aggregate['files'] = 1
+    patterns = Counter()
+    handles = Counter()
+    event_types = Counter()
+    press_started = None
+    previous_active = False
+
+    def add_press(duration):
+        if duration >= 0:
+            aggregate['presses'] += 1
+            aggregate['durations'][duration_bucket(duration)] += 1
+            aggregate['duration_total'] += duration
+
+    for record in iter_records(path):
+        if not isinstance(record, dict):
+            continue
+        aggregate['records'] += 1
+        event_types[record.get('type', 'packet')] += 1
+
+        timestamp = record.get('timestamp')
+        if isinstance(timestamp, (int, float)):
+            if aggregate['first_timestamp'] is None:
+                aggregate['first_timestamp'] = timestamp
+            aggregate['last_timestamp'] = timestamp
+        else:
+            timestamp = None
+
+        raw_line = record.get('raw_line') or record.get('line') or ''
+
+        # Handle of the HID report, from structured data or the raw log line
+        handle = record.get('handle')
+        if handle is None and raw_line:
+            handle_match = HANDLE_RE.search(raw_line)
+            if handle_match:
+                handle = handle_match.group(1)
+        if handle is not None:
+            handles[str(handle)] += 1
+
+        # Press/release edges: button events, raw log lines or packet activity
+        active = None
+        if 'new_state' in record and 'old_state' in record:
+            active = record['new_state'] > record['old_state']
+        elif raw_line and 'buttonState changed' in raw_line:
+            state_match = BUTTON_RE.search(raw_line)
+            if state_match:
+                active = int(state_match.group(2)) > int(state_match.group(1))
+        elif 'non_zero_count' in record:
+            active = record['non_zero_count'] > 0
+            if active and record.get('hex_string'):
+                patterns[record['hex_string']] += 1
+
+        if active is None or timestamp is None:
+            continue
+        if active and not previous_active:
+            press_started = timestamp
+        elif not active and previous_active and press_started is not None:
+            add_press(timestamp - press_started)
+            press_started = None
+        previous_active = active
+
+    aggregate['patterns'] = dict(patterns)
+    aggregate['handles'] = dict(handles)
+    aggregate['event_types'] = dict(event_types)
+    return aggregate
+
+def merge_aggregates(target, source):
+    """Merge one aggregate into another in place"""
+    for key in ('files', 'records', 'presses', 'duration_total'):
+        target[key] += source[key]
+    target['durations'] = [a + b for a, b in zip(target['durations'], source['durations'])]
+
+    for key in ('patterns', 'handles', 'event_types'):
+        merged = target[key]
+        for name, count in source[key].items():
+            merged[name] = merged.get(name, 0) + count
+
+    if source['first_timestamp'] is not None:
+        if target['first_timestamp'] is None or source['first_timestamp'] < target['first_timestamp']:
+            target['first_timestamp'] = source['first_timestamp']
+    if source['last_timestamp'] is not None:
+        if target['last_timestamp'] is None or source['last_timestamp'] > target['last_timestamp']:
+            target['last_timestamp'] = source['last_timestamp']
+    return target
+
+def load_cache(cache_file):
+    """Load cached {'used': time, 'aggregate': ...} entries keyed by sha256"""
+    try:
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, 'r') as f:
+                cache = json.load(f)
+            if cache.get('version') == CACHE_VERSION:
+                return cache.get('files', {})
+    except Exception as e:
+        print(f"Error loading cache {cache_file}: {e}")
+    return {}
+
+def save_cache(cache_file, entries, limit=MAX_CACHE_ENTRIES):
+    """Merge entries into the cache on disk, evict the least recently used, write atomically"""
+    # Reread: other corpora (or a concurrent run) keep their entries
+    merged = load_cache(cache_file)
+    merged.update(entries)
+    if len(merged) > limit:
+        merged = dict(sorted(merged.items(), key=lambda item: item[1]['used'])[-limit:])
+
+    temp_file = cache_file + '.tmp'
+    try:
+        with open(temp_file, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'files': merged}, f)
+        os.replace(temp_file, cache_file)
+    except Exception as e:
+        print(f"Error saving cache {cache_file}: {e}")
+
+def find_captures(directory, globs=DEFAULT_GLOBS):
+    """Capture files in a directory matching any of the globs"""
+    import glob
+
+    paths = set()
+    for pattern in globs:
+        paths.update(glob.glob(os.path.join(directory, '**', pattern), recursive=True))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+def analyze_corpus(directory, workers=None, cache_file=DEFAULT_CACHE, globs=DEFAULT_GLOBS):
+    """Analyze every capture in a directory; returns (aggregate, stats)"""
+    started = time.perf_counter()
+    paths = find_captures(directory, globs)
+    cache = load_cache(cache_file) if cache_file else {}
+    total = new_aggregate()
+    stats = {'files': len(paths), 'cached': 0, 'analyzed': 0, 'failed': 0}
+
+    if not paths:
+        stats['seconds'] = time.perf_counter() - started
+        return total, stats
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+        digests = dict(pool.map(file_digest, paths, chunksize=chunksize))
+
+        pending = [path for path in paths if digests[path] not in cache]
+        stats['cached'] = len(paths) - len(pending)
+
+        now = time.time()
+        futures = {pool.submit(analyze_file, path): path for path in pending}
+        for future, path in futures.items():
+            try:
+                cache[digests[path]] = {'used': now, 'aggregate': future.result()}
+                stats['analyzed'] += 1
+            except Exception as e:
+                print(f"Error analyzing {path}: {e}")
+                stats['failed'] += 1
+
+    used = {}
+    for path in paths:
+        digest = digests[path]
+        if digest in cache and digest not in used:
+            # Identical copies are counted once
+            used[digest] = {'used': now, 'aggregate': cache[digest]['aggregate']}
+            merge_aggregates(total, cache[digest]['aggregate'])
+
+    if cache_file and used:
+        # Refreshes this corpus' entries; other directories' entries stay cached
+        save_cache(cache_file, used)
+
+    stats['seconds'] = time.perf_counter() - started
+    return total, stats
+
+def print_report(total, stats, top=10):
+    """Print the merged corpus analysis"""
+    print("\n" + "=" * 60)
+    print("📊 D01 CORPUS ANALYSIS")
+    print("=" * 60)
+    print(f"Files: {stats['files']} ({stats['analyzed']} analyzed, {stats['cached']} cached, "
+          f"{stats['failed']} failed) in {stats['seconds']:.2f}s")
+    print(f"Records: {total['records']}")
+
+    if total['event_types']:
+        print("\nEvent types:")
+        for event_type, count in sorted(total['event_types'].items(), key=lambda x: x[1], reverse=True):
+            print(f"  {event_type}: {count}")
+
+    if total['presses']:
+        print(f"\nPress durations ({total['presses']} presses, "
+              f"average {total['duration_total'] / total['presses']:.3f}s):")
+        peak = max(total['durations']) or 1
+        lower = 0.0
+        for index, count in enumerate(total['durations']):
+            label = (f"{lower * 1000:>5.0f}-{DURATION_BUCKETS[index] * 1000:<5.0f}ms"
+                     if index < len(DURATION_BUCKETS) else f"{lower * 1000:>5.0f}+     ms")
+            print(f"  {label} {count:>7} {'█' * int(30 * count / peak)}")
+            if index < len(DURATION_BUCKETS):
+                lower = DURATION_BUCKETS[index]
+
+    if total['handles']:
+        print("\nReports per handle:")
+        for handle, count in sorted(total['handles'].items(), key=lambda x: x[1], reverse=True):
+            print(f"  Handle {handle}: {count}")
+
+    if total['patterns']:
+        print(f"\n🔥 Most common patterns ({len(total['patterns'])} unique):")
+        for pattern, count in Counter(total['patterns']).most_common(top):
+            print(f"  {pattern} (occurred {count} times)")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyze a directory of D01 capture sessions")
+    parser.add_argument('directory', nargs='?', default='.')
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help="Per-file result cache")
+    parser.add_argument('--no-cache', action='store_true', help="Re-analyze every file")
+    parser.add_argument('--glob', action='append', help="File pattern (repeatable)")
+    parser.add_argument('--top', type=int, default=10, help="Patterns to show")
+    parser.add_argument('--json', help="Also write the merged aggregate to this file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"❌ Not a directory: {args.directory}")
+        sys.exit(1)
+
+    total, stats = analyze_corpus(
+        args.directory,
+        workers=args.workers,
+        cache_file=None if args.no_cache else args.cache,
+        globs=tuple(args.glob) if args.glob else DEFAULT_GLOBS
+    )
+    print_report(total, stats, args.top)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'stats': stats, 'aggregate': total}, f, indent=2)
+        print(f"\n💾 Aggregate saved to: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+D01 Bit Correlation - Learn which report bit is which button from a guided session
+Raw reports are stacked into a uint8 matrix, unpacked to bit columns and every
+column is correlated against labelled press intervals, in chunks, with NumPy
+"""
+
+import json
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from d01_batch_analyzer import iter_records
+
+CONFIG_FILE = os.path.expanduser("~/.d01-config.json")
+
+# Rows per chunk: bounds the unpacked bit matrix (rows x width*8 bytes)
+CHUNK_ROWS = 1 << 16
+
+# What D01Remapper reads when nothing was learned yet
+DEFAULT_REPORT_MASKS = {
+    'bottom': {'byte': 1, 'mask': 0x01},
+    'top': {'byte': 1, 'mask': 0x02},
+    'middle': {'byte': 1, 'mask': 0x04},
+}
+
+def bit_name(column):
+    """Column index -> 'B<byte>.<bit>' as BluetoothHIDAnalyzer prints bits"""
+    return f"B{column // 8}.{column % 8}"
+
+def report_matrix(reports, width=None):
+    """[(timestamp, bytes)] -> (float64 timestamps, uint8 matrix zero-padded to `width`)"""
+    width = width or max((len(data) for _, data in reports), default=0)
+    if all(len(data) == width for _, data in reports):
+        # Same-length reports (the usual case): one buffer, no per-row copies
+        timestamps = np.fromiter((timestamp for timestamp, _ in reports), dtype=np.float64, count=len(reports))
+        matrix = np.frombuffer(b''.join(bytes(data) for _, data in reports), dtype=np.uint8)
+        return timestamps, matrix.reshape(len(reports), width)
+
+    timestamps = np.empty(len(reports), dtype=np.float64)
+    matrix = np.zeros((len(reports), width), dtype=np.uint8)
+    for row, (timestamp, data) in enumerate(reports):
+        timestamps[row] = timestamp
+        data = bytes(data[:width])
+        matrix[row, :len(data)] = np.frombuffer(data, dtype=np.uint8)
+    return timestamps, matrix
+
+def load_reports(paths):
+    """Timestamped raw reports from capture files (raw_data, hex or report fields)"""
+    reports = []
+    for path in paths:
+        for record in iter_records(path):
+            if not isinstance(record, dict) or not isinstance(record.get('timestamp'), (int, float)):
+                continue
+            data = record.get('raw_data')
+            if data is None:
+                text = record.get('report') or record.get('hex') or record.get('hex_string')
+                if not isinstance(text, str):
+                    continue
+                try:
+                    data = bytes.fromhex(text.replace(' ', ''))
+                except ValueError:
+                    continue
+            reports.append((record['timestamp'], bytes(data)))
+    return reports
+
+def label_matrix(timestamps, intervals, buttons, lag=0.0):
+    """(rows, buttons) bool: was the button held (per the session labels) at each report"""
+    labels = np.zeros((len(timestamps), len(buttons)), dtype=bool)
+    for column, button in enumerate(buttons):
+        spans = sorted((interval['start'] + lag, interval['end'] + lag)
+                       for interval in intervals if interval['button'] == button)
+        if not spans:
+            continue
+        starts = np.array([start for start, _ in spans])
+        ends = np.array([end for _, end in spans])
+        index = np.searchsorted(starts, timestamps, side='right') - 1
+        inside = index >= 0
+        inside[inside] = timestamps[inside] <= ends[index[inside]]
+        labels[:, column] = inside
+    return labels
+
+def correlate(matrix, labels, chunk_rows=CHUNK_ROWS):
+    """Phi coefficient, precision and recall of every bit column against every label column"""
+    rows, width = matrix.shape
+    bits = width * 8
+    ones = np.zeros(bits, dtype=np.float64)            # reports with the bit set
+    both = np.zeros((bits, labels.shape[1]), dtype=np.float64)  # ... while the button is held
+    for start in range(0, rows, chunk_rows):
+        chunk = np.unpackbits(matrix[start:start + chunk_rows], axis=1, bitorder='little')
+        ones += chunk.sum(axis=0)
+        both += chunk.T.astype(np.float32) @ labels[start:start + chunk_rows].astype(np.float32)
+
+    held = labels.sum(axis=0).astype(np.float64)
+    n = float(rows)
+    numerator = n * both - np.outer(ones, held)
+    denominator = np.sqrt(np.outer(ones * (n - ones), held * (n - held)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi = np.where(denominator > 0, numerator / denominator, 0.0)
+        precision = np.where(ones[:, None] > 0, both / ones[:, None], 0.0)
+        recall = np.where(held[None, :] > 0, both / held[None, :], 0.0)
+    return phi, precision, recall
+
+def rank_mapping(phi, precision, recall, buttons, alternatives=3, min_phi=0.5):
+    """Greedy best-first bit per button (a bit maps to at most one button)"""
+    candidates = sorted(((phi[column, index], column, index)
+                         for index in range(len(buttons)) for column in range(phi.shape[0])
+                         if phi[column, index] > 0), reverse=True)
+    mapping = {}
+    used = set()
+    for score, column, index in candidates:
+        button = buttons[index]
+        if button in mapping or column in used or score < min_phi:
+            continue
+        mapping[button] = {'byte': column // 8, 'mask': 1 << (column % 8), 'bit': bit_name(column),
+                           'phi': round(float(score), 4), 'precision': round(float(precision[column, index]), 4),
+                           'recall': round(float(recall[column, index]), 4)}
+        used.add(column)
+
+    ranked = {}
+    for index, button in enumerate(buttons):
+        order = np.argsort(-phi[:, index])[:alternatives]
+        ranked[button] = [(bit_name(int(column)), round(float(phi[column, index]), 4)) for column in order]
+    return mapping, ranked
+
+def analyze(reports, intervals, lag=0.0):
+    """Full pipeline: returns (mapping, ranked alternatives, buttons)"""
+    buttons = sorted({interval['button'] for interval in intervals})
+    timestamps, matrix = report_matrix(reports)
+    labels = label_matrix(timestamps, intervals, buttons, lag)
+    phi, precision, recall = correlate(matrix, labels)
+    mapping, ranked = rank_mapping(phi, precision, recall, buttons)
+    return mapping, ranked, buttons
+
+def report_masks(mapping):
+    """Mapping -> the D01Remapper mask table"""
+    return {button: {'byte': entry['byte'], 'mask': entry['mask']} for button, entry in mapping.items()}
+
+def load_report_masks(config_file=CONFIG_FILE):
+    """Learned masks from the config, falling back to the defaults per button"""
+    masks = {button: dict(mask) for button, mask in DEFAULT_REPORT_MASKS.items()}
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                masks.update(json.load(f).get('report_masks', {}))
+    except Exception as e:
+        print(f"Error loading report masks: {e}")
+    return masks
+
+def save_report_masks(masks, config_file=CONFIG_FILE):
+    config = {}
+    if os.path.exists(config_file):
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+    config['report_masks'] = masks
+    with open(config_file, 'w') as f:
+        json.dump(config, f, indent=2)
+
+def print_mapping(mapping, ranked, buttons):
+    print("\n🧬 Bit → button mapping:")
+    for button in buttons:
+        entry = mapping.get(button)
+        if entry:
+            print(f"  {button:<10} {entry['bit']:<6} byte {entry['byte']} mask 0x{entry['mask']:02X}  "
+                  f"phi {entry['phi']:.3f}  precision {entry['precision']:.3f}  recall {entry['recall']:.3f}")
+        else:
+            print(f"  {button:<10} no bit tracks this button")
+        print(f"  {'':<10} candidates: " + ', '.join(f"{name} ({score:.3f})" for name, score in ranked[button]))
+
+def guided_session(vendor_id, product_id, buttons, rounds=5, hold=1.5, rest=1.5, reaction=0.3):
+    """Prompt each button in turn while reading raw reports; returns (reports, intervals)"""
+    import threading
+    import hid  # Optional dependency: pip3 install hidapi
+
+    device = hid.device()
+    device.open(vendor_id, product_id)
+    reports = []
+    running = True
+
+    def read_loop():
+        while running:
+            data = device.read(64, timeout_ms=50)
+            if data:
+                reports.append((time.time(), bytes(data)))
+
+    reader = threading.Thread(target=read_loop)
+    reader.daemon = True
+    reader.start()
+
+    intervals = []
+    try:
+        for round_number in range(1, rounds + 1):
+            for button in buttons:
+                print(f"[{round_number}/{rounds}] 👉 Hold {button.upper()} now...")
+                prompted = time.time()
+                time.sleep(hold)
+                print("   ✋ Release")
+                # Label only the part of the window the wearer is surely holding
+                intervals.append({'button': button, 'start': prompted + reaction, 'end': prompted + hold})
+                time.sleep(rest)
+    finally:
+        running = False
+        reader.join(timeout=1)
+        device.close()
+    return reports, intervals
+
+def synthetic_session(rows=1000000, width=16, seed=3):
+    """Reports at 1 kHz with planted button bits, lookalike bits, noise and sloppy labels"""
+    rng = np.random.default_rng(seed)
+    planted = {'bottom': (3, 5), 'top': (1, 1), 'middle': (6, 0)}
+    timestamps = np.arange(rows, dtype=np.float64) * 0.001
+    matrix = (rng.random((rows, width)) < 0.02).astype(np.uint8) * rng.integers(0, 256, (rows, width), dtype=np.uint8)
+    matrix[:, 0] = 0x01  # Report id
+
+    intervals = []
+    now = 0.5
+    buttons = sorted(planted)
+    while now < timestamps[-1] - 2:
+        button = buttons[int(rng.integers(len(buttons)))]
+        hold = float(rng.uniform(0.1, 1.0))
+        byte, bit = planted[button]
+        span = slice(int(now * 1000), int((now + hold) * 1000))
+        matrix[span, byte] |= np.uint8(1 << bit)
+        matrix[span, 2] |= np.uint8(0x80)  # "Any button" flag: correlated with every button
+        # Labels come from prompts: late by up to 80 ms and a little short
+        skew = float(rng.uniform(0, 0.08))
+        intervals.append({'button': button, 'start': now + skew, 'end': now + hold - 0.02})
+        now += hold + float(rng.uniform(0.3, 1.5))
+
+    # 1% of reports garbled
+    garbled = rng.random(rows) < 0.01
+    matrix[garbled, 1:] = rng.integers(0, 256, (int(garbled.sum()), width - 1), dtype=np.uint8)
+    return timestamps, matrix, intervals, {button: bit_name(byte * 8 + bit) for button, (byte, bit) in planted.items()}
+
+def benchmark(rows=1000000):
+    print("⏱️  D01 bit correlation benchmark")
+    timestamps, matrix, intervals, planted = synthetic_session(rows)
+    buttons = sorted(planted)
+
+    started = time.perf_counter()
+    labels = label_matrix(timestamps, intervals, buttons)
+    labelled = time.perf_counter() - started
+    phi, precision, recall = correlate(matrix, labels)
+    correlated = time.perf_counter() - started - labelled
+    mapping, ranked = rank_mapping(phi, precision, recall, buttons)
+    print(f"{rows:,} reports × {matrix.shape[1] * 8} bits, {len(intervals)} labelled presses: "
+          f"labels {labelled:.2f}s, correlation {correlated:.2f}s")
+
+    print_mapping(mapping, ranked, buttons)
+    ok = all(mapping.get(button, {}).get('bit') == bit for button, bit in planted.items())
+    print(f"\n{'✅' if ok else '❌'} planted bits recovered: {planted}")
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Correlate raw report bits with labelled button presses')
+    parser.add_argument('captures', nargs='*', help='capture files with timestamped raw reports')
+    parser.add_argument('--labels', help='JSON file: {"intervals": [{"button", "start", "end"}, ...]}')
+    parser.add_argument('--guided', action='store_true', help='run a guided capture session on the ring')
+    parser.add_argument('--buttons', default='bottom,top,middle', help='buttons to prompt in --guided')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--lag', type=float, default=0.0, help='shift labels by this many seconds')
+    parser.add_argument('--save', action='store_true', help='write the mapping to report_masks in the config')
+    parser.add_argument('--session-file', default=os.path.expanduser('~/d01_bit_session.json'),
+                        help='where --guided stores the session')
+    parser.add_argument('--benchmark', action='store_true', help='recover planted bits from 10⁶ synthetic reports')
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ numpy not installed (pip3 install numpy)")
+        sys.exit(1)
+
+    if args.benchmark or not (args.guided or args.captures):
+        sys.exit(0 if benchmark() else 1)
+
+    if args.guided:
+        from d01_devices import load_device_profiles
+        profile = load_device_profiles({})[0]
+        reports, intervals = guided_session(profile['vendor_id'], profile['product_id'],
+                                            args.buttons.split(','), args.rounds)
+        with open(args.session_file, 'w') as f:
+            json.dump({'intervals': intervals,
+                       'reports': [{'timestamp': t, 'hex': data.hex()} for t, data in reports]}, f)
+        print(f"💾 Session saved to: {args.session_file}")
+    else:
+        if not args.labels:
+            print("❌ --labels is required with capture files")
+            sys.exit(1)
+        with open(args.labels, 'r') as f:
+            intervals = json.load(f)['intervals']
+        reports = load_reports(args.captures)
+
+    if not reports:
+        print("❌ No timestamped reports found")
+        sys.exit(1)
+
+    mapping, ranked, buttons = analyze(reports, intervals, args.lag)
+    print(f"{len(reports):,} reports, {len(intervals)} labelled presses")
+    print_mapping(mapping, ranked, buttons)
+
+    if args.save and mapping:
+        save_report_masks(report_masks(mapping))
+        print(f"\n💾 report_masks saved to: {CONFIG_FILE}")
+
+if __name__ == "__main__":
+    main()
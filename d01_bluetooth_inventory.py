@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+D01 Bluetooth Inventory - Cached, address-indexed view of paired Bluetooth devices
+Parses `system_profiler SPBluetoothDataType -json` once, keeps it on disk with a
+TTL and refreshes in the background so lookups never wait on the scan
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+
+CACHE_FILE = os.path.expanduser("~/.d01-bluetooth-inventory.json")
+DEFAULT_TTL = 300  # seconds
+
+SCAN_COMMAND = ['system_profiler', 'SPBluetoothDataType', '-json']
+
+def normalize_address(address):
+    """58-5e-42-b3-2c-66 / 58:5e:... -> 58:5E:42:B3:2C:66"""
+    return address.strip().replace('-', ':').upper()
+
+def parse_inventory(data):
+    """Turn system_profiler JSON into {address: device}"""
+    table = {}
+
+    for controller in data.get('SPBluetoothDataType', []):
+        for section, entries in controller.items():
+            # device_connected / device_not_connected (macOS 12+), device_title (older)
+            if not section.startswith('device') or not isinstance(entries, list):
+                continue
+            connected = None
+            if section == 'device_connected':
+                connected = True
+            elif section == 'device_not_connected':
+                connected = False
+
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    continue
+                for name, properties in entry.items():
+                    if not isinstance(properties, dict):
+                        continue
+                    address = properties.get('device_address') or properties.get('device_addr')
+                    if not address:
+                        continue
+
+                    if connected is None:
+                        state = str(properties.get('device_isconnected', '')).lower()
+                        device_connected = state in ('attrib_yes', 'yes', 'true')
+                    else:
+                        device_connected = connected
+
+                    address = normalize_address(address)
+                    table[address] = {
+                        'name': name,
+                        'address': address,
+                        'connected': device_connected,
+                        'vendor_id': properties.get('device_vendorID'),
+                        'product_id': properties.get('device_productID'),
+                        'minor_type': properties.get('device_minorType'),
+                        'battery': properties.get('device_batteryLevelMain') or properties.get('device_batteryLevel'),
+                        'properties': properties
+                    }
+
+    return table
+
+class BluetoothInventory:
+    """Address-indexed Bluetooth device table with disk cache and background refresh"""
+
+    def __init__(self, ttl=DEFAULT_TTL, cache_file=CACHE_FILE, run_command=None):
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.run_command = run_command or self.default_run
+
+        self.lock = threading.Lock()
+        self.table = {}
+        self.raw = None
+        self.updated = 0.0
+        self.refreshing = None  # Event of the in-flight refresh
+        self.listeners = []
+        self.load_cache()
+
+    def default_run(self, command):
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"exit code {result.returncode}")
+        return result.stdout
+
+    def load_cache(self):
+        """Load the last scan from disk (however old)"""
+        try:
+            if self.cache_file and os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r') as f:
+                    cached = json.load(f)
+                self.table = cached.get('devices', {})
+                self.raw = cached.get('raw')
+                self.updated = cached.get('updated', 0.0)
+        except Exception as e:
+            print(f"Error loading Bluetooth inventory cache: {e}")
+
+    def save_cache(self):
+        """Persist the table atomically"""
+        if not self.cache_file:
+            return
+        temp_file = self.cache_file + '.tmp'
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump({'updated': self.updated, 'devices': self.table, 'raw': self.raw}, f)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error saving Bluetooth inventory cache: {e}")
+
+    @property
+    def age(self):
+        return time.time() - self.updated if self.updated else None
+
+    def is_fresh(self):
+        return self.updated and time.time() - self.updated < self.ttl
+
+    def has_data(self):
+        return bool(self.updated)
+
+    def scan(self):
+        """Run the (slow) system_profiler scan and replace the table"""
+        raw = json.loads(self.run_command(SCAN_COMMAND))
+        table = parse_inventory(raw)
+        with self.lock:
+            self.raw = raw
+            self.table = table
+            self.updated = time.time()
+        self.save_cache()
+
+        for listener in list(self.listeners):
+            try:
+                listener(self)
+            except Exception as e:
+                print(f"Error in inventory listener: {e}")
+        return table
+
+    def refresh(self, wait=False, timeout=None):
+        """Start a background scan unless one is running; optionally wait for it"""
+        with self.lock:
+            done = self.refreshing
+            if done is None:
+                done = self.refreshing = threading.Event()
+                thread = threading.Thread(target=self._refresh_worker, args=(done,))
+                thread.daemon = True
+                thread.start()
+
+        if wait:
+            done.wait(timeout)
+        return done
+
+    def _refresh_worker(self, done):
+        try:
+            self.scan()
+        except Exception as e:
+            print(f"Error scanning Bluetooth devices: {e}")
+        finally:
+            with self.lock:
+                self.refreshing = None
+            done.set()
+
+    def devices(self, wait_if_empty=False):
+        """Current table; stale data is served while a refresh runs in the background"""
+        if not self.is_fresh():
+            self.refresh(wait=wait_if_empty and not self.has_data())
+        with self.lock:
+            return dict(self.table)
+
+    def lookup(self, address):
+        """Device for an address, or None"""
+        return self.devices().get(normalize_address(address))
+
+    def find(self, name):
+        """Devices whose name contains `name` (case-insensitive)"""
+        name = name.lower()
+        return [device for device in self.devices().values() if name in device['name'].lower()]
+
+    def add_listener(self, callback):
+        """Call callback(inventory) after every completed scan (from the scan thread)"""
+        self.listeners.append(callback)
+
+_shared = None
+
+def get_inventory():
+    """Process-wide inventory instance"""
+    global _shared
+    if _shared is None:
+        _shared = BluetoothInventory()
+    return _shared
+
+def main():
+    import sys
+
+    inventory = get_inventory()
+    if '--refresh' in sys.argv or not inventory.has_data():
+        print("🔍 Scanning Bluetooth devices...")
+        started = time.perf_counter()
+        inventory.refresh(wait=True)
+        print(f"Scan took {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    devices = inventory.devices()
+    print(f"Lookup took {(time.perf_counter() - started) * 1e6:.0f}µs "
+          f"(cache age {inventory.age or 0:.0f}s, TTL {inventory.ttl}s)")
+
+    print(f"\n📱 {len(devices)} Bluetooth devices:")
+    for address, device in sorted(devices.items(), key=lambda item: item[1]['name']):
+        state = "🟢" if device['connected'] else "⚪"
+        battery = f" battery {device['battery']}" if device.get('battery') else ""
+        print(f"  {state} {device['name']:<30} {address}{battery}")
+
+if __name__ == "__main__":
+    main()
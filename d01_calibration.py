@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+D01 Calibration - Learn a per-user long-press threshold from observed press durations
+Durations go into a fixed log-spaced histogram with exponential forgetting;
+Otsu's two-cluster split of that histogram is the suggested threshold
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import time
+
+# Log-spaced duration histogram: BINS bins from MIN_DURATION to MAX_DURATION seconds
+BINS = 48
+MIN_DURATION = 0.03
+MAX_DURATION = 5.0
+LOG_MIN = math.log(MIN_DURATION)
+BIN_WIDTH = (math.log(MAX_DURATION) - LOG_MIN) / BINS
+CENTERS = [LOG_MIN + (index + 0.5) * BIN_WIDTH for index in range(BINS)]
+
+# Between-class / total variance needed to call the histogram two clusters
+# (a single log-normal cluster splits at about 0.64)
+MIN_SEPARATION = 0.78
+
+def bin_index(duration):
+    index = int((math.log(max(duration, MIN_DURATION)) - LOG_MIN) / BIN_WIDTH)
+    return min(max(index, 0), BINS - 1)
+
+def bin_edge(index):
+    """Lower edge of a bin in seconds"""
+    return math.exp(LOG_MIN + index * BIN_WIDTH)
+
+class PressDurationCalibrator:
+    """Online two-cluster fit of press durations; constant work per press"""
+
+    def __init__(self, threshold=0.8, auto_apply=False, half_life=200, min_presses=50,
+                 bounds=(0.25, 2.0), state=None):
+        self.threshold = threshold  # Currently applied, seconds
+        self.auto_apply = auto_apply
+        self.growth = 2.0 ** (1.0 / half_life)  # Newer presses weigh more: old ones fade
+        self.min_presses = min_presses
+        self.bounds = bounds
+
+        self.bins = [0.0] * BINS
+        self.weight = 1.0  # Weight of the next press (rescaled instead of decaying every bin)
+        self.presses = 0
+        self.suggested = None
+        self.separation = 0.0
+        self.unsaved = 0
+
+        if state:
+            self.load_state(state)
+
+    def observe(self, duration):
+        """Add one press; returns the new threshold when auto-apply moved it, else None"""
+        self.bins[bin_index(duration)] += self.weight
+        self.weight *= self.growth
+        if self.weight > 1e12:
+            self.rescale()
+        self.presses += 1
+        self.unsaved += 1
+
+        fit = self.fit()
+        if fit is None:
+            return None
+        threshold, self.separation = fit
+        previous, self.suggested = self.suggested, threshold
+        if self.auto_apply and abs(threshold - self.threshold) > 0.05 * self.threshold:
+            self.threshold = threshold
+            return threshold
+        if previous is None or abs(threshold - previous) > 0.05 * previous:
+            if not self.auto_apply:
+                print(f"💡 Suggested long-press threshold: {threshold * 1000:.0f}ms "
+                      f"(current {self.threshold * 1000:.0f}ms, {self.presses} presses)")
+        return None
+
+    def rescale(self):
+        scale = 1.0 / self.weight
+        self.bins = [count * scale for count in self.bins]
+        self.weight = 1.0
+
+    def fit(self):
+        """Otsu split of the log-duration histogram: (threshold seconds, separation) or None"""
+        if self.presses < self.min_presses:
+            return None
+        bins = self.bins
+        total = sum(bins)
+        if total <= 0:
+            return None
+        centers = CENTERS
+        mean = sum(count * center for count, center in zip(bins, centers)) / total
+        variance = sum(count * (center - mean) ** 2 for count, center in zip(bins, centers)) / total
+        if variance <= 0:
+            return None
+
+        best = None
+        below = 0.0
+        below_sum = 0.0
+        for index in range(BINS - 1):
+            below += bins[index]
+            below_sum += bins[index] * centers[index]
+            above = total - below
+            # Each cluster must hold a real share of the presses
+            if below < 0.1 * total or above < 0.1 * total:
+                continue
+            mean_below = below_sum / below
+            mean_above = (mean * total - below_sum) / above
+            between = below * above * (mean_below - mean_above) ** 2 / (total * total)
+            if best is None or between > best[0]:
+                best = (between, index + 1)
+
+        if best is None or best[0] / variance < MIN_SEPARATION:
+            return None
+        threshold = min(max(bin_edge(best[1]), self.bounds[0]), self.bounds[1])
+        return threshold, best[0] / variance
+
+    def state(self):
+        """JSON-serialisable state (histogram normalised to sum 1)"""
+        total = sum(self.bins) or 1.0
+        return {
+            'bins': [round(count / total, 6) for count in self.bins],
+            'presses': self.presses,
+            'suggested_ms': round(self.suggested * 1000) if self.suggested else None,
+            'applied_ms': round(self.threshold * 1000) if self.auto_apply else None,
+            'separation': round(self.separation, 3),
+        }
+
+    def load_state(self, state):
+        bins = state.get('bins') or []
+        if len(bins) != BINS:
+            return  # Histogram layout changed: start over
+        # Keep the learned shape, weighted like `min_presses` recent presses
+        self.bins = [count * self.min_presses for count in bins]
+        self.presses = state.get('presses', 0)
+        if state.get('suggested_ms'):
+            self.suggested = state['suggested_ms'] / 1000
+        if self.auto_apply and state.get('applied_ms'):
+            self.threshold = state['applied_ms'] / 1000
+
+def calibrator_from_config(config, key='default'):
+    """Calibrator for one ring from its merged config (settings + press_calibration[key])"""
+    settings = config.get('settings', {})
+    return PressDurationCalibrator(
+        threshold=settings.get('long_press_threshold', 800) / 1000,
+        auto_apply=settings.get('auto_calibrate_long_press', False),
+        state=config.get('press_calibration', {}).get(key)
+    )
+
+def save_calibration(config_file, key, calibrator):
+    """Write one calibrator's state into press_calibration[key] of a config file"""
+    try:
+        config = {}
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+        config.setdefault('press_calibration', {})[key] = calibrator.state()
+        with open(config_file, 'w') as f:
+            json.dump(config, f, indent=2)
+    except Exception as e:
+        print(f"Error saving calibration: {e}")
+
+def split_presses(durations, fallback=0.5):
+    """(threshold, short, long, calibrated) for offline analysis of a batch of presses"""
+    calibrator = PressDurationCalibrator(min_presses=20, half_life=10 ** 9)
+    for duration in durations:
+        calibrator.bins[bin_index(duration)] += 1
+    calibrator.presses = len(durations)
+    fit = calibrator.fit()
+    threshold = fit[0] if fit else fallback
+    short = [duration for duration in durations if duration < threshold]
+    long = [duration for duration in durations if duration >= threshold]
+    return threshold, short, long, fit is not None
+
+# Synthetic users: (short median, long median, log spread, share of long presses)
+USERS = {
+    'quick tapper': (0.12, 0.9, 0.35, 0.3),
+    'slow tapper': (0.4, 1.6, 0.3, 0.4),
+    'short holder': (0.15, 0.55, 0.25, 0.5),
+}
+
+def synthetic_presses(profile, count, rng):
+    short, long, spread, share = profile
+    presses = []
+    for _ in range(count):
+        is_long = rng.random() < share
+        presses.append((math.exp(rng.gauss(math.log(long if is_long else short), spread)), is_long))
+    return presses
+
+def misclassified(presses, threshold):
+    return sum(1 for duration, is_long in presses if (duration >= threshold) != is_long) / len(presses)
+
+def benchmark(presses=2000):
+    print("⏱️  D01 long-press calibration benchmark")
+    rng = random.Random(9)
+    ok = True
+    for name, profile in USERS.items():
+        calibrator = PressDurationCalibrator(auto_apply=True)
+        sample = synthetic_presses(profile, presses, rng)
+        started = time.perf_counter()
+        for duration, _ in sample:
+            calibrator.observe(duration)
+        per_press = (time.perf_counter() - started) / presses
+        fixed, learned = misclassified(sample, 0.8), misclassified(sample, calibrator.threshold)
+        better = learned <= fixed
+        ok = ok and better
+        print(f"{'✅' if better else '❌'} {name:<13} threshold {calibrator.threshold * 1000:5.0f}ms "
+              f"(separation {calibrator.separation:.2f}): misclassified {fixed:6.1%} at 800ms → {learned:6.1%}, "
+              f"{per_press * 1e6:.0f}µs per press")
+
+    # Habits drift: the fit follows the recent presses
+    calibrator = PressDurationCalibrator(auto_apply=True)
+    for duration, _ in synthetic_presses(USERS['slow tapper'], presses, rng):
+        calibrator.observe(duration)
+    before = calibrator.threshold
+    for duration, _ in synthetic_presses(USERS['quick tapper'], presses, rng):
+        calibrator.observe(duration)
+    followed = calibrator.threshold < before
+    ok = ok and followed
+    print(f"{'✅' if followed else '❌'} drift: slow → quick tapper moved {before * 1000:.0f}ms → "
+          f"{calibrator.threshold * 1000:.0f}ms")
+
+    # One cluster is no evidence for a threshold
+    calibrator = PressDurationCalibrator(auto_apply=True)
+    for duration, _ in synthetic_presses((0.2, 0.2, 0.4, 0.0), presses, rng):
+        calibrator.observe(duration)
+    kept = calibrator.threshold == 0.8
+    ok = ok and kept
+    print(f"{'✅' if kept else '❌'} unimodal presses keep {calibrator.threshold * 1000:.0f}ms")
+
+    # State survives a save/load round trip
+    restored = PressDurationCalibrator(auto_apply=True, state=calibrator.state())
+    same = restored.presses == calibrator.presses and restored.fit() == calibrator.fit()
+    ok = ok and same
+    print(f"{'✅' if same else '❌'} state round trip")
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='D01 long-press threshold calibration')
+    parser.add_argument('--benchmark', action='store_true', help='fit synthetic users')
+    parser.add_argument('--config', default=os.path.expanduser('~/.d01-config.json'))
+    args = parser.parse_args()
+
+    if args.benchmark or not os.path.exists(args.config):
+        sys.exit(0 if benchmark() else 1)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    print(f"Long press threshold: {config.get('settings', {}).get('long_press_threshold', 800)}ms")
+    for key, state in config.get('press_calibration', {}).items():
+        print(f"  {key}: {state.get('presses', 0)} presses, suggested {state.get('suggested_ms') or '-'}ms, "
+              f"applied {state.get('applied_ms') or '-'}ms (separation {state.get('separation', 0):.2f})")
+
+if __name__ == "__main__":
+    main()
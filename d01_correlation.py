@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+D01 Correlation - Join the same physical press seen by several sources
+Observations from log stream, hidutil, ioreg, key/media logs or the bridge
+are time-window joined into one canonical event with a confidence score
+"""
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+from d01_log_ingest import classify_message
+
+# How much one sighting from a source is trusted (unknown sources get 0.5)
+DEFAULT_WEIGHTS = {
+    'log': 0.9,
+    'bridge': 0.95,
+    'keyboard': 0.7,
+    'media': 0.6,
+    'hidutil': 0.6,
+    'ioreg': 0.5,
+}
+
+# Opposite edges: a new press from a source needs a release from it first
+OPPOSITE = {'press': 'release', 'release': 'press'}
+
+# Kind for sightings that cannot tell a press from a release (snapshot polls, bare key lines).
+# It joins a press or release group, but has no opposite: a repeat from the same source
+# inside the window is always taken as a re-report
+UNKNOWN = 'input'
+
+KEY_DOWN_RE = re.compile(r'key[ _-]?down', re.IGNORECASE)
+KEY_UP_RE = re.compile(r'key[ _-]?up', re.IGNORECASE)
+
+def edge_kind(line):
+    """'press' or 'release' when a log line carries the edge, else UNKNOWN"""
+    event = classify_message(line)
+    if event and event['type'] == 'button_event':
+        return event['action']
+    if KEY_DOWN_RE.search(line):
+        return 'press'
+    if KEY_UP_RE.search(line):
+        return 'release'
+    return UNKNOWN
+
+class EventGroup:
+    """Observations of one physical event"""
+
+    __slots__ = ('kind', 'start', 'sources', 'reports', 'emitted', 'event')
+
+    def __init__(self, kind, start):
+        self.kind = kind
+        self.start = start
+        self.sources = {}  # source -> timestamp
+        self.reports = 0
+        self.emitted = False
+        self.event = None
+
+class PressCorrelator:
+    """Time-window join of per-source observations into canonical events
+
+    mode 'leading' emits on the first sighting and absorbs the rest (no added latency);
+    mode 'trailing' waits `window` so the event carries every source's confidence.
+    A source seen again inside a window is a re-report unless it saw the opposite
+    edge (e.g. a release) in between, which makes it a real new press; that needs
+    press/release kinds (see edge_kind), UNKNOWN sightings cannot tell.
+    """
+
+    def __init__(self, window=0.08, weights=None, mode='leading', on_event=None,
+                 max_groups=256, retain=10.0, scheduler=None):
+        self.window = window
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.mode = mode
+        self.on_event = on_event
+        self.retain = retain
+        self.scheduler = scheduler  # Optional TimerScheduler to flush trailing groups on time
+
+        self.groups = deque(maxlen=max_groups)  # Bounded: oldest groups fall off
+        self.last_kind = {}  # source -> kind of its latest observation
+        self.lock = threading.Lock()
+        self.stats = {'observations': 0, 'events': 0, 'merged': 0, 'duplicates': 0, 'expired': 0}
+
+    def confidence(self, sources):
+        """1 - P(every source was wrong)"""
+        miss = 1.0
+        for source in sources:
+            miss *= 1.0 - self.weights.get(source, 0.5)
+        return round(1.0 - miss, 3)
+
+    def observe(self, source, kind, timestamp=None, uncertainty=0.0, now=None):
+        """Add one sighting; returns the canonical event if this started one (leading mode)
+
+        uncertainty: extra slack for coarse sources (e.g. a snapshot poll interval)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        emitted = []
+        with self.lock:
+            self.stats['observations'] += 1
+            group = self.find_group(source, kind, timestamp, uncertainty)
+
+            if group is None:
+                group = EventGroup(kind, timestamp)
+                self.groups.append(group)
+                created = True
+            else:
+                created = False
+                if group.kind == UNKNOWN and not group.emitted:
+                    group.kind = kind  # A sighting that knows the edge names it
+                if source in group.sources:
+                    self.stats['duplicates'] += 1
+                else:
+                    self.stats['merged'] += 1
+                group.start = min(group.start, timestamp)
+
+            group.sources.setdefault(source, timestamp)
+            group.reports += 1
+            self.last_kind[source] = kind
+
+            if group.emitted:
+                # Late sighting of something already emitted: only the confidence moves
+                group.event['sources'] = sorted(group.sources)
+                group.event['confidence'] = self.confidence(group.sources)
+                group.event['reports'] = group.reports
+            elif created and self.mode == 'leading':
+                emitted.append(self.emit(group))
+
+            emitted.extend(self.expire(now if now is not None else timestamp))
+
+        if created and self.mode == 'trailing' and self.scheduler:
+            self.scheduler.call_later(self.window, self.flush)
+        for event in emitted:
+            self.deliver(event)
+        return emitted[0] if created and self.mode == 'leading' else None
+
+    def find_group(self, source, kind, timestamp, uncertainty):
+        """Newest group of this kind the sighting belongs to, or None"""
+        limit = self.window + uncertainty
+        for group in reversed(self.groups):
+            if group.start < timestamp - limit - self.retain:
+                break
+            if UNKNOWN not in (group.kind, kind) and group.kind != kind:
+                continue
+            if abs(timestamp - group.start) > limit:
+                continue
+            if source not in group.sources:
+                return group
+            if self.last_kind.get(source) != OPPOSITE.get(kind):
+                return group  # Same source, no opposite edge in between: a re-report
+            return None
+        return None
+
+    def emit(self, group):
+        group.emitted = True
+        group.event = {
+            'type': group.kind,
+            'timestamp': group.start,
+            'sources': sorted(group.sources),
+            'confidence': self.confidence(group.sources),
+            'reports': group.reports,
+        }
+        self.stats['events'] += 1
+        return group.event
+
+    def expire(self, now):
+        """Emit trailing groups whose window closed and drop groups past retention"""
+        emitted = []
+        for group in self.groups:
+            if not group.emitted and now - group.start >= self.window:
+                emitted.append(self.emit(group))
+        while self.groups and now - self.groups[0].start > self.retain and self.groups[0].emitted:
+            self.groups.popleft()
+            self.stats['expired'] += 1
+        return emitted
+
+    def flush(self, now=None):
+        """Emit every trailing group whose window has closed (all of them with now=inf)"""
+        with self.lock:
+            emitted = self.expire(time.time() if now is None else now)
+        for event in emitted:
+            self.deliver(event)
+        return emitted
+
+    def deliver(self, event):
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Error in correlated event handler: {e}")
+
+    def summary(self):
+        stats = self.stats
+        return (f"{stats['observations']} sightings → {stats['events']} events "
+                f"({stats['merged']} cross-source merges, {stats['duplicates']} re-reports absorbed)")
+
+def format_event(event):
+    """One printable line per canonical event"""
+    stamp = time.strftime('%H:%M:%S', time.localtime(event['timestamp']))
+    return (f"[{stamp}] 🎯 {event['type'].upper()} (confidence {event['confidence']:.2f}, "
+            f"{'+'.join(event['sources'])}, {event['reports']} reports)")
+
+# Source profiles for synthetic replays: (report probability, lag, jitter, re-report probability)
+REPLAY_SOURCES = {
+    'log': (0.98, 0.004, 0.006, 0.15),
+    'bridge': (0.9, 0.001, 0.002, 0.0),
+    'hidutil': (0.6, 0.020, 0.025, 0.3),
+}
+
+def synthetic_presses(count=2000, seed=7):
+    """Physical (kind, time) edges, including fast double presses"""
+    rng = random.Random(seed)
+    edges = []
+    now = 0.0
+    for _ in range(count):
+        hold = rng.choice([0.06, 0.12, 0.25, 0.9])
+        edges.append(('press', now))
+        edges.append(('release', now + hold))
+        # A quarter of presses are the first half of a fast double press
+        now += hold + (0.12 if rng.random() < 0.25 else rng.uniform(0.3, 1.5))
+    return edges
+
+def synthetic_sightings(edges, sources=REPLAY_SOURCES, seed=11):
+    """What the sources report for those edges, sorted by arrival"""
+    rng = random.Random(seed)
+    sightings = []
+    for kind, at in edges:
+        reported = False
+        for source, (probability, lag, jitter, rereport) in sources.items():
+            # At least one source sees every edge, otherwise nobody could fire it
+            if rng.random() > probability and (reported or source != 'log'):
+                continue
+            reported = True
+            seen = at + lag + rng.uniform(0, jitter)
+            sightings.append((seen, source, kind))
+            if rng.random() < rereport:
+                sightings.append((seen + rng.uniform(0.002, 0.03), source, kind))
+    sightings.sort()
+    return sightings
+
+def replay(sightings, mode='leading', window=0.08):
+    """Feed sightings on their own clock; returns the canonical events"""
+    events = []
+    correlator = PressCorrelator(window=window, mode=mode, on_event=events.append)
+    for seen, source, kind in sightings:
+        correlator.observe(source, kind, seen, now=seen)
+    correlator.flush(now=float('inf'))
+    return events, correlator
+
+def run_replay(path=None):
+    """Prove sightings collapse to exactly one canonical event per physical edge"""
+    if path:
+        with open(path, 'r') as handle:
+            records = [json.loads(line) for line in handle if line.strip()]
+        sightings = sorted((record['timestamp'], record['source'], record['kind']) for record in records)
+        edges = None
+    else:
+        edges = synthetic_presses()
+        sightings = synthetic_sightings(edges)
+
+    print(f"🔁 D01 correlation replay: {len(sightings)} sightings"
+          + (f" of {len(edges)} physical edges" if edges else ""))
+    ok = True
+    for mode in ('leading', 'trailing'):
+        events, correlator = replay(sightings, mode)
+        line = f"{mode:<9} {correlator.summary()}"
+        if edges is None:
+            print(f"  {line}")
+            continue
+
+        # Every physical edge fires exactly once, of the right kind, near the right time
+        matched = len(events) == len(edges) and all(
+            event['type'] == kind and 0 <= event['timestamp'] - at < 0.08
+            for event, (kind, at) in zip(sorted(events, key=lambda e: e['timestamp']), edges))
+        ok = ok and matched
+        print(f"{'✅' if matched else '❌'} {line}")
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='D01 cross-source correlation')
+    parser.add_argument('--replay', nargs='?', const='', metavar='SIGHTINGS',
+                        help='replay synthetic presses, or a JSON-lines file of {source, kind, timestamp}')
+    args = parser.parse_args()
+
+    sys.exit(0 if run_replay(args.replay or None) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+D01 Debounce - Hysteresis for buttonState transitions before the press state machine
+A new level counts only once it has held for the button's minimum hold (press)
+or release time; bounces and glitches shorter than that are suppressed and counted
+"""
+
+import random
+import sys
+import threading
+import time
+
+from d01_journal import read_journal
+
+DEFAULT_HOLD = 0.010  # A press must stay down this long (seconds)
+DEFAULT_RELEASE = 0.020  # A release must stay up this long: release bounce is the longer one
+
+class Debouncer:
+    """Per-button pending-edge confirmation over a buttonState bit mask
+
+    Each bit of buttonState is one button. A changed bit becomes a candidate edge;
+    it is confirmed (and delivered as a debounced old->new transition stamped with
+    the candidate's first sighting) once the bit has kept its new level for the
+    button's minimum time. Going back to the stable level first cancels it.
+    State is the stable mask plus at most one candidate per button.
+    """
+
+    def __init__(self, hold=DEFAULT_HOLD, release=DEFAULT_RELEASE, buttons=None, on_edge=None,
+                 scheduler=None, mask=0xFFFF):
+        self.hold = hold
+        self.release = release
+        self.buttons = buttons or {}  # bit -> (hold, release) overrides
+        self.on_edge = on_edge  # on_edge(old_state, new_state, timestamp)
+        self.scheduler = scheduler  # Optional TimerScheduler to confirm edges on time
+        self.mask = mask  # Bits outside the mask are not buttons (bounds the state)
+
+        self.state = 0  # Debounced level of every button
+        self.pending = {}  # bit -> (level, since, deadline)
+        self.lock = threading.Lock()
+        self.stats = {'transitions': 0, 'confirmed': 0, 'bounces': 0, 'duplicates': 0,
+                      'suppressed': 0, 'ignored': 0}
+
+    def minimum(self, bit, level):
+        hold, release = self.buttons.get(bit, (self.hold, self.release))
+        return hold if level else release
+
+    def observe_state(self, old_state, new_state, timestamp=None, now=None):
+        """Feed one reported transition; False when it was absorbed as bounce or duplicate"""
+        timestamp = time.time() if timestamp is None else timestamp
+        confirmed = []
+        accepted = False
+        with self.lock:
+            self.stats['transitions'] += 1
+            confirmed.extend(self.confirm_due(timestamp))
+
+            # The reported edge, plus any bit whose debounced level disagrees with new_state
+            reported = old_state ^ new_state
+            changed = reported | (self.state ^ new_state)
+            if changed & ~self.mask:
+                self.stats['ignored'] += 1
+            changed &= self.mask
+            if not changed:
+                self.stats['duplicates'] += 1
+
+            while changed:
+                bit = changed & -changed
+                changed ^= bit
+                if self.observe_bit(bit, 1 if new_state & bit else 0, timestamp, confirmed, bit & reported):
+                    accepted = True
+
+            confirmed.extend(self.confirm_due(timestamp if now is None else now))
+
+        for edge in confirmed:
+            self.deliver(edge)
+        return accepted
+
+    def observe_bit(self, bit, level, timestamp, confirmed, reported):
+        """One button's new level; True when it starts or completes an edge"""
+        stable = 1 if self.state & bit else 0
+        candidate = self.pending.get(bit)
+
+        if level == stable:
+            if candidate is None:
+                self.stats['duplicates'] += 1 if reported else 0
+                return False
+            # Back to where it was before the candidate held long enough: a bounce
+            del self.pending[bit]
+            self.stats['bounces'] += 1
+            self.stats['suppressed'] += 2
+            return False
+
+        if candidate is not None:
+            self.stats['duplicates'] += 1 if reported else 0  # Re-report of the pending level
+            return False
+
+        minimum = self.minimum(bit, level)
+        if minimum <= 0:
+            confirmed.append(self.confirm(bit, level, timestamp))
+            return True
+        self.pending[bit] = (level, timestamp, timestamp + minimum)
+        if self.scheduler:
+            # A little slack: the scheduler's clock and time.time() are not the same clock
+            self.scheduler.call_later(minimum + 0.001, self.flush)
+        return True
+
+    def confirm(self, bit, level, since):
+        old_state = self.state
+        self.state = old_state | bit if level else old_state & ~bit
+        self.stats['confirmed'] += 1
+        return old_state, self.state, since
+
+    def confirm_due(self, now):
+        """Confirm every candidate whose level held until `now`, oldest first"""
+        due = sorted((since, bit, level) for bit, (level, since, deadline) in self.pending.items()
+                     if deadline <= now)
+        confirmed = []
+        for since, bit, level in due:
+            del self.pending[bit]
+            confirmed.append(self.confirm(bit, level, since))
+        return confirmed
+
+    def flush(self, now=None):
+        """Confirm candidates that have held long enough (all of them with now=inf)"""
+        with self.lock:
+            confirmed = self.confirm_due(time.time() if now is None else now)
+        for edge in confirmed:
+            self.deliver(edge)
+        return confirmed
+
+    def deliver(self, edge):
+        if self.on_edge:
+            try:
+                self.on_edge(*edge)
+            except Exception as e:
+                print(f"Error in debounced edge handler: {e}")
+
+    def summary(self):
+        stats = self.stats
+        return (f"{stats['transitions']} transitions → {stats['confirmed']} edges "
+                f"({stats['bounces']} bounces, {stats['suppressed']} edges suppressed, "
+                f"{stats['duplicates']} duplicates)")
+
+def debouncer_from_config(settings, **options):
+    """Debouncer from settings.debounce: {hold_ms, release_ms, buttons: {bit: {hold_ms, release_ms}}}"""
+    debounce = settings.get('debounce', {})
+    hold = debounce.get('hold_ms', DEFAULT_HOLD * 1000) / 1000
+    release = debounce.get('release_ms', DEFAULT_RELEASE * 1000) / 1000
+    buttons = {}
+    for bit, times in debounce.get('buttons', {}).items():
+        buttons[int(bit, 0)] = (times.get('hold_ms', hold * 1000) / 1000,
+                                times.get('release_ms', release * 1000) / 1000)
+    return Debouncer(hold=hold, release=release, buttons=buttons, **options)
+
+# Bouncy fixtures: what a noisy link or a worn switch does to clean presses
+FIXTURES = ('clean', 'duplicate lines', 'press bounce', 'release bounce', 'glitches', 'everything')
+
+def physical_presses(count, rng, bit=1):
+    """Real (press time, release time, bit) presses, including fast double taps"""
+    presses = []
+    now = 0.0
+    for _ in range(count):
+        hold = rng.choice([0.06, 0.12, 0.25, 0.9])
+        presses.append((now, now + hold, bit))
+        now += hold + (0.12 if rng.random() < 0.25 else rng.uniform(0.3, 1.5))
+    return presses
+
+def bouncy_transitions(presses, fixture, rng):
+    """buttonState transitions (timestamp, old, new) the log would show for those presses"""
+    noisy = {name: fixture in (name, 'everything') for name in FIXTURES}
+    levels = []  # (timestamp, level) of the one bit, in time order
+    for pressed, released, bit in presses:
+        levels.append((pressed, 1))
+        if noisy['press bounce'] and rng.random() < 0.5:
+            # 0→1→0→1 within a few milliseconds
+            levels.append((pressed + rng.uniform(0.0005, 0.002), 0))
+            levels.append((pressed + rng.uniform(0.002, 0.005), 1))
+        levels.append((released, 0))
+        if noisy['release bounce'] and rng.random() < 0.5:
+            levels.append((released + rng.uniform(0.0005, 0.003), 1))
+            levels.append((released + rng.uniform(0.003, 0.008), 0))
+        if noisy['glitches'] and rng.random() < 0.3:
+            # A lone spike between presses
+            at = released + rng.uniform(0.05, 0.1)
+            levels.append((at, 1))
+            levels.append((at + rng.uniform(0.001, 0.004), 0))
+
+    bit = presses[0][2] if presses else 1
+    transitions = []
+    state = 0
+    for timestamp, level in levels:
+        new = state | bit if level else state & ~bit
+        transitions.append((timestamp, state, new))
+        if noisy['duplicate lines'] and rng.random() < 0.3:
+            # The same line logged twice, right behind the first one
+            transitions.append((timestamp + rng.uniform(0.00001, 0.0001), state, new))
+        state = new
+    transitions.sort()
+    return transitions
+
+def replay(transitions, debouncer=None):
+    """Feed transitions on their own clock; returns the debounced (old, new, timestamp) edges"""
+    edges = []
+    debouncer = debouncer or Debouncer()
+    debouncer.on_edge = lambda old, new, timestamp: edges.append((old, new, timestamp))
+    for timestamp, old, new in transitions:
+        debouncer.observe_state(old, new, timestamp)
+    debouncer.flush(now=float('inf'))
+    return edges, debouncer
+
+def press_count(transitions):
+    """What the press state machine would count without debouncing"""
+    return sum(1 for _, old, new in transitions if new > old)
+
+def run_replay(path=None, presses=1000):
+    """Every physical press comes out exactly once, phantom presses are gone"""
+    print("🔁 D01 debounce replay")
+    if path:
+        transitions = sorted((record['timestamp'], int(record['old_state']), int(record['new_state']))
+                             for record in read_journal(path) if 'old_state' in record)
+        edges, debouncer = replay(transitions)
+        print(f"  {path}: {press_count(transitions)} raw presses → "
+              f"{sum(1 for old, new, _ in edges if new > old)} debounced")
+        print(f"  {debouncer.summary()}")
+        return True
+
+    ok = True
+    rng = random.Random(5)
+    for fixture in FIXTURES:
+        truth = physical_presses(presses, rng)
+        transitions = bouncy_transitions(truth, fixture, rng)
+        started = time.perf_counter()
+        edges, debouncer = replay(transitions)
+        elapsed = (time.perf_counter() - started) / len(transitions)
+
+        # Every press and release once, each stamped at its first sighting
+        down = [timestamp for old, new, timestamp in edges if new > old]
+        up = [timestamp for old, new, timestamp in edges if new < old]
+        matched = (len(down) == len(up) == len(truth) and
+                   all(abs(d - pressed) < 0.006 and abs(u - released) < 0.009
+                       for d, u, (pressed, released, _) in zip(down, up, truth)))
+        ok = ok and matched
+        print(f"{'✅' if matched else '❌'} {fixture:<15} {press_count(transitions):5} raw presses → "
+              f"{len(down):4} debounced (truth {len(truth)}), {debouncer.stats['suppressed']} edges suppressed, "
+              f"{elapsed * 1e6:.1f}µs per transition")
+
+    # Per-button times: a slower switch gets a longer release window
+    debouncer = Debouncer(buttons={2: (0.01, 0.05)})
+    transitions = [(0.0, 0, 2), (0.2, 2, 0), (0.23, 0, 2), (0.26, 2, 0)]  # 30ms release bounce
+    edges, _ = replay(transitions, debouncer)
+    passed = [(old, new) for old, new, _ in edges] == [(0, 2), (2, 0)]
+    ok = ok and passed
+    print(f"{'✅' if passed else '❌'} per-button release window absorbs a 30ms bounce")
+
+    # Button 1 bouncing while button 2 goes down cancels only button 1's edge
+    transitions = [(0.0, 0, 1), (0.001, 1, 3), (0.002, 3, 2), (0.003, 2, 3), (0.3, 3, 2), (0.4, 2, 0)]
+    edges, _ = replay(transitions)
+    passed = [(old, new) for old, new, _ in edges] == [(0, 2), (2, 3), (3, 2), (2, 0)]
+    ok = ok and passed
+    print(f"{'✅' if passed else '❌'} buttons debounce independently")
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='D01 buttonState debounce')
+    parser.add_argument('--replay', nargs='?', const='', metavar='CAPTURE',
+                        help='replay the bouncy fixtures, or a capture/flight dump with old_state/new_state')
+    args = parser.parse_args()
+
+    sys.exit(0 if run_replay(args.replay or None) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+D01 Devices - Multi-ring support with per-device isolated pipelines
+Each ring gets its own reader, press state machine and config profile;
+all readers are multiplexed on a single selector loop
+"""
+
+import json
+import os
+import selectors
+import time
+
+from d01_calibration import calibrator_from_config
+from d01_correlation import PressCorrelator
+from d01_debounce import debouncer_from_config
+from d01_gestures import GestureRecognizer
+from d01_predicates import build_predicate, mapped_event_types
+
+# The ring this project started with; used when no devices are configured
+DEFAULT_DEVICE = {
+    'address': '58:5E:42:B3:2C:66',
+    'name': 'D01 Pro',
+    'vendor_id': 0x05AC,
+    'product_id': 0x022C
+}
+
+# Result of a press edge (actions fire on release)
+PRESS = 'press'
+
+# Transitions absorbed before the press state machine (see DevicePipeline.observe_transition)
+DUPLICATE = 'duplicate'
+BOUNCE = 'bounce'
+
+# Benchmark: p99 dispatch latency at N rings may be at most this multiple of one ring's
+MAX_P99_RATIO = 8.0
+
+def parse_id(value):
+    """Accept vendor/product IDs as ints or '0x05ac' strings"""
+    if isinstance(value, str):
+        return int(value, 16) if value.lower().startswith('0x') else int(value)
+    return value
+
+def load_device_profiles(config):
+    """Build one profile per configured ring, each with its own merged config"""
+    devices = config.get('devices') or [DEFAULT_DEVICE]
+    profiles = []
+
+    for device in devices:
+        device_config = {key: value for key, value in config.items() if key != 'devices'}
+
+        # Optional per-device profile file, then inline overrides
+        overrides = {}
+        profile_path = device.get('profile')
+        if profile_path:
+            try:
+                with open(os.path.expanduser(profile_path), 'r') as f:
+                    overrides = json.load(f)
+            except Exception as e:
+                print(f"Error loading profile {profile_path}: {e}")
+
+        for source in (overrides, device):
+            for section in ('buttons', 'gestures', 'settings'):
+                if section in source:
+                    merged = dict(device_config.get(section, {}))
+                    merged.update(source[section])
+                    device_config[section] = merged
+
+        profiles.append({
+            'address': device.get('address', DEFAULT_DEVICE['address']).upper(),
+            'name': device.get('name', DEFAULT_DEVICE['name']),
+            'vendor_id': parse_id(device.get('vendor_id', DEFAULT_DEVICE['vendor_id'])),
+            'product_id': parse_id(device.get('product_id', DEFAULT_DEVICE['product_id'])),
+            # Text that identifies this ring's log lines (e.g. "handle=521"). Not defaulted to the
+            # address: recorded bluetoothd "buttonState changed (a->b)" lines carry no address,
+            # so a ring is only routable when its config names text its lines are known to carry
+            'match': device.get('match'),
+            'config': device_config
+        })
+
+    return profiles
+
+def routable(matches):
+    """True when log lines can be routed per ring: several rings, each with its own match text"""
+    return len(matches) > 1 and all(matches) and len(set(matches)) == len(matches)
+
+class DevicePipeline:
+    """Press state machine and config for a single ring"""
+
+    def __init__(self, profile):
+        self.address = profile['address']
+        self.name = profile['name']
+        self.match = profile['match']
+        self.vendor_id = profile.get('vendor_id', DEFAULT_DEVICE['vendor_id'])
+        self.product_id = profile.get('product_id', DEFAULT_DEVICE['product_id'])
+        self.config = profile['config']
+
+        self.button_states = {}
+        self.press_times = {}
+        # Learns this ring's short/long split; applied only with settings.auto_calibrate_long_press
+        self.calibrator = calibrator_from_config(self.config, self.address)
+        self.long_press_threshold = self.calibrator.threshold
+        self.gesture_recognizer = GestureRecognizer(self.config.get('settings', {}))
+
+        # Re-reports of one edge (or the same edge from another source) fire once
+        window = self.config.get('settings', {}).get('correlation_window_ms', 80) / 1000
+        self.correlator = PressCorrelator(window=window)
+
+        # Bounce and glitches shorter than the per-button minimum times never become presses
+        self.debouncer = debouncer_from_config(self.config.get('settings', {}))
+
+    def predicate(self, shared=True):
+        """log stream predicate for the button events this ring's config maps"""
+        # Gestures come from hidapi motion reports, not from the log
+        return build_predicate('remap', device_match=None if shared else self.match,
+                               event_types=mapped_event_types(self.config, sections=('buttons',)))
+
+    def observe_transition(self, old_state, new_state, source='log', timestamp=None):
+        """Run a reported transition through the correlator, then the debouncer
+
+        Confirmed edges reach the press state machine through debouncer.on_edge.
+        Returns DUPLICATE or BOUNCE when the transition was absorbed, else None.
+        """
+        # A re-report of an edge that already fired is not a second press
+        kind = 'press' if new_state > old_state else 'release'
+        if not self.correlator.observe(source, kind, timestamp):
+            return DUPLICATE
+
+        # Bounce (0→1→0→1 within a few ms) is held back until the new level has lasted
+        if not self.debouncer.observe_state(old_state, new_state, timestamp):
+            return BOUNCE
+        return None
+
+    def process_transition(self, old_state, new_state, timestamp):
+        """Advance the press state machine; returns PRESS, (button_type, action_name, duration) or None"""
+        if new_state > old_state:
+            self.button_states['last_button'] = 'pressing'
+            self.press_times['last_button'] = timestamp
+            return PRESS
+
+        if 'last_button' not in self.press_times:
+            return None
+
+        press_duration = timestamp - self.press_times.pop('last_button')
+        self.button_states.pop('last_button', None)
+
+        # Determine button type based on duration (before this press can move the threshold)
+        is_long = press_duration >= self.long_press_threshold
+        threshold = self.calibrator.observe(press_duration)
+        if threshold is not None:
+            print(f"🎚️  {self.name}: long-press threshold calibrated to {threshold * 1000:.0f}ms")
+            self.long_press_threshold = threshold
+
+        if is_long:
+            return 'bottom_long', "Long Press", press_duration
+        return 'bottom_short', "Short Press", press_duration  # Assume bottom for now
+
+class DeviceMultiplexer:
+    """Read many line-oriented sources on one selector loop"""
+
+    def __init__(self, block_size=65536):
+        self.selector = selectors.DefaultSelector()
+        self.block_size = block_size
+        self.buffers = {}
+
+    def add_source(self, stream, callback):
+        """Register a pipe/file whose lines are passed to callback(line)"""
+        fd = stream if isinstance(stream, int) else stream.fileno()
+        self.buffers[fd] = b''
+        self.selector.register(fd, selectors.EVENT_READ, callback)
+
+    def add_wakeup(self, fd):
+        """Register an fd that only ends the wait (e.g. ShutdownCoordinator.wakeup_fd); never read"""
+        self.selector.register(fd, selectors.EVENT_READ, None)
+
+    def remove_source(self, fd):
+        """Stop reading a source"""
+        self.selector.unregister(fd)
+        self.buffers.pop(fd, None)
+
+    @property
+    def source_count(self):
+        return len(self.buffers)
+
+    def run_once(self, timeout=0.5):
+        """Wait for readable sources and dispatch every complete line"""
+        dispatched = 0
+
+        for key, _ in self.selector.select(timeout):
+            if key.data is None:
+                continue  # Wakeup fd: the caller's should_continue() decides
+            fd = key.fd
+            chunk = os.read(fd, self.block_size)
+            if not chunk:
+                # Source closed - flush any trailing partial line
+                remainder = self.buffers.get(fd, b'')
+                self.remove_source(fd)
+                if remainder.strip():
+                    key.data(remainder.decode('utf-8', 'replace'))
+                    dispatched += 1
+                continue
+
+            data = self.buffers[fd] + chunk
+            start = 0
+            while True:
+                end = data.find(b'\n', start)
+                if end < 0:
+                    break
+                if end > start:
+                    key.data(data[start:end].decode('utf-8', 'replace'))
+                    dispatched += 1
+                start = end + 1
+            self.buffers[fd] = data[start:]
+
+        return dispatched
+
+    def run(self, should_continue):
+        """Dispatch until should_continue() is false or every source closed"""
+        while should_continue() and self.buffers:
+            self.run_once()
+
+    def close(self):
+        """Release the selector"""
+        self.selector.close()
+
+def benchmark(device_counts=(1, 2, 4, 8, 16), events_per_device=1000, interval=0.002):
+    """Show that per-device dispatch latency stays flat as the ring count grows
+
+    Every line takes the integrated system's path: classify, correlator, debouncer,
+    press state machine. Debounce minimums are zeroed (a fixed hold is added delay,
+    not dispatch cost) so the synthetic 2ms edges all count. Fails when a line is
+    lost, duplicated, reordered, absorbed or handed to another ring's pipeline, or when
+    p99 exceeds MAX_P99_RATIO times the single-ring p99.
+    """
+    import threading
+    from d01_log_ingest import classify_message
+
+    print("⏱️  D01 multi-device latency benchmark")
+    print(f"{'devices':>8} {'events':>8} {'p50 µs':>9} {'p99 µs':>9} {'max µs':>9}")
+    ok = True
+    baseline = None
+
+    for count in device_counts:
+        mux = DeviceMultiplexer()
+        read_fds = []
+        pipes = []
+        latencies = []
+        received = {}  # ring index -> sequence numbers in arrival order
+        misrouted = [0]
+        absorbed = [0]
+        releases = [0]
+
+        for index in range(count):
+            read_fd, write_fd = os.pipe()
+            pipeline = DevicePipeline({
+                'address': f'00:00:00:00:00:{index:02X}', 'name': f'ring-{index}',
+                'match': f'ring-{index}',
+                'config': {'settings': {'debounce': {'hold_ms': 0, 'release_ms': 0}}}
+            })
+            received[index] = []
+            sent_at = [0.0]
+
+            def on_edge(old_state, new_state, timestamp, pipeline=pipeline, sent_at=sent_at):
+                if pipeline.process_transition(old_state, new_state, timestamp) not in (PRESS, None):
+                    releases[0] += 1
+                latencies.append(time.perf_counter() - sent_at[0])
+
+            pipeline.debouncer.on_edge = on_edge
+
+            def on_line(line, pipeline=pipeline, index=index, sent_at=sent_at):
+                sent, ring, number, _ = line.split(' ', 3)
+                if ring != pipeline.name:
+                    misrouted[0] += 1
+                received[index].append(int(number))
+                if "buttonState changed" not in line:
+                    return
+                event = classify_message(line)
+                sent_at[0] = float(sent)
+                if pipeline.observe_transition(event['old_state'], event['new_state']) is not None:
+                    absorbed[0] += 1
+
+            mux.add_source(read_fd, on_line)
+            read_fds.append(read_fd)
+            pipes.append(write_fd)
+
+        def writer():
+            for n in range(events_per_device):
+                old, new = (0, 1) if n % 2 == 0 else (1, 0)
+                for index, write_fd in enumerate(pipes):
+                    line = f"{time.perf_counter():.9f} ring-{index} {n} buttonState changed ({old}->{new})\n"
+                    os.write(write_fd, line.encode())
+                time.sleep(interval)
+            for write_fd in pipes:
+                os.close(write_fd)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            mux.run(lambda: True)
+        finally:
+            thread.join()
+            mux.close()
+            for read_fd in read_fds:
+                os.close(read_fd)
+
+        expected = list(range(events_per_device))
+        lost = sum(1 for numbers in received.values() if numbers != expected)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1e6
+        p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+        baseline = baseline or p99
+        problems = []
+        if lost or misrouted[0]:
+            problems.append(f"{lost} rings lost/reordered lines, {misrouted[0]} misrouted")
+        if absorbed[0] or releases[0] != count * (events_per_device // 2):
+            problems.append(f"{absorbed[0]} edges absorbed, {releases[0]} releases reached the press machine")
+        if p99 > baseline * MAX_P99_RATIO:
+            problems.append(f"p99 {p99 / baseline:.1f}x one ring's (limit {MAX_P99_RATIO:.0f}x)")
+        ok = ok and not problems
+        print(f"{count:>8} {len(latencies):>8} {p50:>9.1f} {p99:>9.1f} {latencies[-1] * 1e6:>9.1f}"
+              f"  {'❌ ' + '; '.join(problems) if problems else '✅'}")
+
+    return ok
+
+if __name__ == "__main__":
+    import sys
+
+    if '--benchmark' in sys.argv:
+        sys.exit(0 if benchmark() else 1)
+    else:
+        config_file = os.path.expanduser("~/.d01-config.json")
+        config = {}
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+
+        print("Configured D01 devices:")
+        for profile in load_device_profiles(config):
+            print(f"  {profile['name']} [{profile['address']}] "
+                  f"0x{profile['vendor_id']:04x}:0x{profile['product_id']:04x} match={profile['match']}")
+        matches = [profile['match'] for profile in load_device_profiles(config)]
+        if len(matches) > 1 and not routable(matches):
+            print("⚠️  Not every ring has its own 'match' - log button events go to the first ring only")
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+D01 Flight Recorder - Always-on ring buffer of recent lines, reports, events and actions
+Recording stores one tuple in a preallocated slot; nothing is formatted until a
+dump (SIGUSR1, an error, or a control-socket request) writes the capture format
+"""
+
+import itertools
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from d01_journal import encode_json, read_journal
+
+DEFAULT_CAPACITY = 4096
+DEFAULT_SECONDS = 60.0
+
+class FlightRecorder:
+    """Fixed-size history of the last `seconds` of activity, dumped on demand"""
+
+    def __init__(self, component, capacity=DEFAULT_CAPACITY, seconds=DEFAULT_SECONDS,
+                 directory=None, error_interval=10.0):
+        self.component = component
+        self.capacity = capacity
+        self.seconds = seconds
+        self.directory = directory or os.path.expanduser('~')
+        self.error_interval = error_interval  # At most one error dump per interval
+
+        self.slots = [None] * capacity
+        self.sequence = itertools.count(1)  # next() is atomic under the GIL: no lock on record()
+        self.dump_lock = threading.Lock()
+        self.last_error_dump = 0.0
+        self.control = None
+        self.control_path = None
+        self.stats = {'dumps': 0, 'error_dumps': 0, 'suppressed': 0}
+
+    def record(self, kind, payload):
+        """Remember one raw line/report, parsed event or action (kept by reference)"""
+        number = next(self.sequence)
+        self.slots[number % self.capacity] = (number, time.time(), kind, payload)
+
+    def snapshot(self, now=None):
+        """Entries from the last `seconds`, oldest first"""
+        cutoff = (time.time() if now is None else now) - self.seconds
+        entries = [entry for entry in list(self.slots) if entry and entry[1] >= cutoff]
+        entries.sort()
+        return entries
+
+    def records(self, reason='request'):
+        """Snapshot in the capture format (DirectCapture journal records)"""
+        entries = self.snapshot()
+        yield {'timestamp': time.time(), 'type': 'FLIGHT_DUMP', 'component': self.component,
+               'reason': reason, 'records': len(entries)}
+        for number, timestamp, kind, payload in entries:
+            record = {'timestamp': timestamp, 'type': kind.upper(), 'event_number': number}
+            if isinstance(payload, dict):
+                record.update(payload)
+                record['type'] = kind.upper()
+                if 'type' in payload:
+                    record['event_type'] = payload['type']
+            elif isinstance(payload, str):
+                record['raw_line'] = payload
+            elif isinstance(payload, (bytes, bytearray, list, tuple)):
+                record['report'] = bytes(payload).hex()
+            else:
+                record['value'] = repr(payload)
+            yield record
+
+    def dump(self, reason='request', path=None):
+        """Write the snapshot as a capture file; returns its path"""
+        with self.dump_lock:
+            if path is None:
+                now = time.time()
+                stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + f"{now % 1:.3f}"[1:]
+                path = os.path.join(self.directory, f"d01_flight_{self.component}_{stamp}_{reason}.log")
+            with open(path, 'wb') as handle:
+                for record in self.records(reason):
+                    try:
+                        handle.write(encode_json(record))
+                    except (TypeError, ValueError):
+                        handle.write(encode_json({'timestamp': record['timestamp'], 'type': record['type'],
+                                                  'value': repr(record)}))
+            self.stats['dumps'] += 1
+        return path
+
+    def dump_on_error(self, error):
+        """Record the error and dump, rate-limited so an error storm writes one file"""
+        self.record('error', {'error': f"{type(error).__name__}: {error}"})
+        now = time.monotonic()
+        if now - self.last_error_dump < self.error_interval:
+            self.stats['suppressed'] += 1
+            return None
+        self.last_error_dump = now
+        self.stats['error_dumps'] += 1
+        try:
+            path = self.dump('error')
+            print(f"📼 Flight recorder dumped to {path}")
+            return path
+        except OSError as e:
+            print(f"Flight recorder dump failed: {e}")
+            return None
+
+    def install_signal(self, signum=signal.SIGUSR1):
+        """kill -USR1 <pid> dumps without stopping anything"""
+        def handler(sig, frame):
+            # Write from a thread: the handler interrupts whatever the main thread was doing
+            thread = threading.Thread(target=self.dump_and_report, args=('signal',))
+            thread.daemon = True
+            thread.start()
+        signal.signal(signum, handler)
+
+    def dump_and_report(self, reason):
+        try:
+            print(f"📼 Flight recorder dumped to {self.dump(reason)}")
+        except OSError as e:
+            print(f"Flight recorder dump failed: {e}")
+
+    def socket_path(self):
+        return os.path.join(self.directory, f".d01-flight-{self.component}.sock")
+
+    def serve_control(self, path=None):
+        """Unix socket: 'dump' writes a file and answers its path, 'tail' answers the records"""
+        path = path or self.socket_path()
+        if os.path.exists(path):
+            os.unlink(path)
+        self.control = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.control.bind(path)
+        self.control.listen(4)
+        self.control_path = path
+        thread = threading.Thread(target=self.control_loop, name='d01-flight-control')
+        thread.daemon = True
+        thread.start()
+        return path
+
+    def control_loop(self):
+        while self.control:
+            try:
+                connection, _ = self.control.accept()
+            except OSError:
+                break
+            with connection:
+                try:
+                    command = connection.recv(64).decode('utf-8', 'replace').strip() or 'dump'
+                    if command == 'tail':
+                        reply = b''.join(encode_json(record) for record in self.records('control'))
+                    else:
+                        reply = (self.dump('control') + '\n').encode('utf-8')
+                    connection.sendall(reply)
+                except (OSError, TypeError, ValueError) as e:
+                    print(f"Flight recorder control error: {e}")
+
+    def add_routes(self, metrics_server):
+        """Same snapshot over HTTP next to /metrics"""
+        metrics_server.add_route('/flight', lambda: ''.join(json.dumps(record) + '\n'
+                                                            for record in self.records('http')))
+
+    def close(self):
+        if self.control:
+            control, self.control = self.control, None
+            control.close()
+            if os.path.exists(self.control_path):
+                os.unlink(self.control_path)
+
+def request(path, command='dump'):
+    """Client side of the control socket"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    client.sendall(command.encode('utf-8'))
+    client.shutdown(socket.SHUT_WR)
+    chunks = []
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    client.close()
+    return b''.join(chunks).decode('utf-8')
+
+def benchmark(events=1000000):
+    """Per-record cost, wraparound order, and every dump path"""
+    print("⏱️  D01 flight recorder benchmark")
+    line = ('2025-08-02 10:15:30.123 Df bluetoothd[412:1a2b] [com.apple.bluetooth:HID] '
+            'Received input report indication handle=521 length=8')
+    ok = True
+
+    started = time.perf_counter()
+    for _ in range(events):
+        pass
+    empty = time.perf_counter() - started
+
+    recorder = FlightRecorder('benchmark', capacity=4096, seconds=3600)
+    record = recorder.record
+    started = time.perf_counter()
+    for _ in range(events):
+        record('line', line)
+    elapsed = time.perf_counter() - started - empty
+    print(f"record()         {elapsed / events * 1e9:8.0f} ns per entry ({events:,} entries)")
+
+    # Only the newest `capacity` entries survive, in order
+    numbers = [entry[0] for entry in recorder.snapshot()]
+    wrapped = numbers == list(range(events - 4095, events + 1))
+    ok = ok and wrapped
+    print(f"{'✅' if wrapped else '❌'} wraparound keeps the last {len(numbers)} entries in order")
+
+    # Age window: entries older than `seconds` are left out of dumps
+    recorder = FlightRecorder('benchmark', capacity=64, seconds=0.2)
+    recorder.record('line', 'old')
+    time.sleep(0.3)
+    recorder.record('report', [0x01, 0x10])
+    recorder.record('event', {'type': 'button_event', 'old_state': 0, 'new_state': 1})
+    recent = [entry[2] for entry in recorder.snapshot()]
+    ok = ok and recent == ['report', 'event']
+    print(f"{'✅' if recent == ['report', 'event'] else '❌'} age window drops stale entries")
+
+    directory = tempfile.mkdtemp(prefix='d01-flight-')
+    try:
+        recorder.directory = directory
+        recorder.seconds = 3600
+        recorder.record('action', {'button': 'bottom_short', 'action': 'Start Recording'})
+        started = time.perf_counter()
+        path = recorder.dump()
+        dumped = list(read_journal(path))
+        expected = ['FLIGHT_DUMP', 'LINE', 'REPORT', 'EVENT', 'ACTION']
+        passed = [record['type'] for record in dumped] == expected and dumped[2]['report'] == '0110'
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} dump → capture format ({(time.perf_counter() - started) * 1e3:.1f} ms, "
+              f"{len(dumped)} records read back)")
+
+        socket_path = recorder.serve_control(os.path.join(directory, 'control.sock'))
+        dumped_path = request(socket_path, 'dump').strip()
+        tail = request(socket_path, 'tail').splitlines()
+        passed = os.path.exists(dumped_path) and len(tail) == len(expected)
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} control socket dump and tail")
+        recorder.close()
+
+        recorder.install_signal()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        deadline = time.time() + 2
+        while recorder.stats['dumps'] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        passed = recorder.stats['dumps'] == 3
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} SIGUSR1 dump")
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+
+        first = recorder.dump_on_error(RuntimeError('boom'))
+        second = recorder.dump_on_error(RuntimeError('boom again'))
+        passed = bool(first) and second is None and recorder.stats['suppressed'] == 1
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} error dumps are rate-limited")
+    finally:
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='D01 flight recorder')
+    parser.add_argument('--benchmark', action='store_true', help='measure overhead and check every dump path')
+    parser.add_argument('--dump', metavar='COMPONENT', help='ask a running tool (integrated, remapper) to dump')
+    parser.add_argument('--tail', metavar='COMPONENT', help='print a running tool\'s recent history')
+    args = parser.parse_args()
+
+    if args.dump or args.tail:
+        path = FlightRecorder(args.dump or args.tail).socket_path()
+        try:
+            print(request(path, 'dump' if args.dump else 'tail'), end='')
+        except OSError as e:
+            print(f"❌ No flight recorder at {path}: {e}")
+            sys.exit(1)
+        return
+
+    sys.exit(0 if benchmark() else 1)
+
+if __name__ == "__main__":
+    main()
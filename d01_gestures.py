@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+D01 Gesture Recognizer - Streaming stroke classification for 30-byte trackpad reports
+Decodes motion deltas into a fixed-size ring buffer and emits swipes, taps and double-taps
+(a single tap is held back for double_tap_window so a double tap never also fires "tap")
+"""
+
+import math
+import struct
+import threading
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Pure-Python fallback keeps the recognizer usable without numpy
+    np = None
+
+# Length of the D01 motion/trackpad input report
+MOTION_REPORT_LENGTH = 30
+
+# Byte layout of the motion report: contact flags at byte 1, signed 16-bit
+# little-endian X/Y deltas at bytes 2-5 (override via settings.motion_layout)
+MOTION_LAYOUT = {'contact_offset': 1, 'contact_mask': 0x01, 'delta_offset': 2}
+
+# Eight compass sectors, counter-clockwise from "right" (screen Y grows downwards)
+SWIPE_DIRECTIONS = (
+    'swipe_right', 'swipe_up_right', 'swipe_up', 'swipe_up_left',
+    'swipe_left', 'swipe_down_left', 'swipe_down', 'swipe_down_right'
+)
+
+DIAGONAL_SWIPES = ('swipe_up_right', 'swipe_up_left', 'swipe_down_left', 'swipe_down_right')
+
+DELTA_STRUCT = struct.Struct('<hh')
+
+def decode_motion(report, layout=MOTION_LAYOUT):
+    """Decode (contact, dx, dy) from a raw motion report, or None for other reports"""
+    if len(report) != MOTION_REPORT_LENGTH:
+        return None
+    contact = bool(report[layout['contact_offset']] & layout['contact_mask'])
+    dx, dy = DELTA_STRUCT.unpack_from(bytes(report), layout['delta_offset'])
+    return contact, dx, dy
+
+def gesture_config_keys(gesture):
+    """Config keys to try for a gesture, most specific first"""
+    keys = [gesture]
+    if gesture in DIAGONAL_SWIPES:
+        keys.append('diagonal_swipe')
+    if gesture.startswith('swipe_'):
+        keys.append('swipe')
+    return keys
+
+class GestureRecognizer:
+    """Streaming recognizer over a fixed-size ring buffer of motion samples
+
+    Gestures go to on_gesture(event) and are returned by the call that completed
+    them. A tap is pending until double_tap_window has passed without a second
+    one; it is then released by the next report, by flush(), or on time by the
+    optional scheduler.
+    """
+
+    def __init__(self, settings=None, capacity=128, layout=None, on_gesture=None, scheduler=None):
+        settings = settings or {}
+        self.on_gesture = on_gesture
+        self.scheduler = scheduler  # Optional TimerScheduler to release held taps on time
+        self.capacity = capacity
+        self.layout = layout or settings.get('motion_layout', MOTION_LAYOUT)
+
+        # Thresholds (GUI settings are in milliseconds / motion units)
+        self.swipe_distance = settings.get('swipe_sensitivity', 30)
+        self.double_tap_window = settings.get('double_tap_threshold', 300) / 1000
+        self.tap_max_duration = settings.get('tap_max_duration', 250) / 1000
+        self.tap_max_motion = settings.get('tap_max_motion', max(3, self.swipe_distance // 4))
+        self.min_straightness = settings.get('swipe_straightness', 0.6)
+        self.stroke_gap = settings.get('stroke_gap', 60) / 1000
+
+        # Ring buffer storage
+        if np is not None:
+            self.times = np.zeros(capacity, dtype=np.float64)
+            self.dx = np.zeros(capacity, dtype=np.int32)
+            self.dy = np.zeros(capacity, dtype=np.int32)
+        else:
+            self.times = array('d', [0.0]) * capacity
+            self.dx = array('i', [0]) * capacity
+            self.dy = array('i', [0]) * capacity
+
+        self.head = 0          # Next write position
+        self.stroke_length = 0  # Samples in the current stroke
+        self.stroke_start = None
+        self.in_contact = False
+        self.last_motion_time = None
+        self.pending_tap = None  # Tap event waiting for a possible second tap
+        self.lock = threading.Lock()
+
+        self.reports_processed = 0
+        self.gestures_emitted = 0
+
+    def reset_stroke(self):
+        """Forget the current stroke"""
+        self.stroke_length = 0
+        self.stroke_start = None
+
+    def push(self, timestamp, dx, dy):
+        """Append one motion sample to the ring buffer"""
+        head = self.head
+        self.times[head] = timestamp
+        self.dx[head] = dx
+        self.dy[head] = dy
+        self.head = (head + 1) % self.capacity
+        if self.stroke_length < self.capacity:
+            self.stroke_length += 1
+        if self.stroke_start is None:
+            self.stroke_start = timestamp
+
+    def process_report(self, report, timestamp=None):
+        """Feed one raw report; returns the gesture events it completed (usually none)"""
+        motion = decode_motion(report, self.layout)
+        if motion is None:
+            return []
+        return self.process_motion(motion[0], motion[1], motion[2], timestamp)
+
+    def process_motion(self, contact, dx, dy, timestamp=None):
+        """Feed one decoded motion sample; returns the gesture events it completed"""
+        if timestamp is None:
+            timestamp = time.time()
+        events = []
+        with self.lock:
+            self.reports_processed += 1
+            events.extend(self.release_due(timestamp))
+
+            # A pause longer than stroke_gap closes a contact-less stroke
+            if (self.stroke_length and not self.in_contact and self.last_motion_time is not None
+                    and timestamp - self.last_motion_time > self.stroke_gap):
+                self.finish_stroke(self.last_motion_time, events)
+
+            moving = dx != 0 or dy != 0
+            if contact or moving:
+                self.push(timestamp, dx, dy)
+                if moving:
+                    self.last_motion_time = timestamp
+
+            if contact:
+                self.in_contact = True
+            elif self.in_contact:
+                # Lift-off ends the stroke on this very report
+                self.in_contact = False
+                self.finish_stroke(timestamp, events)
+            elif self.stroke_length and not moving:
+                # Idle report after contact-less motion ends the stroke
+                self.finish_stroke(timestamp, events)
+
+        for event in events:
+            self.deliver(event)
+        return events
+
+    def release_due(self, now):
+        """The held tap, once no second tap can arrive in time"""
+        tap = self.pending_tap
+        if tap is None or now - tap['timestamp'] <= self.double_tap_window:
+            return []
+        self.pending_tap = None
+        self.gestures_emitted += 1
+        return [tap]
+
+    def flush(self, now=None):
+        """Release a held tap whose window has passed (any held tap with now=inf)"""
+        with self.lock:
+            events = self.release_due(time.time() if now is None else now)
+        for event in events:
+            self.deliver(event)
+        return events
+
+    def deliver(self, event):
+        if self.on_gesture:
+            try:
+                self.on_gesture(event)
+            except Exception as e:
+                print(f"Error in gesture handler: {e}")
+
+    def stroke_vectors(self):
+        """Return the (times, dx, dy) samples of the current stroke in order"""
+        count = self.stroke_length
+        start = (self.head - count) % self.capacity
+
+        if np is not None:
+            index = (np.arange(count) + start) % self.capacity
+            return self.times[index], self.dx[index], self.dy[index]
+
+        index = [(start + i) % self.capacity for i in range(count)]
+        return ([self.times[i] for i in index],
+                [self.dx[i] for i in index],
+                [self.dy[i] for i in index])
+
+    def stroke_features(self):
+        """Net displacement, path length and duration of the current stroke"""
+        times, dx, dy = self.stroke_vectors()
+
+        if np is not None:
+            sum_x = int(dx.sum())
+            sum_y = int(dy.sum())
+            path = float(np.hypot(dx, dy).sum())
+            duration = float(times[-1] - times[0]) if len(times) else 0.0
+        else:
+            sum_x = sum(dx)
+            sum_y = sum(dy)
+            path = sum(math.hypot(x, y) for x, y in zip(dx, dy))
+            duration = times[-1] - times[0] if times else 0.0
+
+        return sum_x, sum_y, path, duration
+
+    def finish_stroke(self, timestamp, events):
+        """Classify the completed stroke, append what it emits to events, and reset"""
+        if not self.stroke_length:
+            return
+
+        sum_x, sum_y, path, _ = self.stroke_features()
+        duration = timestamp - self.stroke_start
+        self.reset_stroke()
+
+        distance = math.hypot(sum_x, sum_y)
+        event = {
+            'type': 'gesture',
+            'timestamp': timestamp,
+            'duration': duration,
+            'dx': sum_x,
+            'dy': sum_y,
+            'distance': distance
+        }
+
+        if distance >= self.swipe_distance and path and distance / path >= self.min_straightness:
+            angle = math.atan2(-sum_y, sum_x)
+            sector = int(round(angle / (math.pi / 4))) % 8
+            event['gesture'] = SWIPE_DIRECTIONS[sector]
+            event['diagonal'] = event['gesture'] in DIAGONAL_SWIPES
+            # A tap held back before this swipe was a single tap after all
+            events.extend(self.release_due(float('inf')))
+
+        elif path <= self.tap_max_motion and duration <= self.tap_max_duration:
+            if self.pending_tap is not None:
+                # release_due() already let go of a tap too old to pair with this one
+                event['gesture'] = 'double_tap'
+                self.pending_tap = None
+            else:
+                event['gesture'] = 'tap'
+                self.pending_tap = event
+                if self.scheduler:
+                    self.scheduler.call_later(self.double_tap_window + 0.001, self.flush)
+                return
+
+        else:
+            return
+
+        self.gestures_emitted += 1
+        events.append(event)
+
+def synthetic_motion_capture(strokes=500, report_interval=0.0075, seed=1):
+    """Generate (timestamp, report) pairs for a mix of swipes and taps"""
+    import random
+
+    rng = random.Random(seed)
+    timestamp = 0.0
+    reports = []
+    expected = []
+
+    def make_report(contact, dx, dy):
+        report = bytearray(MOTION_REPORT_LENGTH)
+        report[0] = 0x02
+        report[1] = 0x01 if contact else 0x00
+        DELTA_STRUCT.pack_into(report, 2, dx, dy)
+        return bytes(report)
+
+    for _ in range(strokes):
+        kind = rng.choice(SWIPE_DIRECTIONS + ('tap', 'double_tap'))
+
+        taps = {'tap': 1, 'double_tap': 2}.get(kind)
+        if taps:
+            for _ in range(taps):
+                for _ in range(rng.randint(2, 6)):
+                    reports.append((timestamp, make_report(True, 0, 0)))
+                    timestamp += report_interval
+                reports.append((timestamp, make_report(False, 0, 0)))
+                timestamp += 0.08
+        else:
+            sector = SWIPE_DIRECTIONS.index(kind)
+            angle = sector * math.pi / 4
+            for _ in range(rng.randint(8, 20)):
+                step = rng.uniform(4, 9)
+                dx = int(round(math.cos(angle) * step))
+                dy = int(round(-math.sin(angle) * step))
+                reports.append((timestamp, make_report(True, dx, dy)))
+                timestamp += report_interval
+            reports.append((timestamp, make_report(False, 0, 0)))
+
+        expected.append(kind)
+        timestamp += 0.5  # Pause between gestures
+
+    return reports, expected
+
+def load_motion_capture(path):
+    """Load 30-byte reports from a saved capture file (packets[].bytes)"""
+    import json
+
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    reports = []
+    for packet in data.get('packets', []) + data.get('reports', []):
+        raw = packet.get('bytes') or packet.get('raw_data')
+        if raw and len(raw) == MOTION_REPORT_LENGTH:
+            reports.append((packet.get('timestamp', 0.0), bytes(raw)))
+    return reports, None
+
+def benchmark(paths=None, report_interval=0.0075):
+    """Replay motion captures and measure per-report recognition latency"""
+    print("⏱️  D01 gesture recognizer benchmark")
+    print(f"Vectorized math: {'numpy' if np is not None else 'pure Python fallback'}")
+
+    if paths:
+        reports = []
+        for path in paths:
+            reports.extend(load_motion_capture(path)[0])
+        expected = None
+    else:
+        reports, expected = synthetic_motion_capture(report_interval=report_interval)
+
+    gestures = []
+    recognizer = GestureRecognizer(on_gesture=lambda event: gestures.append(event['gesture']))
+    samples = []
+
+    for timestamp, report in reports:
+        started = time.perf_counter()
+        recognizer.process_report(report, timestamp)
+        samples.append(time.perf_counter() - started)
+    recognizer.flush(now=float('inf'))
+
+    if not samples:
+        print("No 30-byte motion reports to replay")
+        return None
+
+    samples.sort()
+    p50 = samples[len(samples) // 2]
+    p99 = samples[int(len(samples) * 0.99)]
+    print(f"Reports replayed: {len(samples)}")
+    print(f"Gestures emitted: {len(gestures)}")
+    print(f"Per-report latency: p50 {p50 * 1e6:.1f}µs, p99 {p99 * 1e6:.1f}µs, max {samples[-1] * 1e6:.1f}µs")
+    print(f"Report interval budget: {report_interval * 1e6:.0f}µs "
+          f"({'OK' if p99 < report_interval else 'OVER BUDGET'})")
+
+    if expected is not None:
+        # One gesture per stroke: a double tap must not also have fired "tap"
+        correct = sum(1 for got, want in zip(gestures, expected) if got == want)
+        print(f"Accuracy on synthetic strokes: {correct}/{len(expected)} "
+              f"({len(gestures)} gestures for {len(expected)} strokes)")
+        if correct != len(expected) or len(gestures) != len(expected):
+            return None
+
+    return samples
+
+def main():
+    import sys
+
+    if '--benchmark' in sys.argv:
+        paths = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+        sys.exit(0 if benchmark(paths or None) is not None else 1)
+    else:
+        print("Usage: python3 d01_gestures.py --benchmark [capture.json ...]")
+
+if __name__ == "__main__":
+    main()
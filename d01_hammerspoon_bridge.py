@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+D01 Hammerspoon Bridge - Persistent two-way link to a Hammerspoon listener
+Key/system-key events stream in as JSON lines; keystroke actions go back out
+over the same socket instead of one osascript process per action.
+The socket is a 0600 Unix socket in a 0700 directory, and both ends prove they
+know a per-session token before anything but the handshake is exchanged
+"""
+
+import hmac
+import itertools
+import json
+import os
+import re
+import secrets
+import socket
+import stat
+import subprocess
+import threading
+import time
+
+from d01_shutdown import ShutdownCoordinator
+
+DEFAULT_SOCKET = os.path.expanduser('~/.d01/bridge.sock')
+AUTH_TIMEOUT = 2.0  # Seconds a new connection gets to present the token
+# keyDown/keyUp codes the tools need (36 = Return, the ring's short press);
+# media keys always pass, any other keystroke never leaves Hammerspoon
+DEFAULT_WATCH_KEYS = (36,)
+LISTENER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'd01-bridge.lua')
+
+KEYSTROKE_RE = re.compile(r'^tell application "System Events" to keystroke "((?:[^"\\]|\\.)*)"(?: using (.+))?$')
+KEY_CODE_RE = re.compile(r'^tell application "System Events" to key code (\d+)(?: using (.+))?$')
+MODIFIER_NAMES = {'command': 'cmd', 'shift': 'shift', 'option': 'alt', 'control': 'ctrl'}
+
+def parse_modifiers(clause):
+    """'{command down, shift down}' -> ['cmd', 'shift']"""
+    if not clause:
+        return []
+    mods = []
+    for part in clause.strip('{}').split(','):
+        name = part.strip().replace(' down', '')
+        if name not in MODIFIER_NAMES:
+            return None
+        mods.append(MODIFIER_NAMES[name])
+    return mods
+
+def token_path(socket_path):
+    """The session token lives next to the socket: bridge.sock -> bridge.token"""
+    return os.path.splitext(socket_path)[0] + '.token'
+
+def lua_string(text):
+    """Quoted Lua string literal; every byte but plain printable ASCII becomes a \\ddd escape"""
+    return '"' + ''.join(chr(byte) if 32 <= byte < 127 and chr(byte) not in '"\\' else f'\\{byte:03d}'
+                         for byte in text.encode('utf-8')) + '"'
+
+def private_directory(path):
+    """Create (or check) a directory only this user can enter"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if info.st_uid != os.getuid():
+        raise OSError(f"{path} is not owned by this user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+
+def script_to_action(line):
+    """Bridge message for a System Events keystroke/key code line, or None"""
+    match = KEYSTROKE_RE.match(line.strip())
+    if match:
+        mods = parse_modifiers(match.group(2))
+        key = match.group(1).replace('\\"', '"').replace('\\\\', '\\')
+        if mods is not None and len(key) == 1:
+            return {'type': 'keystroke', 'mods': mods, 'key': key}
+        return None
+
+    match = KEY_CODE_RE.match(line.strip())
+    if match:
+        mods = parse_modifiers(match.group(2))
+        if mods is not None:
+            return {'type': 'key_code', 'mods': mods, 'code': int(match.group(1))}
+    return None
+
+class LineSocket:
+    """Newline-delimited JSON over a connected socket"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = b''
+        self.write_lock = threading.Lock()
+
+    def send(self, message):
+        data = (json.dumps(message) + '\n').encode('utf-8')
+        with self.write_lock:
+            self.sock.sendall(data)
+
+    def messages(self):
+        """Yield decoded messages until the peer disconnects"""
+        while True:
+            newline = self.buffer.find(b'\n')
+            while newline < 0:
+                chunk = self.sock.recv(65536)
+                if not chunk:
+                    return
+                self.buffer += chunk
+                newline = self.buffer.find(b'\n')
+
+            line, self.buffer = self.buffer[:newline], self.buffer[newline + 1:]
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+class HammerspoonBridge:
+    """Local server the Hammerspoon listener connects (and reconnects) to"""
+
+    def __init__(self, path=DEFAULT_SOCKET, watch_keys=DEFAULT_WATCH_KEYS):
+        self.path = os.path.expanduser(path)
+        self.token_file = token_path(self.path)
+        self.watch_keys = list(watch_keys)
+        self.token = None
+        self.server = None
+        self.peer = None
+        self.running = False
+        self.connected = threading.Event()
+        self.listeners = []
+        self.ids = itertools.count(1)
+        self.pending = {}  # action id -> send time
+        self.stats = {'events': 0, 'actions': 0, 'acks': 0, 'connections': 0, 'rejected': 0,
+                      'ack_latency_total': 0.0}
+
+    def add_listener(self, callback):
+        """callback(message) for every key/system_key event (runs on the bridge thread)"""
+        self.listeners.append(callback)
+
+    def start(self):
+        """Listen in a daemon thread"""
+        try:
+            private_directory(os.path.dirname(self.path))
+            self.remove_stale_socket()
+            self.token = secrets.token_hex(16)
+            descriptor = os.open(self.token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, 'w') as f:
+                os.fchmod(f.fileno(), 0o600)
+                f.write(self.token)
+
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            previous = os.umask(0o177)
+            try:
+                server.bind(self.path)
+            finally:
+                os.umask(previous)
+            os.chmod(self.path, 0o600)
+            server.listen()
+            self.server = server
+        except OSError as e:
+            print(f"Hammerspoon bridge unavailable at {self.path}: {e}")
+            return False
+
+        self.running = True
+        thread = threading.Thread(target=self.accept_loop, name='d01-hs-bridge')
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def remove_stale_socket(self):
+        """Unlink a socket left by a crashed run; refuse if another bridge still listens"""
+        if not os.path.exists(self.path):
+            return
+        if not stat.S_ISSOCK(os.lstat(self.path).st_mode):
+            raise OSError(f"{self.path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.unlink(self.path)
+            return
+        finally:
+            probe.close()
+        raise OSError("another bridge is already listening")
+
+    def authenticate(self, peer, messages):
+        """The first line must be a hello carrying the session token; answer with ours"""
+        peer.sock.settimeout(AUTH_TIMEOUT)
+        try:
+            hello = next(messages, None)
+        except OSError:
+            return False
+        token = hello.get('token') if isinstance(hello, dict) and hello.get('type') == 'hello' else None
+        if not isinstance(token, str) or not hmac.compare_digest(token, self.token):
+            return False
+        peer.sock.settimeout(None)
+        peer.send({'type': 'welcome', 'token': self.token, 'keys': self.watch_keys})
+        return True
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                break
+
+            peer = LineSocket(sock)
+            messages = peer.messages()
+            if not self.authenticate(peer, messages):
+                # Never replaces the current listener and never sees an action
+                self.stats['rejected'] += 1
+                peer.close()
+                continue
+
+            if self.peer:
+                self.peer.close()  # A reloaded listener replaces the old connection
+            self.peer = peer
+            self.stats['connections'] += 1
+            self.connected.set()
+
+            try:
+                for message in messages:
+                    self.dispatch(message)
+            except OSError:
+                pass
+            finally:
+                if self.peer is peer:
+                    self.peer = None
+                    self.connected.clear()
+
+    def dispatch(self, message):
+        kind = message.get('type')
+        if kind == 'ack':
+            sent = self.pending.pop(message.get('id'), None)
+            if sent is not None:
+                self.stats['acks'] += 1
+                self.stats['ack_latency_total'] += time.perf_counter() - sent
+            return
+        if kind == 'hello':
+            return
+
+        self.stats['events'] += 1
+        for listener in list(self.listeners):
+            try:
+                listener(message)
+            except Exception as e:
+                print(f"Error in bridge listener: {e}")
+
+    def wait_connected(self, timeout=None):
+        return self.connected.wait(timeout)
+
+    def is_connected(self):
+        return self.connected.is_set()
+
+    def send(self, message):
+        """Send an action; returns False when no listener is connected"""
+        peer = self.peer
+        if not peer:
+            return False
+        message = dict(message, id=next(self.ids))
+        self.pending[message['id']] = time.perf_counter()
+        if len(self.pending) > 1024:
+            self.pending.pop(next(iter(self.pending)))  # Never acked - forget it
+        try:
+            peer.send(message)
+        except OSError:
+            return False
+        self.stats['actions'] += 1
+        return True
+
+    def send_all(self, actions):
+        """Send actions in order, stopping at the first failure; returns how many were sent"""
+        sent = 0
+        for action in actions:
+            if not self.send(action):
+                break
+            sent += 1
+        return sent
+
+    def keystroke(self, key, mods=()):
+        return self.send({'type': 'keystroke', 'mods': list(mods), 'key': key})
+
+    def key_code(self, code, mods=()):
+        return self.send({'type': 'key_code', 'mods': list(mods), 'code': code})
+
+    def alert(self, text, duration=1):
+        return self.send({'type': 'alert', 'text': text, 'duration': duration})
+
+    def load_listener(self, script_path=LISTENER_SCRIPT):
+        """Ask a running Hammerspoon to load the listener once (it then persists)"""
+        command = f'd01BridgeSocketPath = {lua_string(self.path)}; dofile({lua_string(script_path)})'
+        try:
+            subprocess.Popen(['hs', '-c', command],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+        except FileNotFoundError:
+            print("Hammerspoon CLI not found. Install with: brew install hammerspoon")
+            return False
+
+    def stop(self):
+        self.running = False
+        if self.peer:
+            self.peer.close()
+        if self.server:
+            self.server.close()
+            self.server = None
+            for path in (self.path, self.token_file):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+class MockHammerspoonPeer:
+    """Stand-in for d01-bridge.lua: emits events and acknowledges actions"""
+
+    def __init__(self, path, token=None):
+        if token is None:
+            with open(token_path(path), 'r') as f:
+                token = f.read().strip()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        self.sock = LineSocket(sock)
+        self.token = token
+        self.actions = []
+        self.welcomed = threading.Event()
+        self.closed = threading.Event()
+        self.sock.send({'type': 'hello', 'version': 2, 'token': token})
+
+        thread = threading.Thread(target=self.read_loop)
+        thread.daemon = True
+        thread.start()
+
+    def read_loop(self):
+        try:
+            for message in self.sock.messages():
+                if not self.welcomed.is_set():
+                    # Like the Lua side: nothing but a welcome with our token counts
+                    if message.get('type') != 'welcome' or message.get('token') != self.token:
+                        break
+                    self.welcomed.set()
+                    continue
+                self.actions.append(message)
+                if 'id' in message:
+                    self.sock.send({'type': 'ack', 'id': message['id'], 'ok': True, 'ts': time.time()})
+        except OSError:
+            pass
+        self.closed.set()
+
+    def key(self, code, down=True):
+        self.sock.send({'type': 'key', 'event': 'down' if down else 'up', 'code': code, 'ts': time.time()})
+
+    def system_key(self, key, down=True):
+        self.sock.send({'type': 'system_key', 'key': key, 'down': down, 'ts': time.time()})
+
+    def close(self):
+        self.sock.close()
+
+def format_event(message):
+    """Console line matching the old Hammerspoon monitor output"""
+    timestamp = time.strftime('%H:%M:%S')
+    if message.get('type') == 'key':
+        return f"[{timestamp}] KEY {message['event'].upper()}: {message['code']}"
+    if message.get('type') == 'system_key':
+        return f"[{timestamp}] SYSTEM KEY: {message['key']} ({'DOWN' if message['down'] else 'UP'})"
+    return f"[{timestamp}] {message}"
+
+def run_demo(events=2000):
+    """Round trip through a mock peer: event delivery and action ack latency"""
+    import tempfile
+
+    print("🧪 D01 Hammerspoon bridge demo (mock peer)")
+    directory = tempfile.mkdtemp(prefix='d01-bridge-')
+    bridge = HammerspoonBridge(os.path.join(directory, 'bridge.sock'))
+    bridge.start()
+    mode = stat.S_IMODE(os.stat(bridge.path).st_mode)
+
+    latencies = []
+    received = threading.Event()
+
+    def on_event(message):
+        latencies.append(time.time() - message['ts'])
+        if len(latencies) == events:
+            received.set()
+
+    bridge.add_listener(on_event)
+
+    # A local process without the token is dropped and never becomes the listener
+    intruder = MockHammerspoonPeer(bridge.path, token='0' * 32)
+    rejected = intruder.closed.wait(2) and not bridge.is_connected()
+    intruder.close()
+
+    peer = MockHammerspoonPeer(bridge.path)
+    bridge.wait_connected(2)
+    peer.welcomed.wait(2)
+
+    # Paced like real button traffic rather than one burst
+    for index in range(events):
+        peer.key(16, down=index % 2 == 0)
+        time.sleep(0.0005)
+    received.wait(5)
+
+    for _ in range(events):
+        bridge.key_code(36)
+        time.sleep(0.0005)
+    deadline = time.time() + 5
+    while bridge.stats['acks'] < events and time.time() < deadline:
+        time.sleep(0.01)
+
+    latencies.sort()
+    acks = bridge.stats['acks']
+    print(f"Events delivered: {len(latencies)}/{events}, "
+          f"p50 {latencies[len(latencies) // 2] * 1e6:.0f}µs, p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f}µs")
+    print(f"Actions acknowledged: {acks}/{events}, "
+          f"mean round trip {bridge.stats['ack_latency_total'] / max(acks, 1) * 1e6:.0f}µs")
+
+    print(f"Socket mode {mode:o}, wrong-token peer rejected: {'yes' if rejected else 'NO'}, "
+          f"key codes forwarded: {bridge.watch_keys}")
+
+    peer.close()
+    bridge.stop()
+    os.rmdir(directory)
+    return len(latencies) == events and acks == events and rejected and mode == 0o600
+
+def main():
+    import sys
+
+    if '--demo' in sys.argv:
+        sys.exit(0 if run_demo() else 1)
+
+    bridge = HammerspoonBridge()
+    if not bridge.start():
+        sys.exit(1)
+    bridge.add_listener(lambda message: print(format_event(message)))
+
+    with ShutdownCoordinator('Hammerspoon bridge') as shutdown:
+        shutdown.on_stop(bridge.stop, 'bridge')
+        shutdown.on_stats(lambda: print(f"📊 {bridge.stats['events']} events, "
+                                        f"{bridge.stats['actions']} actions sent"), 'stats')
+
+        print(f"🔗 Waiting for Hammerspoon on {bridge.path}...")
+        if not bridge.wait_connected(3):
+            bridge.load_listener()
+        shutdown.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+D01 Journal - Buffered, rotating event journal written on a background thread
+Callers only enqueue; the writer keeps the file open, batches records and
+flushes on size, time or close. Records are JSON lines or compact binary
+"""
+
+import json
+import os
+import queue
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+BINARY_MAGIC = b'D01J\x01'
+
+# Binary record: payload length, type id, timestamp, event number; payload is compact JSON
+RECORD = struct.Struct('<IBdI')
+TYPE_DEFINITION = 0  # Record that names a type id (name in payload, id in event number)
+
+STOP = object()
+ROTATE_RETRY = 5.0  # Seconds before retrying a rotation that failed
+
+COMPACT_JSON = json.JSONEncoder(separators=(',', ':'))
+
+def encode_json(record):
+    return (json.dumps(record) + '\n').encode('utf-8')
+
+class BinaryEncoder:
+    """Binary records with a per-file type table (ids assigned on first use)"""
+
+    def __init__(self):
+        self.types = {}
+
+    def reset(self):
+        self.types = {}
+
+    def encode(self, record):
+        name = str(record.get('type', ''))
+        prefix = b''
+        type_id = self.types.get(name)
+        if type_id is None:
+            type_id = self.types[name] = len(self.types) + 1
+            payload = name.encode('utf-8')
+            prefix = RECORD.pack(len(payload), TYPE_DEFINITION, 0.0, type_id) + payload
+
+        rest = {key: value for key, value in record.items() if key not in ('type', 'timestamp', 'event_number')}
+        payload = COMPACT_JSON.encode(rest).encode('utf-8') if rest else b''
+        return prefix + RECORD.pack(len(payload), type_id, float(record.get('timestamp', 0.0)),
+                                    int(record.get('event_number', 0))) + payload
+
+def read_journal(path):
+    """Yield records from a JSON-lines or binary journal"""
+    with open(path, 'rb') as handle:
+        data = handle.read()
+
+    if not data.startswith(BINARY_MAGIC):
+        for line in data.splitlines():
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        return
+
+    # A rotated-and-appended file may contain several magic headers
+    types = {}
+    position = len(BINARY_MAGIC)
+    while position + RECORD.size <= len(data):
+        if data.startswith(BINARY_MAGIC, position):
+            types = {}
+            position += len(BINARY_MAGIC)
+            continue
+        length, type_id, timestamp, event_number = RECORD.unpack_from(data, position)
+        position += RECORD.size
+        payload = data[position:position + length]
+        position += length
+
+        if type_id == TYPE_DEFINITION:
+            types[event_number] = payload.decode('utf-8')
+            continue
+        record = {'timestamp': timestamp, 'type': types.get(type_id, str(type_id))}
+        if event_number:
+            record['event_number'] = event_number
+        if payload:
+            record.update(json.loads(payload))
+        yield record
+
+class JournalWriter:
+    """Append records to a journal without blocking the caller"""
+
+    def __init__(self, path, binary=False, max_bytes=16 << 20, max_age=3600.0, backups=5,
+                 flush_bytes=64 << 10, flush_interval=1.0, queue_size=10000, block=False):
+        self.path = path
+        self.binary = binary
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.block = block  # True: wait for queue space instead of dropping
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.encoder = BinaryEncoder() if binary else None
+        self.handle = None
+        self.opened_at = 0.0
+        self.file_bytes = 0
+        self.rotate_retry_at = 0.0
+        self.buffer = []
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+        self.stats = {'written': 0, 'dropped': 0, 'flushes': 0, 'rotations': 0, 'bytes': 0, 'errors': 0}
+
+        self.open()
+        self.thread = threading.Thread(target=self.run, name='d01-journal')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, record):
+        """Queue a record; returns False if it was dropped (queue full or writer gone)"""
+        if not self.thread or not self.thread.is_alive():
+            self.stats['dropped'] += 1
+            return False
+        try:
+            self.queue.put(record, block=self.block)
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.handle = open(self.path, 'ab')
+        self.opened_at = time.monotonic()
+        self.file_bytes = self.handle.tell()
+        self.header_bytes = 0
+        if self.binary:
+            # Also written when appending: type ids restart after every marker
+            self.encoder.reset()
+            self.handle.write(BINARY_MAGIC)
+            self.header_bytes = len(BINARY_MAGIC)
+            self.file_bytes += len(BINARY_MAGIC)
+
+    def run(self):
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - self.last_flush))
+            try:
+                record = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            if record is STOP:
+                break
+            now = time.monotonic()
+            if record is not None:
+                if self.should_rotate(now):
+                    # Rotate between records so binary type ids stay per file
+                    self.flush()
+                    self.rotate()
+                self.append(record)
+
+            if self.buffered >= self.flush_bytes or now - self.last_flush >= self.flush_interval:
+                self.flush()
+
+        # Drain whatever is still queued, then flush
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not STOP:
+                self.append(record)
+        self.flush()
+
+    def append(self, record):
+        """Encode a record into the buffer; an unencodable one is skipped, not fatal"""
+        try:
+            data = self.encoder.encode(record) if self.binary else encode_json(record)
+        except (TypeError, ValueError) as e:
+            print(f"Journal: unencodable record skipped: {e}")
+            return
+        self.buffer.append(data)
+        self.buffered += len(data)
+        self.stats['written'] += 1
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        if self.handle is None:
+            self.reopen()
+        data = b''.join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        if self.handle is None:
+            self.stats['errors'] += 1
+            return
+        try:
+            self.handle.write(data)
+            self.handle.flush()
+        except OSError as e:
+            print(f"Journal write error: {e}")
+            return
+        self.file_bytes += len(data)
+        self.stats['flushes'] += 1
+        self.stats['bytes'] += len(data)
+
+    def should_rotate(self, now):
+        size = self.file_bytes + self.buffered
+        if size <= self.header_bytes:
+            return False  # Never rotate an empty file
+        if now < self.rotate_retry_at:
+            return False  # Last rotation failed; don't retry on every flush
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        return bool(self.max_age) and now - self.opened_at >= self.max_age
+
+    def rotate(self):
+        """journal -> journal.1 -> journal.2 ... (oldest beyond `backups` removed)
+
+        A failed rotation keeps appending to the current file rather than ending the writer.
+        """
+        try:
+            if self.handle:
+                self.handle.close()
+                self.handle = None
+            for index in range(self.backups, 0, -1):
+                source = self.path if index == 1 else f"{self.path}.{index - 1}"
+                target = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, target)
+            if not self.backups:
+                os.unlink(self.path)
+            self.stats['rotations'] += 1
+        except OSError as e:
+            self.stats['errors'] += 1
+            self.rotate_retry_at = time.monotonic() + ROTATE_RETRY
+            print(f"Journal rotation error: {e}")
+        self.reopen()
+
+    def reopen(self):
+        try:
+            self.open()
+        except OSError as e:
+            self.handle = None  # flush() retries; buffered records are counted as errors meanwhile
+            self.stats['errors'] += 1
+            print(f"Journal open error: {e}")
+
+    def close(self, timeout=10):
+        """Flush everything queued and close the file (not while the writer still runs)"""
+        if not self.thread:
+            return
+        if self.thread.is_alive():
+            try:
+                self.queue.put(STOP, timeout=timeout)
+            except queue.Full:
+                print("Journal: writer not draining, records still queued are lost")
+            self.thread.join(timeout=timeout)
+        if self.thread.is_alive():
+            print("Journal: writer still busy, file left open")
+            return
+        self.thread = None
+        if self.handle:
+            self.handle.close()
+            self.handle = None
+
+def per_event_open(path, record):
+    """What D01DirectCapture.log_event used to do for every event"""
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+def benchmark(events=100000):
+    """Events/second: open-append-close per event vs. the journal writer"""
+    print("⏱️  D01 journal benchmark")
+    directory = tempfile.mkdtemp(prefix='d01-journal-')
+    record = {'timestamp': 0.0, 'type': 'INPUT_EVENT', 'event_number': 0,
+              'raw_line': '2025-08-02 10:15:30.123 Df bluetoothd[412:1a2b] [com.apple.bluetooth:HID] '
+                          'Received input report indication handle=521 length=8'}
+    ok = True
+    try:
+        path = os.path.join(directory, 'per-event.log')
+        started = time.perf_counter()
+        for index in range(events):
+            per_event_open(path, dict(record, timestamp=time.time(), event_number=index + 1))
+        elapsed = time.perf_counter() - started
+        baseline = events / elapsed
+        print(f"per-event open   {baseline:>10,.0f} events/s  {os.path.getsize(path) / 1e6:6.1f} MB")
+
+        for label, binary in (('journal (json)', False), ('journal (binary)', True)):
+            path = os.path.join(directory, 'journal.bin' if binary else 'journal.log')
+            writer = JournalWriter(path, binary=binary, max_bytes=0, block=True)
+            started = time.perf_counter()
+            for index in range(events):
+                writer.write(dict(record, timestamp=time.time(), event_number=index + 1))
+            enqueue = time.perf_counter() - started
+            writer.close()
+            total = time.perf_counter() - started
+
+            count = sum(1 for _ in read_journal(path))
+            ok = ok and count == events
+            print(f"{label:<16} {events / total:>10,.0f} events/s  {os.path.getsize(path) / 1e6:6.1f} MB  "
+                  f"(caller {events / enqueue:,.0f}/s, {writer.stats['flushes']} flushes, {count} read back)")
+
+        # Rotation keeps every record across the backups
+        path = os.path.join(directory, 'rotating.bin')
+        writer = JournalWriter(path, binary=True, max_bytes=256 << 10, backups=50, block=True)
+        for index in range(20000):
+            writer.write(dict(record, timestamp=time.time(), event_number=index + 1))
+        writer.close()
+        files = [path] + [f"{path}.{index}" for index in range(1, 51) if os.path.exists(f"{path}.{index}")]
+        count = sum(1 for name in files for _ in read_journal(name))
+        ok = ok and count == 20000
+        print(f"rotation         {writer.stats['rotations']} rotations, {count}/20000 records across {len(files)} files")
+    finally:
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark() else 1)
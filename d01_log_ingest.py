@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+D01 Log Ingest - Large-block binary reader for `log stream` output
+Lines are split with bytes.find and filtered by bytes keywords; only the
+few lines that survive are ever decoded to str. Compact and NDJSON lines
+parse to the same typed events
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+# Messages that carry D01 events; also the bytes pre-filter for event consumers
+EVENT_MARKERS = ('buttonState changed', 'Received input report indication')
+
+HANDLE_RE = re.compile(r'handle=(\d+)')
+LENGTH_RE = re.compile(r'length=(\d+)')
+BUTTON_STATE_RE = re.compile(r'buttonState changed \((\d+)->(\d+)\)')
+
+class BlockLineReader:
+    """Feed raw pipe blocks in, get matching decoded lines out
+
+    keywords: substrings a line must contain (any of them); None keeps every line
+    ignore_case: match keywords against a lowered copy of the block, like line.lower()
+    """
+
+    def __init__(self, keywords=None, ignore_case=True):
+        self.ignore_case = ignore_case
+        self.keywords = None
+        if keywords:
+            encoded = [keyword.encode('utf-8') if isinstance(keyword, str) else keyword for keyword in keywords]
+            encoded = {keyword.lower() if ignore_case else keyword for keyword in encoded}
+            # A keyword containing a shorter one can never add a match
+            self.keywords = sorted(keyword for keyword in encoded
+                                   if not any(other != keyword and other in keyword for other in encoded))
+        self.buffer = b''
+        self.stats = {'bytes': 0, 'lines': 0, 'matched': 0}
+
+    def add_keyword(self, keyword):
+        """Let one more substring through (e.g. a heartbeat marker)"""
+        if self.keywords is None:
+            return
+        keyword = keyword.encode('utf-8') if isinstance(keyword, str) else keyword
+        keyword = keyword.lower() if self.ignore_case else keyword
+        if keyword not in self.keywords:
+            self.keywords.append(keyword)
+
+    def feed(self, chunk):
+        """Matching lines (decoded, stripped) from the complete lines in buffer + chunk"""
+        self.stats['bytes'] += len(chunk)
+        data = self.buffer + chunk if self.buffer else chunk
+        last = data.rfind(b'\n')
+        if last < 0:
+            self.buffer = data
+            return []
+        self.buffer = data[last + 1:]
+        return self.scan(data, last + 1)
+
+    def flush(self):
+        """Matching lines from a final unterminated line"""
+        data, self.buffer = self.buffer, b''
+        return self.scan(data + b'\n', len(data) + 1) if data else []
+
+    def scan(self, data, end):
+        self.stats['lines'] += data.count(b'\n', 0, end)
+
+        if self.keywords is None:
+            lines = []
+            start = 0
+            while start < end:
+                newline = data.find(b'\n', start, end)
+                line = data[start:newline].strip()
+                if line:
+                    lines.append(line.decode('utf-8', 'replace'))
+                start = newline + 1
+            self.stats['matched'] += len(lines)
+            return lines
+
+        # Search the whole block per keyword and expand each hit to its line
+        haystack = data.lower() if self.ignore_case else data
+        starts = set()
+        for keyword in self.keywords:
+            position = haystack.find(keyword, 0, end)
+            while position >= 0:
+                line_start = haystack.rfind(b'\n', 0, position) + 1
+                line_end = haystack.find(b'\n', position, end)
+                starts.add(line_start)
+                position = haystack.find(keyword, line_end + 1, end)
+
+        lines = []
+        for line_start in sorted(starts):
+            line = data[line_start:data.find(b'\n', line_start, end)].strip()
+            if line:
+                lines.append(line.decode('utf-8', 'replace'))
+        self.stats['matched'] += len(lines)
+        return lines
+
+def read_matching_lines(fd, keywords=None, ignore_case=True, block_size=DEFAULT_BLOCK_SIZE):
+    """Yield matching lines from a file descriptor until EOF"""
+    reader = BlockLineReader(keywords, ignore_case)
+    while True:
+        chunk = os.read(fd, block_size)
+        if not chunk:
+            break
+        yield from reader.feed(chunk)
+    yield from reader.flush()
+
+def classify_message(message):
+    """Typed fields for a D01 event message ({'type': 'hid_report' | 'button_event', ...}), or None"""
+    if 'Received input report indication' in message:
+        handle_match = HANDLE_RE.search(message)
+        length_match = LENGTH_RE.search(message)
+        if handle_match and length_match:
+            return {'type': 'hid_report', 'handle': handle_match.group(1), 'length': int(length_match.group(1))}
+    elif 'buttonState changed' in message:
+        state_match = BUTTON_STATE_RE.search(message)
+        if state_match:
+            old_state = int(state_match.group(1))
+            new_state = int(state_match.group(2))
+            return {'type': 'button_event', 'old_state': old_state, 'new_state': new_state,
+                    'action': 'press' if new_state > old_state else 'release'}
+    return None
+
+def parse_compact_timestamp(line):
+    """Event time from a compact-style line ('2025-08-02 10:15:30.123 ...'), or None"""
+    try:
+        return datetime.strptime(line[:23], '%Y-%m-%d %H:%M:%S.%f').timestamp()
+    except ValueError:
+        return None
+
+def parse_ndjson_timestamp(value):
+    """'2025-08-02 10:15:30.123456-0700' -> epoch seconds, or None"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S.%f%z').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def build_event(fields, timestamp, process, subsystem, category, message):
+    fields.update(timestamp=timestamp, process=process, subsystem=subsystem,
+                  category=category, message=message)
+    return fields
+
+def split_compact_line(line):
+    """'<date> <time> Df proc[pid:tid] [subsystem:category] message' -> (process, subsystem, category, message)"""
+    parts = line[24:].split(' ', 2)
+    if len(parts) < 3:
+        return None
+    process = parts[1].split('[', 1)[0]
+    subsystem = category = None
+    message = parts[2]
+    if message.startswith('['):
+        close = message.find('] ')
+        if close > 0:
+            subsystem, _, category = message[1:close].partition(':')
+            message = message[close + 2:]
+    return process, subsystem, category, message
+
+def parse_compact_line(line):
+    """A compact `log stream` line -> event, or None"""
+    parts = split_compact_line(line)
+    if not parts:
+        return None
+    fields = classify_message(parts[3])
+    if not fields:
+        return None
+    return build_event(fields, parse_compact_timestamp(line), *parts)
+
+def json_field(record, key):
+    """Value of a top-level string/number field without parsing the whole record"""
+    marker = f'"{key}":'
+    index = record.find(marker)
+    if index < 0:
+        return None
+    index += len(marker)
+    while index < len(record) and record[index] == ' ':
+        index += 1
+    if index >= len(record):
+        return None
+
+    if record[index] != '"':
+        end = index
+        while end < len(record) and record[end] not in ',}':
+            end += 1
+        try:
+            return json.loads(record[index:end])
+        except ValueError:
+            return None
+
+    # Find the closing quote, skipping escaped ones
+    end = index + 1
+    while True:
+        end = record.find('"', end)
+        if end < 0:
+            return None
+        backslashes = 0
+        while record[end - 1 - backslashes] == '\\':
+            backslashes += 1
+        if backslashes % 2 == 0:
+            break
+        end += 1
+    value = record[index + 1:end]
+    return json.loads(record[index:end + 1]) if '\\' in value else value
+
+def parse_ndjson_record(record):
+    """Lazy NDJSON parse: eventMessage first, other fields only for accepted records"""
+    message = json_field(record, 'eventMessage')
+    if message is None:
+        return None
+    fields = classify_message(message)
+    if not fields:
+        return None
+    process = json_field(record, 'processImagePath') or ''
+    return build_event(fields, parse_ndjson_timestamp(json_field(record, 'timestamp')),
+                       os.path.basename(process), json_field(record, 'subsystem'),
+                       json_field(record, 'category'), message)
+
+def parse_ndjson_record_full(record):
+    """Reference NDJSON parse with json.loads on every record"""
+    try:
+        data = json.loads(record)
+    except ValueError:
+        return None
+    message = data.get('eventMessage')
+    fields = classify_message(message) if message else None
+    if not fields:
+        return None
+    return build_event(fields, parse_ndjson_timestamp(data.get('timestamp')),
+                       os.path.basename(data.get('processImagePath') or ''), data.get('subsystem'),
+                       data.get('category'), message)
+
+class LogEventParser:
+    """Lines of either `log stream` style -> typed events"""
+
+    def __init__(self, style='compact'):
+        self.style = style
+        self.parse_line = parse_ndjson_record if style == 'ndjson' else parse_compact_line
+        self.stats = {'lines': 0, 'events': 0}
+
+    def parse(self, line):
+        self.stats['lines'] += 1
+        event = self.parse_line(line)
+        if event:
+            self.stats['events'] += 1
+        return event
+
+def format_compact(timestamp, process, pid, subsystem, category, message):
+    """A `log stream --style compact` line"""
+    stamp = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:23]
+    return f"{stamp} Df {process}[{pid}:1a2b] [{subsystem}:{category}] {message}"
+
+def format_ndjson(timestamp, process, pid, subsystem, category, message):
+    """A `log stream --style ndjson` record (field set and order as macOS writes them)"""
+    stamp = datetime.fromtimestamp(timestamp).astimezone().strftime('%Y-%m-%d %H:%M:%S.%f%z')
+    return json.dumps({
+        'traceID': 8589934596, 'eventMessage': message, 'eventType': 'logEvent', 'source': None,
+        'formatString': '%{public}s', 'activityIdentifier': 0, 'subsystem': subsystem,
+        'category': category, 'threadID': 6699, 'senderImageUUID': '5A2C3E5F-0B44-3D4B-9F0E-3E0E2C1D4A77',
+        'backtrace': {'frames': [{'imageOffset': 81234, 'imageUUID': '5A2C3E5F-0B44-3D4B-9F0E-3E0E2C1D4A77'}]},
+        'bootUUID': '', 'processImagePath': f'/usr/sbin/{process}', 'timestamp': stamp,
+        'senderImagePath': f'/usr/sbin/{process}', 'machTimestamp': int(timestamp * 1e9),
+        'messageType': 'Default', 'processImageUUID': '5A2C3E5F-0B44-3D4B-9F0E-3E0E2C1D4A77',
+        'processID': pid, 'senderProgramCounter': 81234, 'parentActivityIdentifier': 0, 'timezoneName': ''
+    })
+
+# Synthetic unified-log traffic: mostly daemon noise, a few HID lines
+NOISE_LINES = [
+    'Df kernel[0:1f3] (AppleBCMWLANCore) AppleBCMWLANCore::updateLinkQualityMetrics rssi=-58 noise=-94',
+    'Df WindowServer[163:2a7] [com.apple.windowserver:display] Display 1 vsync timestamp drift 0.02ms',
+    'Df mDNSResponder[221:3c1] [com.apple.mDNSResponder:Default] Resolved _companion-link._tcp.local.',
+    'Df bluetoothd[412:1a2b] [com.apple.bluetooth:Server.Core] desense coex update wlan channel 149',
+    'Df runningboardd[118:7e2] [com.apple.runningboard:process] Acquiring assertion targeting pid 8812',
+    'Df powerd[97:4d1] [com.apple.powerd:sleepWake] Idle sleep preventers: none',
+    'Df trustd[301:99] [com.apple.securityd:ocsp] OCSP response cached for 3600s',
+    'Df locationd[188:5f5] [com.apple.locationd.Core:Core] Wifi scan complete, 23 access points',
+]
+SIGNAL_LINES = [
+    'Df bluetoothd[412:1a2b] [com.apple.bluetooth:HID] Received input report indication handle=521 length=8',
+    'Df kernel[0:1f3] (IOHIDFamily) IOHIDEventService buttonState changed (0->1) SenderID 0x100000a3c',
+]
+
+def legacy_relevant(line, keywords):
+    """The text-mode check every consumer used to run"""
+    line_lower = line.lower()
+    return any(keyword in line_lower for keyword in keywords)
+
+def write_synthetic_log(path, size_bytes, signal_every=400):
+    """Write compact-style lines until the file reaches size_bytes"""
+    block = []
+    for index in range(20000):
+        stamp = f'2025-08-02 10:{index // 6000 % 60:02d}:{index // 100 % 60:02d}.{index % 1000:03d}'
+        if index % signal_every == 0:
+            body = SIGNAL_LINES[index // signal_every % len(SIGNAL_LINES)]
+        else:
+            body = NOISE_LINES[index % len(NOISE_LINES)]
+        block.append(f'{stamp} {body}\n')
+    block = ''.join(block).encode('utf-8')
+
+    written = 0
+    with open(path, 'wb') as handle:
+        while written < size_bytes:
+            handle.write(block)
+            written += len(block)
+    return written
+
+def benchmark(size_mb=256, path=None):
+    """CPU per million lines: readline + lower() loop vs. block reader + bytes pre-filter"""
+    keywords = ['hid', 'bluetooth:hid', 'button', 'input report', 'd01', 'keyboard']
+    keep = path is not None
+    if path is None:
+        handle, path = tempfile.mkstemp(prefix='d01-log-', suffix='.log')
+        os.close(handle)
+
+    try:
+        if not keep or not os.path.exists(path):
+            print(f"📝 Writing {size_mb} MB synthetic log to {path}...")
+            write_synthetic_log(path, size_mb << 20)
+        size = os.path.getsize(path)
+        print(f"⏱️  D01 log ingest benchmark ({size / (1 << 20):.0f} MB)")
+
+        started = time.process_time()
+        lines = matched = 0
+        with open(path, 'r', errors='replace') as handle:
+            while True:
+                line = handle.readline()
+                if not line:
+                    break
+                lines += 1
+                line = line.strip()
+                if line and legacy_relevant(line, keywords):
+                    matched += 1
+        legacy_cpu = time.process_time() - started
+
+        started = time.process_time()
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            reader = BlockLineReader(keywords)
+            block_matched = 0
+            while True:
+                chunk = os.read(fd, DEFAULT_BLOCK_SIZE)
+                if not chunk:
+                    break
+                block_matched += len(reader.feed(chunk))
+            block_matched += len(reader.flush())
+        finally:
+            os.close(fd)
+        block_cpu = time.process_time() - started
+
+        millions = lines / 1e6
+        print(f"Lines: {lines:,}  matched: {matched:,} (block reader: {block_matched:,})")
+        print(f"readline loop: {legacy_cpu:6.2f}s CPU  {legacy_cpu / millions:6.3f}s per million lines")
+        print(f"block reader:  {block_cpu:6.2f}s CPU  {block_cpu / millions:6.3f}s per million lines")
+        print(f"Speedup: {legacy_cpu / max(block_cpu, 1e-9):.1f}x")
+        return matched == block_matched
+    finally:
+        if not keep:
+            os.unlink(path)
+
+# (process, subsystem, category, message) for recorded event fixtures
+FIXTURE_NOISE = [
+    ('kernel', 'com.apple.iokit', 'WLAN', 'AppleBCMWLANCore::updateLinkQualityMetrics rssi=-58 noise=-94'),
+    ('WindowServer', 'com.apple.windowserver', 'display', 'Display 1 vsync timestamp drift 0.02ms'),
+    ('bluetoothd', 'com.apple.bluetooth', 'Server.Core', 'desense coex update wlan channel 149'),
+    ('runningboardd', 'com.apple.runningboard', 'process', 'Acquiring assertion targeting pid 8812'),
+    ('bluetoothd', 'com.apple.bluetooth', 'HID', 'Process button state for handle=521'),
+]
+FIXTURE_EVENTS = [
+    ('bluetoothd', 'com.apple.bluetooth', 'HID', 'Received input report indication handle=521 length=8'),
+    ('bluetoothd', 'com.apple.bluetooth', 'HID', 'buttonState changed (0->1)'),
+    ('bluetoothd', 'com.apple.bluetooth', 'HID', 'Received input report indication handle=521 length=8'),
+    ('bluetoothd', 'com.apple.bluetooth', 'HID', 'buttonState changed (1->0)'),
+]
+
+def write_event_fixtures(directory, records=200000, event_every=25):
+    """The same records as compact and NDJSON files; returns both paths"""
+    os.makedirs(directory, exist_ok=True)
+    compact_path = os.path.join(directory, 'd01-events.log')
+    ndjson_path = os.path.join(directory, 'd01-events.ndjson')
+    if os.path.exists(compact_path) and os.path.exists(ndjson_path):
+        return compact_path, ndjson_path
+
+    started = time.time() - records * 0.001
+    with open(compact_path, 'w') as compact, open(ndjson_path, 'w') as ndjson:
+        for index in range(records):
+            if index % event_every == 0:
+                process, subsystem, category, message = FIXTURE_EVENTS[index // event_every % len(FIXTURE_EVENTS)]
+            else:
+                process, subsystem, category, message = FIXTURE_NOISE[index % len(FIXTURE_NOISE)]
+            timestamp = round(started + index * 0.001, 3)
+            compact.write(format_compact(timestamp, process, 412, subsystem, category, message) + '\n')
+            ndjson.write(format_ndjson(timestamp, process, 412, subsystem, category, message) + '\n')
+    return compact_path, ndjson_path
+
+def replay_events(path, parse, keywords=EVENT_MARKERS):
+    """Parse a recorded file through the block reader; returns (events, lines, cpu seconds)"""
+    started = time.process_time()
+    fd = os.open(path, os.O_RDONLY)
+    reader = BlockLineReader(keywords, ignore_case=False)  # classify_message is case-sensitive
+    events = []
+    try:
+        while True:
+            chunk = os.read(fd, DEFAULT_BLOCK_SIZE)
+            if not chunk:
+                break
+            for line in reader.feed(chunk):
+                event = parse(line)
+                if event:
+                    events.append(event)
+        for line in reader.flush():
+            event = parse(line)
+            if event:
+                events.append(event)
+    finally:
+        os.close(fd)
+    return events, reader.stats['lines'], time.process_time() - started
+
+def same_events(first, second):
+    """Typed fields match; timestamps agree to the millisecond"""
+    if len(first) != len(second):
+        return False
+    for a, b in zip(first, second):
+        if abs((a['timestamp'] or 0) - (b['timestamp'] or 0)) > 0.0015:
+            return False
+        if {k: v for k, v in a.items() if k != 'timestamp'} != {k: v for k, v in b.items() if k != 'timestamp'}:
+            return False
+    return True
+
+def event_benchmark(records=200000, directory=None):
+    """Compact vs. NDJSON (lazy and full json.loads) on the same recorded events"""
+    keep = directory is not None
+    directory = directory or tempfile.mkdtemp(prefix='d01-events-')
+    try:
+        compact_path, ndjson_path = write_event_fixtures(directory, records)
+        print(f"⏱️  D01 event ingest benchmark ({compact_path}, {ndjson_path})")
+
+        runs = [
+            ('compact', compact_path, parse_compact_line, EVENT_MARKERS),
+            ('ndjson lazy', ndjson_path, parse_ndjson_record, EVENT_MARKERS),
+            ('ndjson lazy, no pre-filter', ndjson_path, parse_ndjson_record, None),
+            ('ndjson json.loads', ndjson_path, parse_ndjson_record_full, None),
+        ]
+        results = []
+        for label, path, parse, keywords in runs:
+            events, lines, cpu = replay_events(path, parse, keywords)
+            results.append(events)
+            print(f"{label:<28} {len(events):>7,} events  {cpu:6.2f}s CPU  "
+                  f"{cpu / (lines / 1e6):6.3f}s per million records")
+
+        agree = all(same_events(results[0], events) for events in results[1:])
+        print(f"{'✅' if agree else '❌'} All modes produce the same typed events")
+        return agree
+    finally:
+        if not keep:
+            for name in os.listdir(directory):
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='D01 log ingest benchmark')
+    parser.add_argument('--size-mb', type=int, default=256, help='synthetic log size (use 2048+ for multi-GB runs)')
+    parser.add_argument('--file', help='reuse (or create) this log file instead of a temp file')
+    parser.add_argument('--events', action='store_true', help='compare compact and NDJSON event parsing instead')
+    parser.add_argument('--records', type=int, default=200000, help='records per event fixture')
+    parser.add_argument('--fixtures', help='directory for (reused) recorded event fixtures')
+    args = parser.parse_args()
+
+    if args.events:
+        sys.exit(0 if event_benchmark(args.records, args.fixtures) else 1)
+    sys.exit(0 if benchmark(args.size_mb, args.file) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+D01 Log Shipper - Batch events to log-server.js (POST /api/logs) in the background
+Logging only appends to a bounded queue; a sender thread ships batches by
+count or age and accounts for everything it had to drop
+"""
+
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+DEFAULT_URL = 'http://127.0.0.1:3001/api/logs'
+
+class LogShipper:
+    """Non-blocking client for log-server.js: {logs: [{level, source, message, metadata}]}"""
+
+    def __init__(self, url=DEFAULT_URL, source='d01', batch_size=100, max_age=1.0, max_pending=5000,
+                 timeout=2.0, retries=2, backoff=0.5):
+        parts = urlsplit(url if '://' in url else f'http://{url}')
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 3001
+        self.path = parts.path if parts.path not in ('', '/') else '/api/logs'
+        self.source = source
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.max_pending = max_pending  # Oldest entries are dropped beyond this
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.pending = deque()  # (entry, queued_at)
+        self.condition = threading.Condition()
+        self.stopping = threading.Event()
+        self.connection = None
+        self.stats = {'logged': 0, 'sent': 0, 'batches': 0, 'dropped': 0, 'failed': 0, 'retries': 0}
+
+        self.thread = threading.Thread(target=self.run, name='d01-log-shipper')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def log(self, level, message, metadata=None, source=None):
+        """Queue one entry; never blocks on the network"""
+        entry = {
+            'level': level,
+            'source': source or self.source,
+            'message': message,
+            'metadata': dict(metadata or {}, timestamp=time.time()),
+        }
+        with self.condition:
+            self.stats['logged'] += 1
+            if len(self.pending) >= self.max_pending:
+                self.pending.popleft()
+                self.stats['dropped'] += 1
+            self.pending.append((entry, time.monotonic()))
+            if len(self.pending) == 1 or len(self.pending) >= self.batch_size:
+                self.condition.notify()  # Start the age clock, or ship a full batch
+
+    def ship_event(self, record, level='info', source=None):
+        """Queue a D01 event dict ({type, ...}); the type becomes the message"""
+        self.log(level, str(record.get('type', 'event')), record, source)
+
+    def next_batch(self):
+        """Wait until a batch is due (full, old enough, or stopping) and take it"""
+        with self.condition:
+            while True:
+                if self.pending:
+                    age = time.monotonic() - self.pending[0][1]
+                    if len(self.pending) >= self.batch_size or age >= self.max_age or self.stopping.is_set():
+                        count = min(self.batch_size, len(self.pending))
+                        return [self.pending.popleft()[0] for _ in range(count)]
+                    self.condition.wait(self.max_age - age)
+                elif self.stopping.is_set():
+                    return None
+                else:
+                    self.condition.wait()
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                break
+            if self.post(batch):
+                self.stats['sent'] += len(batch)
+                self.stats['batches'] += 1
+            else:
+                self.stats['failed'] += len(batch)
+        self.disconnect()
+
+    def post(self, batch):
+        """POST one batch over a kept-alive connection; retry with backoff"""
+        body = json.dumps({'logs': batch}).encode('utf-8')
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                # Shutting down: one attempt per batch, no waiting
+                if self.stopping.wait(self.backoff * (2 ** (attempt - 1))):
+                    return False
+            try:
+                if self.connection is None:
+                    self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self.connection.request('POST', self.path, body, {'Content-Type': 'application/json'})
+                response = self.connection.getresponse()
+                response.read()
+                if 200 <= response.status < 300:
+                    return True
+            except (OSError, http.client.HTTPException):
+                pass
+            self.disconnect()
+        return False
+
+    def disconnect(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def close(self, timeout=5.0):
+        """Ship what is queued (one attempt per batch) and stop the sender"""
+        if not self.thread:
+            return
+        self.stopping.set()
+        with self.condition:
+            self.condition.notify()
+        self.thread.join(timeout)
+        self.thread = None
+        with self.condition:
+            # Whatever the sender could not get to in time
+            self.stats['dropped'] += len(self.pending)
+            self.pending.clear()
+
+    def summary(self):
+        stats = self.stats
+        return (f"{stats['logged']} logged → {stats['sent']} shipped in {stats['batches']} batches, "
+                f"{stats['dropped']} dropped, {stats['failed']} failed ({stats['retries']} retries)")
+
+def shipper_from_config(source, config=None, **options):
+    """LogShipper when D01_LOG_SERVER or settings.log_server_url is set, else None"""
+    url = os.environ.get('D01_LOG_SERVER')
+    if not url and config:
+        url = config.get('settings', {}).get('log_server_url')
+    if not url:
+        return None
+    return LogShipper(url, source=source, **options)
+
+def stand_in_server(delay=0.0, status=200):
+    """Local stand-in for log-server.js that records every entry it receives"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if delay:
+                time.sleep(delay)
+            if self.path == '/api/logs' and status == 200:
+                logs = json.loads(body).get('logs', [])
+                with server.lock:
+                    server.entries.extend(logs)
+                    server.requests += 1
+            payload = json.dumps({'success': status == 200}).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.entries = []
+    server.requests = 0
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+def burst(shipper, count):
+    """Log `count` events as fast as possible; returns per-call latencies"""
+    latencies = []
+    for index in range(count):
+        started = time.perf_counter()
+        shipper.ship_event({'type': 'button_event', 'old_state': index % 2, 'new_state': 1 - index % 2,
+                            'event_number': index + 1})
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return latencies
+
+def accounted(shipper, received):
+    stats = shipper.stats
+    return stats['logged'] == received + stats['dropped'] + stats['failed']
+
+def run_demo(events=20000):
+    """Healthy, slow, down and idle servers: nothing blocks, everything is accounted for"""
+    print("🧪 D01 log shipper demo (stand-in log server)")
+    ok = True
+
+    def report(label, passed, shipper, latencies=None, extra=''):
+        line = f"{'✅' if passed else '❌'} {label:<10} {shipper.summary()}"
+        if latencies:
+            line += (f"\n   log() p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f}µs, "
+                     f"max {latencies[-1] * 1e3:.2f}ms")
+        print(line + extra)
+        return passed
+
+    # Healthy server with room to queue the burst: every event arrives, in order, in few requests
+    server = stand_in_server()
+    shipper = LogShipper(f'http://127.0.0.1:{server.server_port}', source='demo', batch_size=500,
+                         max_pending=events)
+    latencies = burst(shipper, events)
+    shipper.close()
+    numbers = [entry['metadata']['event_number'] for entry in server.entries]
+    passed = numbers == list(range(1, events + 1)) and accounted(shipper, len(server.entries))
+    ok = report('healthy', passed, shipper, latencies, f", {server.requests} requests") and ok
+    server.shutdown()
+
+    # Slow server: the queue stays bounded, the input path stays fast, drops are counted
+    server = stand_in_server(delay=0.05)
+    shipper = LogShipper(f'http://127.0.0.1:{server.server_port}', source='demo', batch_size=200, max_pending=1000)
+    latencies = burst(shipper, events)
+    shipper.close(timeout=1.0)
+    passed = accounted(shipper, len(server.entries)) and shipper.stats['dropped'] > 0
+    ok = report('slow', passed, shipper, latencies) and ok
+    server.shutdown()
+
+    # Nothing listening: batches fail after retries, close() still returns promptly
+    server = stand_in_server()
+    port = server.server_port
+    server.shutdown()
+    server.server_close()
+    shipper = LogShipper(f'http://127.0.0.1:{port}', source='demo', batch_size=200, max_pending=1000,
+                         retries=1, backoff=0.05)
+    latencies = burst(shipper, 5000)
+    started = time.perf_counter()
+    shipper.close(timeout=2.0)
+    closing = time.perf_counter() - started
+    passed = accounted(shipper, 0) and closing < 2.5
+    ok = report('down', passed, shipper, latencies, f", close took {closing:.2f}s") and ok
+
+    # A trickle ships on age, without waiting for a full batch or close()
+    server = stand_in_server()
+    shipper = LogShipper(f'http://127.0.0.1:{server.server_port}', source='demo', max_age=0.2)
+    burst(shipper, 3)
+    time.sleep(0.6)
+    passed = len(server.entries) == 3
+    shipper.close()
+    ok = report('age flush', passed, shipper) and ok
+    server.shutdown()
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='D01 log shipper for log-server.js')
+    parser.add_argument('--demo', action='store_true', help='run against a local stand-in server')
+    parser.add_argument('--url', default=DEFAULT_URL, help='send a test batch to a running log server')
+    args = parser.parse_args()
+
+    if args.demo:
+        sys.exit(0 if run_demo() else 1)
+
+    shipper = LogShipper(args.url, source='d01-log-shipper')
+    shipper.log('info', 'D01 log shipper test', {'host': os.uname().nodename})
+    shipper.close()
+    print(shipper.summary())
+    sys.exit(0 if shipper.stats['sent'] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+D01 Log Supervisor - Owns a `log stream` child process and keeps it healthy
+Drains stdout and stderr, detects stalls with a heartbeat, restarts with
+backoff and keeps subscribers registered across restarts
+"""
+
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+
+from d01_log_ingest import (BlockLineReader, LogEventParser, format_compact, format_ndjson, json_field,
+                            parse_compact_timestamp, parse_ndjson_timestamp)
+
+# Set D01_LOG_COMMAND to replace `log` (e.g. "python3 d01_log_supervisor.py --fake-log")
+LOG_COMMAND_ENV = 'D01_LOG_COMMAND'
+
+HEARTBEAT_PREFIX = 'd01-heartbeat-'
+
+def log_command():
+    """The `log` executable (plus leading args) to run"""
+    override = os.environ.get(LOG_COMMAND_ENV)
+    return shlex.split(override) if override else ['log']
+
+class LogStreamSupervisor:
+    """Run `log stream --predicate ...`, fan lines out to subscribers, restart on failure"""
+
+    def __init__(self, predicate, name='log', style='compact', keywords=None, heartbeat_interval=15.0,
+                 stall_timeout=45.0, backoff_initial=0.5, backoff_max=30.0, metrics=None):
+        self.name = name
+        self.keywords = keywords  # Case-insensitive bytes pre-filter; None delivers every line
+        self.style = style
+        self.heartbeat_interval = heartbeat_interval
+        self.stall_timeout = stall_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.metrics = metrics
+
+        # Heartbeat lines are written with `logger` and matched by the predicate
+        self.heartbeat_marker = HEARTBEAT_PREFIX + uuid.uuid4().hex[:12]
+        self.predicate = f'({predicate}) OR eventMessage CONTAINS "{self.heartbeat_marker}"'
+
+        self.subscribers = []
+        self.process = None
+        self.running = False
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()  # An old reader can still be draining after a restart
+        self.heartbeat_process = None
+
+        self.last_output = 0.0
+        self.last_heartbeat_sent = 0.0
+        self.stderr_tail = deque(maxlen=20)
+        self.stats = {
+            'starts': 0, 'restarts': 0, 'stalls': 0, 'exits': 0,
+            'lines': 0, 'scanned': 0, 'heartbeats': 0, 'stderr_bytes': 0,
+            'lag': None, 'heartbeat_lag': None, 'started_at': None
+        }
+
+    def subscribe(self, callback):
+        """callback(line) for every output line; survives restarts"""
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def subscribe_events(self, callback):
+        """callback(event) for every typed D01 event, whichever style the stream uses"""
+        parser = LogEventParser(self.style)
+        
+        def on_line(line):
+            event = parser.parse(line)
+            if event:
+                callback(event)
+        
+        self.subscribe(on_line)
+        return parser
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def command(self):
+        return log_command() + ['stream', '--predicate', self.predicate, '--style', self.style]
+
+    def start(self):
+        """Supervise in a daemon thread"""
+        if self.thread:
+            return
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.supervise, name=f'd01-{self.name}-supervisor')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def supervise(self):
+        backoff = self.backoff_initial
+
+        while self.running:
+            started = time.time()
+            try:
+                exit_reason = self.run_child()
+            except FileNotFoundError as e:
+                print(f"❌ {self.name}: cannot start log stream: {e}")
+                exit_reason = 'missing'
+            except Exception as e:
+                print(f"Error in {self.name} log stream: {e}")
+                exit_reason = 'error'
+
+            if not self.running:
+                break
+
+            # A child that ran for a while earns a fresh backoff
+            if time.time() - started > 60:
+                backoff = self.backoff_initial
+            tail = f" - stderr: {self.stderr_tail[-1]}" if self.stderr_tail else ""
+            print(f"⚠️  {self.name}: log stream {exit_reason}, restarting in {backoff:.1f}s{tail}")
+            self.stats['restarts'] += 1
+            if self.stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def run_child(self):
+        """Run one child until it exits, stalls or we are stopped; returns the reason"""
+        process = subprocess.Popen(self.command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.process = process
+        self.stats['starts'] += 1
+        self.stats['started_at'] = time.time()
+        self.last_output = time.time()
+        self.last_heartbeat_sent = 0.0
+
+        readers = [
+            threading.Thread(target=self.read_stdout, args=(process.stdout,)),
+            threading.Thread(target=self.drain_stderr, args=(process.stderr,))
+        ]
+        for reader in readers:
+            reader.daemon = True
+            reader.start()
+
+        reason = None
+        try:
+            while self.running:
+                if process.poll() is not None:
+                    self.stats['exits'] += 1
+                    reason = f"exited ({process.returncode})"
+                    break
+
+                now = time.time()
+                if self.heartbeat_interval and now - self.last_heartbeat_sent >= self.heartbeat_interval:
+                    self.send_heartbeat()
+                if self.stall_timeout and now - self.last_output > self.stall_timeout:
+                    self.stats['stalls'] += 1
+                    reason = f"stalled (no output for {now - self.last_output:.0f}s)"
+                    break
+
+                self.stop_event.wait(0.5)
+        finally:
+            self.terminate(process)
+            self.reap_heartbeat(timeout=1)
+            for reader in readers:
+                reader.join(timeout=1)
+            self.process = None
+
+        return reason or 'stopped'
+
+    def send_heartbeat(self):
+        """Write a marker to the system log; seeing it come back proves the stream is alive"""
+        self.last_heartbeat_sent = time.time()
+        self.reap_heartbeat()
+        try:
+            self.heartbeat_process = subprocess.Popen(
+                ['logger', f'{self.heartbeat_marker} {self.last_heartbeat_sent:.6f}'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            self.heartbeat_interval = 0  # No logger available; rely on regular output
+
+    def reap_heartbeat(self, timeout=0):
+        """Collect the previous `logger`; one still running a whole interval later is stuck"""
+        process, self.heartbeat_process = self.heartbeat_process, None
+        if not process:
+            return
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def read_stdout(self, pipe):
+        fd = pipe.fileno()
+        reader = BlockLineReader(self.keywords)
+        reader.add_keyword(self.heartbeat_marker)
+        metrics = self.metrics
+        last_lag_sample = 0.0
+        scanned = 0
+
+        while True:
+            started = metrics.start() if metrics else 0
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                break
+            if metrics:
+                metrics.observe('pipe_read', started)
+            if not chunk:
+                break
+            self.last_output = now = time.time()
+
+            lines = reader.feed(chunk)
+            with self.stats_lock:
+                self.stats['scanned'] += reader.stats['lines'] - scanned
+            scanned = reader.stats['lines']
+            for line in lines:
+                if self.heartbeat_marker in line:
+                    sent = line[line.index(self.heartbeat_marker) + len(self.heartbeat_marker):].split()
+                    with self.stats_lock:
+                        self.stats['heartbeats'] += 1
+                        try:
+                            self.stats['heartbeat_lag'] = now - float(sent[0].strip('",}'))
+                        except (IndexError, ValueError):
+                            pass
+                    continue
+
+                # Sample pipe lag (event time vs. now) at most once a second
+                if now - last_lag_sample >= 1.0:
+                    if self.style == 'ndjson':
+                        event_time = parse_ndjson_timestamp(json_field(line, 'timestamp'))
+                    else:
+                        event_time = parse_compact_timestamp(line)
+                    if event_time is not None:
+                        self.stats['lag'] = now - event_time
+                        last_lag_sample = now
+
+                with self.stats_lock:
+                    self.stats['lines'] += 1
+                if metrics:
+                    metrics.count('lines_read')
+                for callback in self.subscribers:
+                    try:
+                        callback(line)
+                    except Exception as e:
+                        print(f"Error in {self.name} subscriber: {e}")
+
+    def drain_stderr(self, pipe):
+        """Keep stderr flowing so a chatty child never blocks on a full pipe"""
+        fd = pipe.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+            with self.stats_lock:
+                self.stats['stderr_bytes'] += len(chunk)
+            for line in chunk.decode('utf-8', 'replace').splitlines():
+                if line.strip():
+                    self.stderr_tail.append(line.strip())
+
+    def terminate(self, process):
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def run_until(self, should_continue, interval=0.5, wakeup=None):
+        """Block the caller while should_continue() holds, then stop
+
+        With a wakeup Event (e.g. ShutdownCoordinator.event) setting it ends the wait at once.
+        """
+        try:
+            while should_continue() and self.running:
+                if wakeup:
+                    wakeup.wait(interval)
+                else:
+                    time.sleep(interval)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop supervising and terminate the child"""
+        self.running = False
+        self.stop_event.set()
+        process = self.process
+        if process:
+            self.terminate(process)
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=3)
+        self.thread = None
+
+    def summary(self):
+        """One-line health summary"""
+        stats = self.stats
+        lag = f"{stats['lag'] * 1000:.0f}ms" if stats['lag'] is not None else "-"
+        heartbeat_lag = f"{stats['heartbeat_lag'] * 1000:.0f}ms" if stats['heartbeat_lag'] is not None else "-"
+        return (f"{self.name}: {stats['lines']}/{stats['scanned']} lines, {stats['restarts']} restarts "
+                f"({stats['stalls']} stalls, {stats['exits']} exits), stderr {stats['stderr_bytes']}B, "
+                f"pipe lag {lag}, heartbeat lag {heartbeat_lag}")
+
+def fake_log(args):
+    """Stand-in for macOS `log stream` on Linux: emits synthetic compact or NDJSON lines
+
+    Options: --rate N (lines/s), --exit-after N (lines), --stall-after N (lines),
+    --stderr-spam N (bytes of stderr per line); `show` prints 200 lines and exits
+    """
+    def option(name, default):
+        if name in args:
+            return float(args[args.index(name) + 1])
+        return default
+
+    rate = option('--rate', 50)
+    exit_after = option('--exit-after', 0)
+    stall_after = option('--stall-after', 0)
+    stderr_spam = int(option('--stderr-spam', 0))
+    replay = 'show' in args
+
+    predicate = args[args.index('--predicate') + 1] if '--predicate' in args else ''
+    style = args[args.index('--style') + 1] if '--style' in args else 'compact'
+    format_line = format_ndjson if style == 'ndjson' else format_compact
+    marker = None
+    if HEARTBEAT_PREFIX in predicate:
+        start = predicate.index(HEARTBEAT_PREFIX)
+        marker = predicate[start:start + len(HEARTBEAT_PREFIX) + 12]
+
+    out = sys.stdout
+    out.write("Filtering the log data using \"%s\"\n" % predicate)
+    out.flush()
+
+    count = 0
+    last_heartbeat = 0.0
+    while True:
+        count += 1
+        now = time.time()
+        if count % 2:
+            message = 'Received input report indication handle=521 length=8'
+        else:
+            message = f"buttonState changed ({count // 2 % 2}->{(count // 2 + 1) % 2})"
+        out.write(format_line(now, 'bluetoothd', 412, 'com.apple.bluetooth', 'HID', message) + '\n')
+
+        # Pretend `logger` heartbeats show up in the stream
+        if marker and now - last_heartbeat >= 1.0:
+            last_heartbeat = now
+            out.write(format_line(now, 'logger', 1, 'com.apple.logger', 'default', f"{marker} {now:.6f}") + '\n')
+        out.flush()
+
+        if stderr_spam:
+            sys.stderr.write('x' * stderr_spam + '\n')
+            sys.stderr.flush()
+        if replay and count >= 200:
+            return
+        if exit_after and count >= exit_after:
+            sys.exit(1)
+        if stall_after and count >= stall_after:
+            while True:
+                time.sleep(3600)
+        time.sleep(1.0 / rate)
+
+def run_demo():
+    """Exercise exit, stall and stderr-flood recovery against the fake log"""
+    base = f"{sys.executable} {os.path.abspath(__file__)} --fake-log"
+    scenarios = [
+        ('exit', f"{base} --exit-after 20", {}),
+        ('stall', f"{base} --stall-after 20", {'stall_timeout': 1.0}),
+        ('stderr flood', f"{base} --stderr-spam 65536 --rate 200", {}),
+        ('ndjson', base, {'style': 'ndjson'}),
+    ]
+    ok = True
+
+    for label, command, options in scenarios:
+        os.environ[LOG_COMMAND_ENV] = command
+        received = []
+        supervisor = LogStreamSupervisor('eventMessage CONTAINS "buttonState"', name=label,
+                                         heartbeat_interval=0, backoff_initial=0.2, **options)
+        if label == 'ndjson':
+            supervisor.subscribe_events(received.append)
+        else:
+            supervisor.subscribe(received.append)
+        supervisor.start()
+        time.sleep(3)
+        supervisor.stop()
+
+        # Every scenario must get past the first failure (20 lines) and keep delivering
+        passed = len(received) > 20 and (label in ('stderr flood', 'ndjson') or supervisor.stats['restarts'] >= 1)
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {supervisor.summary()}")
+
+    os.environ.pop(LOG_COMMAND_ENV, None)
+    return ok
+
+def main():
+    if '--fake-log' in sys.argv:
+        fake_log(sys.argv[sys.argv.index('--fake-log') + 1:])
+    elif '--demo' in sys.argv:
+        sys.exit(0 if run_demo() else 1)
+    else:
+        predicate = sys.argv[1] if len(sys.argv) > 1 else 'eventMessage CONTAINS "buttonState"'
+        supervisor = LogStreamSupervisor(predicate)
+        supervisor.subscribe(print)
+        supervisor.start()
+        try:
+            supervisor.run_until(lambda: True)
+        except KeyboardInterrupt:
+            supervisor.stop()
+            print(f"\n📊 {supervisor.summary()}")
+
+if __name__ == "__main__":
+    main()
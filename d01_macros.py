@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+D01 Macros - Multi-step button actions compiled once at config load
+Consecutive AppleScript-able steps are fused into a single osascript call;
+delays run on the scheduler so nothing sleeps on the input path
+"""
+
+import shlex
+import subprocess
+import time
+
+from d01_hammerspoon_bridge import script_to_action
+
+# Steps that become one AppleScript line each and can be fused together
+SCRIPT_STEPS = ('Type Text', 'Run AppleScript', 'Open Application', 'Open URL',
+                'Send Notification', 'Keystroke', 'Key Code')
+
+def applescript_string(text):
+    """Quote text as an AppleScript string literal"""
+    return '"' + str(text).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def modifier_clause(modifiers):
+    """' using {command down, shift down}' for a modifier list"""
+    if not modifiers:
+        return ''
+    if isinstance(modifiers, str):
+        modifiers = [modifiers]
+    keys = ', '.join(f"{modifier.lower().replace('cmd', 'command')} down" for modifier in modifiers)
+    return f" using {{{keys}}}"
+
+def step_script(step):
+    """AppleScript for a built-in script step, or None"""
+    action = step.get('action')
+    value = step.get('value', '')
+
+    if action == 'Type Text':
+        return f'tell application "System Events" to keystroke {applescript_string(value)}'
+    if action == 'Run AppleScript':
+        return value
+    if action == 'Open Application':
+        return f'tell application {applescript_string(value)} to activate'
+    if action == 'Open URL':
+        return f'open location {applescript_string(value)}'
+    if action == 'Send Notification':
+        return f'display notification {applescript_string(value)} with title "D01 Ring"'
+    if action == 'Keystroke':
+        return (f'tell application "System Events" to keystroke {applescript_string(step.get("key", value))}'
+                + modifier_clause(step.get('modifiers')))
+    if action == 'Key Code':
+        return (f'tell application "System Events" to key code {int(step.get("code", value))}'
+                + modifier_clause(step.get('modifiers')))
+    return None
+
+def delay_seconds(step):
+    """Wait/Delay step length; 'ms' or 'seconds' keys, bare values are seconds"""
+    if 'ms' in step:
+        return float(step['ms']) / 1000
+    return float(step.get('seconds', step.get('value', 0)))
+
+class CompiledMacro:
+    """A macro reduced to script/shell/delay operations"""
+
+    def __init__(self, name, operations, step_count):
+        self.name = name
+        self.operations = operations  # [('script', [lines]) | ('shell', command) | ('delay', seconds)]
+        self.step_count = step_count
+        self.invocations = sum(1 for kind, _ in operations if kind != 'delay')
+        
+        # Per script operation: equivalent Hammerspoon bridge actions, or None
+        self.bridge_actions = {}
+        for index, (kind, lines) in enumerate(operations):
+            if kind == 'script':
+                actions = [script_to_action(line) for line in lines]
+                self.bridge_actions[index] = actions if all(actions) else None
+
+        # Execution timing
+        self.runs = 0
+        self.total_time = 0.0
+        self.last_time = 0.0
+        self.max_time = 0.0
+
+    def describe(self):
+        parts = []
+        for kind, value in self.operations:
+            if kind == 'script':
+                parts.append(f"osascript[{len(value)}]")
+            elif kind == 'shell':
+                parts.append("shell")
+            else:
+                parts.append(f"wait {value:g}s")
+        return ' → '.join(parts)
+
+class MacroEngine:
+    """Compile and run macros; resolve(category, action) supplies scripts for catalog actions"""
+
+    def __init__(self, scheduler, resolve=None, metrics=None, run_script=None, run_shell=None, bridge=None):
+        self.scheduler = scheduler
+        self.bridge = bridge  # Optional HammerspoonBridge for keystrokes without osascript
+        self.resolve = resolve or (lambda category, action: None)
+        self.metrics = metrics
+        self.run_script = run_script or self.default_run_script
+        self.run_shell = run_shell or self.default_run_shell
+        self.compiled = {}
+
+    def default_run_script(self, lines):
+        """One osascript process for all fused lines"""
+        args = ['osascript']
+        for line in lines:
+            args.extend(['-e', line])
+        try:
+            subprocess.run(args, check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"AppleScript error: {e}")
+
+    def default_run_shell(self, command):
+        try:
+            subprocess.run(command if isinstance(command, list) else shlex.split(command), check=True)
+        except Exception as e:
+            print(f"Shell command error: {e}")
+
+    def compile(self, name, steps):
+        """Compile a list of step dicts into fused operations"""
+        operations = []
+
+        for step in steps:
+            if isinstance(step, str):
+                step = {'action': step}
+            action = step.get('action')
+
+            if action == 'Wait/Delay':
+                seconds = delay_seconds(step)
+                if seconds > 0:
+                    operations.append(('delay', seconds))
+                continue
+            if action == 'Run Shell Command':
+                operations.append(('shell', step.get('value', '')))
+                continue
+
+            script = step_script(step) if action in SCRIPT_STEPS else self.resolve(step.get('category'), action)
+            if not script:
+                print(f"⚠️  Macro {name}: unknown step {action!r} skipped")
+                continue
+
+            # Fuse with the previous script operation when nothing sits in between
+            if operations and operations[-1][0] == 'script':
+                operations[-1][1].append(script)
+            else:
+                operations.append(('script', [script]))
+
+        macro = CompiledMacro(name, operations, len(steps))
+        self.compiled[name] = macro
+        return macro
+
+    def compile_mapping(self, mapping):
+        """Compile a Custom Commands mapping: a single step, inline steps or a named macro"""
+        if 'steps' in mapping:
+            return self.compile(mapping.get('name', mapping.get('action', 'macro')), mapping['steps'])
+        name = mapping.get('name') or f"{mapping.get('action', 'step')} {mapping.get('value', '')}".strip()
+        return self.compile(name[:40], [mapping])
+
+    def compile_config(self, config):
+        """Compile config['macros'] ({name: [steps]}) up front"""
+        for name, steps in config.get('macros', {}).items():
+            self.compile(name, steps)
+        return self.compiled
+
+    def run(self, macro, on_done=None):
+        """Start a compiled macro on the scheduler; returns the cancellable Sequence"""
+        if isinstance(macro, str):
+            macro = self.compiled[macro]
+
+        started = time.perf_counter()
+        steps = []
+        for index, (kind, value) in enumerate(macro.operations):
+            if kind == 'delay':
+                steps.append(value)
+            elif kind == 'script':
+                steps.append(lambda lines=value, actions=macro.bridge_actions[index]:
+                             self.run_script_batch(lines, actions))
+            else:
+                steps.append(lambda command=value: self.run_shell(command))
+
+        def finished(sequence):
+            elapsed = time.perf_counter() - started
+            macro.runs += 1
+            macro.total_time += elapsed
+            macro.last_time = elapsed
+            macro.max_time = max(macro.max_time, elapsed)
+            if self.metrics and self.metrics.enabled:
+                self.metrics.observe('macro', started)
+            print(f"⏱️  Macro {macro.name}: {elapsed * 1000:.1f}ms "
+                  f"({macro.step_count} steps, {macro.invocations} process launches)")
+            if on_done:
+                on_done(macro)
+
+        return self.scheduler.sequence(steps, name=macro.name, on_done=finished)
+
+    def run_script_batch(self, lines, actions):
+        """Send keystrokes over the bridge when possible, otherwise one osascript"""
+        sent = 0
+        if actions and self.bridge and self.bridge.is_connected():
+            sent = self.bridge.send_all(actions)
+            if sent == len(lines):
+                return
+        # Lines the bridge already took have run: only the rest goes to osascript
+        self.run_script(lines[sent:])
+
+    def report(self):
+        """Per-macro timing lines"""
+        lines = []
+        for name, macro in sorted(self.compiled.items()):
+            average = macro.total_time / macro.runs if macro.runs else 0.0
+            lines.append(f"  {name:<24} runs {macro.runs:>4}  avg {average * 1000:7.1f}ms  "
+                         f"max {macro.max_time * 1000:7.1f}ms  {macro.describe()}")
+        return lines
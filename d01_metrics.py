@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+D01 Metrics - Per-stage hot-path counters and latency histograms
+Serves Prometheus text format on a local port and prints it live
+"""
+
+import os
+import sys
+import time
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# Latency bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+DEFAULT_PORT = 9464
+
+# The live StageMetrics per component, so one endpoint serves them all
+# (a restarted component replaces its predecessor instead of piling up)
+REGISTRY = {}
+
+def metrics_enabled(config=None):
+    """Instrumentation is opt-in via D01_METRICS=1 or settings.enable_metrics"""
+    if os.environ.get('D01_METRICS') == '1':
+        return True
+    if config:
+        return bool(config.get('settings', {}).get('enable_metrics', False))
+    return False
+
+class StageMetrics:
+    """Counters and latency histograms for one component's pipeline stages"""
+
+    def __init__(self, component, enabled=False):
+        self.component = component
+        self.enabled = enabled
+        self.counters = defaultdict(int)
+        self.histograms = {}
+        self.lock = threading.Lock()
+        REGISTRY[component] = self
+
+    def start(self):
+        """Return a start timestamp, or 0 when instrumentation is disabled"""
+        return time.perf_counter() if self.enabled else 0
+
+    def observe(self, stage, started):
+        """Record the latency of a stage that began at `started`"""
+        if not started:
+            return
+        elapsed = time.perf_counter() - started
+
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                # Bucket counts (last slot is +Inf), sum, count
+                histogram = self.histograms[stage] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+            histogram[0][bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            histogram[1] += elapsed
+            histogram[2] += 1
+
+    def close(self):
+        """Stop being served (unless a newer instance took the component over)"""
+        if REGISTRY.get(self.component) is self:
+            del REGISTRY[self.component]
+
+    def count(self, name, amount=1):
+        """Increment a named counter"""
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += amount
+
+    def render(self):
+        """Render this component's counter and histogram lines"""
+        counter_lines = []
+        lines = []
+        component = self.component
+
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                counter_lines.append(f'd01_events_total{{component="{component}",name="{name}"}} {value}')
+
+            for stage, (buckets, total, count) in sorted(self.histograms.items()):
+                labels = f'component="{component}",stage="{stage}"'
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                    cumulative += bucket_count
+                    lines.append(f'd01_stage_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'd01_stage_latency_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'd01_stage_latency_seconds_sum{{{labels}}} {total:.9f}')
+                lines.append(f'd01_stage_latency_seconds_count{{{labels}}} {count}')
+
+        return counter_lines, lines
+
+def render_registry():
+    """Render every registered component in Prometheus exposition format"""
+    counter_lines = [
+        '# HELP d01_events_total Events seen per pipeline stage',
+        '# TYPE d01_events_total counter'
+    ]
+    histogram_lines = [
+        '# HELP d01_stage_latency_seconds Time spent per pipeline stage',
+        '# TYPE d01_stage_latency_seconds histogram'
+    ]
+
+    # Each metric family must be contiguous across components
+    for metrics in list(REGISTRY.values()):
+        if metrics.enabled:
+            counters, histograms = metrics.render()
+            counter_lines.extend(counters)
+            histogram_lines.extend(histograms)
+
+    return '\n'.join(counter_lines + histogram_lines) + '\n'
+
+class MetricsServer:
+    """Local HTTP endpoint serving /metrics for all registered components"""
+
+    def __init__(self, port=DEFAULT_PORT, host='127.0.0.1'):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.routes = {}
+
+    def add_route(self, path, handler):
+        """Serve `handler()` (returning text) at an extra path"""
+        self.routes[path] = handler
+
+    def start(self):
+        """Start serving in a daemon thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = render_registry()
+                elif self.path in routes:
+                    body = routes[self.path]()
+                else:
+                    self.send_error(404)
+                    return
+
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"Metrics server unavailable on port {self.port}: {e}")
+            return False
+
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        print(f"📈 Metrics at http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        """Stop serving"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+def watch_metrics(url, interval=1.0, once=False):
+    """Print a live view of a metrics endpoint"""
+    import urllib.request
+
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                text = response.read().decode('utf-8')
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            text = None
+
+        if text is not None:
+            if not once:
+                print("\033[2J\033[H", end='')  # Clear screen
+            print(f"📈 D01 metrics - {time.strftime('%H:%M:%S')}")
+            print("=" * 60)
+            for line in summarize_metrics(text):
+                print(line)
+
+        if once:
+            return
+        time.sleep(interval)
+
+def summarize_metrics(text):
+    """Turn Prometheus text into readable per-stage summary lines"""
+    counters = []
+    stages = defaultdict(dict)
+
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name_labels, _, value = line.rpartition(' ')
+        name, _, labels = name_labels.partition('{')
+        labels = dict(part.split('=', 1) for part in labels.rstrip('}').split(',') if '=' in part)
+        labels = {key: val.strip('"') for key, val in labels.items()}
+
+        if name == 'd01_events_total':
+            counters.append(f"  {labels['component']:<12} {labels['name']:<28} {value}")
+        elif name.startswith('d01_stage_latency_seconds'):
+            key = (labels['component'], labels['stage'])
+            if name.endswith('_bucket'):
+                stages[key].setdefault('buckets', []).append((labels['le'], int(value)))
+            else:
+                stages[key][name.rsplit('_', 1)[1]] = float(value)
+
+    lines = ["Counters:"] + (counters or ["  (none)"])
+    lines.append("")
+    lines.append("Stage latency:          count      mean       p50       p99")
+
+    for (component, stage), data in sorted(stages.items()):
+        count = int(data.get('count', 0))
+        mean = data.get('sum', 0.0) / count if count else 0.0
+        p50 = bucket_quantile(data.get('buckets', []), count, 0.5)
+        p99 = bucket_quantile(data.get('buckets', []), count, 0.99)
+        lines.append(f"  {component + '/' + stage:<20} {count:>7} {mean * 1000:>8.3f}ms "
+                     f"{p50:>9} {p99:>9}")
+
+    return lines
+
+def bucket_quantile(buckets, count, quantile):
+    """Upper bucket bound containing the given quantile"""
+    if not count:
+        return '-'
+    target = quantile * count
+    for bound, cumulative in buckets:
+        if cumulative >= target:
+            return '+Inf' if bound == '+Inf' else f"≤{float(bound) * 1000:g}ms"
+    return '+Inf'
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print live D01 pipeline metrics")
+    parser.add_argument('--url', default=f"http://127.0.0.1:{DEFAULT_PORT}/metrics")
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--once', action='store_true', help="Print one snapshot and exit")
+    parser.add_argument('--raw', action='store_true', help="Print the raw Prometheus text")
+    args = parser.parse_args()
+
+    if args.raw:
+        import urllib.request
+        with urllib.request.urlopen(args.url, timeout=2) as response:
+            sys.stdout.write(response.read().decode('utf-8'))
+        return
+
+    try:
+        watch_metrics(args.url, args.interval, args.once)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+D01 Output - Pluggable backends for remapped HID reports
+Reports go to a keystroke-script backend (AppleScript or the Hammerspoon
+bridge), a hidapi device, or a file/pipe sink that records them so output
+can be verified byte-for-byte and benchmarked without any driver
+"""
+
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+from d01_hammerspoon_bridge import script_to_action
+
+# Sink record: timestamp, report length, then the report bytes
+SINK_RECORD = struct.Struct('<dH')
+# Starts every binary sink session (a hex sink starts with a digit)
+SINK_MAGIC = b'D01S\x01'
+
+# Boot keyboard modifier bits -> AppleScript modifier names
+MODIFIER_BITS = [
+    (0x01, 'control'), (0x02, 'shift'), (0x04, 'option'), (0x08, 'command'),
+    (0x10, 'control'), (0x20, 'shift'), (0x40, 'option'), (0x80, 'command'),
+]
+
+# HID keyboard usage -> macOS virtual key code
+USAGE_TO_KEY_CODE = {
+    0x04: 0, 0x05: 11, 0x06: 8, 0x07: 2, 0x08: 14, 0x09: 3, 0x0A: 5, 0x0B: 4, 0x0C: 34,
+    0x0D: 38, 0x0E: 40, 0x0F: 37, 0x10: 46, 0x11: 45, 0x12: 31, 0x13: 35, 0x14: 12,
+    0x15: 15, 0x16: 1, 0x17: 17, 0x18: 32, 0x19: 9, 0x1A: 13, 0x1B: 7, 0x1C: 16, 0x1D: 6,
+    0x1E: 18, 0x1F: 19, 0x20: 20, 0x21: 21, 0x22: 23, 0x23: 22, 0x24: 26, 0x25: 28,
+    0x26: 25, 0x27: 29, 0x28: 36, 0x29: 53, 0x2A: 51, 0x2B: 48, 0x2C: 49, 0x2D: 27,
+    0x2E: 24, 0x2F: 33, 0x30: 30, 0x31: 42, 0x33: 41, 0x34: 39, 0x35: 50, 0x36: 43,
+    0x37: 47, 0x38: 44, 0x3A: 122, 0x3B: 120, 0x3C: 99, 0x3D: 118, 0x3E: 96, 0x3F: 97,
+    0x40: 98, 0x41: 100, 0x42: 101, 0x43: 109, 0x44: 103, 0x45: 111, 0x4F: 124,
+    0x50: 123, 0x51: 125, 0x52: 126,
+}
+
+def keyboard_report(keycode, modifier=0):
+    """8-byte boot keyboard report: modifiers, reserved, up to six key usages"""
+    return bytes([modifier, 0x00, keycode, 0x00, 0x00, 0x00, 0x00, 0x00])
+
+def modifier_names(modifier):
+    names = []
+    for bit, name in MODIFIER_BITS:
+        if modifier & bit and name not in names:
+            names.append(name)
+    return names
+
+def keyboard_report_scripts(report, previous):
+    """AppleScript key code lines for keys that went down since the previous report"""
+    if len(report) != 8:
+        return []
+    held = set(previous[2:8]) if previous and len(previous) == 8 else set()
+    names = modifier_names(report[0])
+    using = f" using {{{', '.join(f'{name} down' for name in names)}}}" if names else ''
+
+    lines = []
+    for usage in report[2:8]:
+        if usage and usage not in held and usage in USAGE_TO_KEY_CODE:
+            lines.append(f'tell application "System Events" to key code {USAGE_TO_KEY_CODE[usage]}{using}')
+    return lines
+
+class CodeScripts:
+    """Custom one-byte codes (at `index`) -> AppleScript; fires when the code changes"""
+
+    def __init__(self, scripts, index=1):
+        self.scripts = scripts
+        self.index = index
+
+    def __call__(self, report, previous):
+        if len(report) <= self.index:
+            return []
+        code = report[self.index]
+        if not code or (previous and len(previous) > self.index and previous[self.index] == code):
+            return []
+        script = self.scripts.get(code)
+        return [script] if script else []
+
+class OutputBackend:
+    """Where remapped reports go"""
+
+    name = 'output'
+
+    def __init__(self):
+        self.stats = {'reports': 0, 'bytes': 0}
+
+    def send_report(self, report):
+        """Emit one report; returns True on success"""
+        raise NotImplementedError
+
+    def count(self, report):
+        self.stats['reports'] += 1
+        self.stats['bytes'] += len(report)
+
+    def close(self):
+        pass
+
+class PrintBackend(OutputBackend):
+    """Print each report (no virtual HID driver attached)"""
+
+    name = 'print'
+
+    def send_report(self, report):
+        self.count(report)
+        print(f"Sending HID report: {bytes(report).hex()}")
+        return True
+
+class KeystrokeScriptBackend(OutputBackend):
+    """Turn report edges into keystrokes over the bridge or one osascript per report"""
+
+    name = 'keystroke'
+
+    def __init__(self, translate, bridge=None, run_script=None):
+        super().__init__()
+        self.translate = translate  # (report, previous) -> [AppleScript lines]
+        self.bridge = bridge
+        self.run_script = run_script or self.default_run_script
+        self.previous = None
+        self.running = []  # osascript processes not reaped yet
+        self.stats.update(scripts=0, bridge_actions=0)
+
+    def default_run_script(self, lines):
+        """osascript without a shell, and without waiting on the input path"""
+        self.reap()
+        args = ['osascript']
+        for line in lines:
+            args.extend(['-e', line])
+        try:
+            self.running.append(subprocess.Popen(args, stdout=subprocess.DEVNULL,
+                                                 stderr=subprocess.DEVNULL))
+        except OSError as e:
+            print(f"AppleScript error: {e}")
+
+    def reap(self):
+        """Collect osascript processes that have exited (no zombies, no waiting)"""
+        self.running = [process for process in self.running if process.poll() is None]
+
+    def close(self, timeout=2.0):
+        """Let pending keystrokes finish, then kill any osascript that hangs"""
+        deadline = time.monotonic() + timeout
+        for process in self.running:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.running = []
+
+    def send_report(self, report):
+        self.count(report)
+        lines = self.translate(report, self.previous)
+        self.previous = bytes(report)
+        if not lines:
+            return True
+
+        sent = 0
+        if self.bridge and self.bridge.is_connected():
+            actions = [script_to_action(line) for line in lines]
+            if all(actions):
+                sent = self.bridge.send_all(actions)
+                self.stats['bridge_actions'] += sent
+                if sent == len(lines):
+                    return True
+        # Keys the bridge already sent have been typed: only the rest goes to osascript
+        self.stats['scripts'] += 1
+        self.run_script(lines[sent:])
+        return True
+
+class ReportSinkBackend(OutputBackend):
+    """Record reports to a file or named pipe (binary records or hex lines)"""
+
+    name = 'sink'
+
+    def __init__(self, path, hex_lines=False, clock=time.time):
+        super().__init__()
+        self.path = path
+        self.hex_lines = hex_lines
+        self.clock = clock
+        self.handle = open(path, 'ab', buffering=1 << 16)
+        if not hex_lines:
+            # Also written when appending, like the journal's marker
+            self.handle.write(SINK_MAGIC)
+
+    def send_report(self, report):
+        self.count(report)
+        if self.hex_lines:
+            self.handle.write(f"{self.clock():.6f} {bytes(report).hex()}\n".encode('ascii'))
+        else:
+            self.handle.write(SINK_RECORD.pack(self.clock(), len(report)) + bytes(report))
+        return True
+
+    def flush(self):
+        self.handle.flush()
+
+    def close(self):
+        self.handle.close()
+
+class HidapiBackend(OutputBackend):
+    """Write reports to a (virtual) HID device through hidapi"""
+
+    name = 'hidapi'
+
+    def __init__(self, vendor_id, product_id):
+        super().__init__()
+        import hid  # Optional dependency: pip3 install hidapi
+        self.device = hid.device()
+        self.device.open(vendor_id, product_id)
+
+    def send_report(self, report):
+        self.count(report)
+        return self.device.write(list(report)) >= 0
+
+    def close(self):
+        self.device.close()
+
+def read_sink(path, binary=None):
+    """(timestamp, report) pairs from a sink; binary=None tells the formats apart by SINK_MAGIC"""
+    with open(path, 'rb') as handle:
+        data = handle.read()
+
+    if binary is None:
+        binary = data.startswith(SINK_MAGIC)
+    if not binary:
+        for line in data.splitlines():
+            if line.strip():
+                stamp, _, report = line.partition(b' ')
+                yield float(stamp), bytes.fromhex(report.decode('ascii'))
+        return
+
+    position = 0
+    while position + SINK_RECORD.size <= len(data):
+        if data.startswith(SINK_MAGIC, position):
+            position += len(SINK_MAGIC)
+            continue
+        timestamp, length = SINK_RECORD.unpack_from(data, position)
+        position += SINK_RECORD.size
+        yield timestamp, data[position:position + length]
+        position += length
+
+def output_from_spec(spec, translate, bridge=None):
+    """'keystroke' | 'sink:<path>' | 'sink-hex:<path>' | 'hidapi:<vid>:<pid>'"""
+    kind, _, argument = (spec or 'keystroke').partition(':')
+    if kind == 'sink':
+        return ReportSinkBackend(os.path.expanduser(argument))
+    if kind == 'sink-hex':
+        return ReportSinkBackend(os.path.expanduser(argument), hex_lines=True)
+    if kind == 'hidapi':
+        vendor_id, _, product_id = argument.partition(':')
+        return HidapiBackend(int(vendor_id, 0), int(product_id, 0))
+    return KeystrokeScriptBackend(translate, bridge=bridge)
+
+def benchmark(reports=200000):
+    """Reports/second per backend, plus a byte-for-byte sink round trip"""
+    print("⏱️  D01 output backend benchmark")
+    stream = []
+    for index in range(reports):
+        # Type "d01" over and over: key down, key up
+        usage = (0x07, 0x27, 0x1E)[index // 2 % 3]
+        stream.append(keyboard_report(usage if index % 2 == 0 else 0, 0x08 if index % 12 == 0 else 0))
+
+    directory = tempfile.mkdtemp(prefix='d01-output-')
+    ok = True
+    try:
+        for label, hex_lines in (('sink (binary)', False), ('sink (hex)', True)):
+            path = os.path.join(directory, 'reports.hex' if hex_lines else 'reports.bin')
+            backend = ReportSinkBackend(path, hex_lines=hex_lines)
+            started = time.perf_counter()
+            for report in stream:
+                backend.send_report(report)
+            backend.close()
+            elapsed = time.perf_counter() - started
+
+            recorded = [report for _, report in read_sink(path)]
+            matches = recorded == stream
+            ok = ok and matches
+            print(f"{label:<20} {reports / elapsed:>12,.0f} reports/s  "
+                  f"{'✅ byte-for-byte' if matches else '❌ mismatch'} ({len(recorded)} read back)")
+
+        # A binary timestamp whose first byte is an ASCII digit, appended over two sessions
+        stamp = next(1.7e9 + step * 1e-6 for step in range(1000)
+                     if SINK_RECORD.pack(1.7e9 + step * 1e-6, 0)[:1].isdigit())
+        path = os.path.join(directory, 'digit.bin')
+        for _ in range(2):
+            backend = ReportSinkBackend(path, clock=lambda: stamp)
+            for report in stream[:100]:
+                backend.send_report(report)
+            backend.close()
+        recorded = list(read_sink(path))
+        matches = [report for _, report in recorded] == stream[:100] * 2 and recorded[0][0] == stamp
+        ok = ok and matches
+        print(f"{'sink (digit stamp)':<20} {'':>12}  {'✅' if matches else '❌'} two appended sessions read back")
+
+        emitted = []
+        backend = KeystrokeScriptBackend(keyboard_report_scripts, run_script=emitted.append)
+        started = time.perf_counter()
+        for report in stream:
+            backend.send_report(report)
+        elapsed = time.perf_counter() - started
+        expected = reports // 2
+        ok = ok and len(emitted) == expected
+        print(f"{'keystroke (dry run)':<20} {reports / elapsed:>12,.0f} reports/s  "
+              f"{len(emitted)} key-down scripts for {expected} presses")
+
+        # What the remapper used to do: a shell (then osascript) per report
+        sample = 200
+        started = time.perf_counter()
+        for _ in range(sample):
+            os.system('true')
+        elapsed = time.perf_counter() - started
+        print(f"{'os.system per report':<20} {sample / elapsed:>12,.0f} reports/s  (shell fork only, no osascript)")
+    finally:
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark() else 1)
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+D01 Runtime - One asyncio event loop for sources, state machines, timers and actions
+Subprocess sources are read as async pipes, timers run on the loop, and blocking
+actions (osascript, file writes) go to a small executor; idle means no wakeups.
+Stopping goes through a ShutdownCoordinator like every other D01 tool
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from d01_log_supervisor import log_command
+from d01_scheduler import Sequence, Timer
+from d01_shutdown import ShutdownCoordinator
+
+LINE_LIMIT = 1 << 20  # Longest source line (bytes) before it is dropped
+
+class LoopScheduler:
+    """TimerScheduler interface on the runtime's loop (MacroEngine, correlator and debouncer use it as is)"""
+
+    def __init__(self, runtime):
+        self.runtime = runtime
+        self.fired = 0
+        self.errors = 0
+
+    def now(self):
+        return self.runtime.loop.time()
+
+    def call_at(self, deadline, callback, *args):
+        """Run callback(*args) on the loop at a loop-clock deadline; callable from any thread"""
+        timer = Timer(deadline, callback, args)
+        self.runtime.submit(self.arm, timer)
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.now() + delay, callback, *args)
+
+    def sequence(self, steps, name=None, on_done=None):
+        return Sequence(self, steps, name, on_done).start()
+
+    def arm(self, timer):
+        if not timer.cancelled:
+            self.runtime.loop.call_at(timer.deadline, self.fire, timer)
+
+    def fire(self, timer):
+        if timer.cancelled:
+            return
+        if self.now() < timer.deadline:
+            self.arm(timer)  # The loop may run a handle up to one clock tick early
+            return
+        timer.fired = True
+        self.fired += 1
+        try:
+            timer.callback(*timer.args)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error in scheduled action: {e}")
+
+    def start(self):
+        pass  # Timers run whenever the loop runs
+
+    def stop(self):
+        pass
+
+class LineProtocol(asyncio.Protocol):
+    """Split a pipe into lines as chunks arrive; every complete line is handled in one go"""
+
+    def __init__(self, runtime, on_line, name):
+        self.runtime = runtime
+        self.on_line = on_line
+        self.name = name
+        self.buffer = b''
+        self.closed = runtime.loop.create_future()
+
+    def data_received(self, data):
+        lines = (self.buffer + data).split(b'\n')
+        self.buffer = lines.pop()
+        if len(self.buffer) > LINE_LIMIT:
+            self.buffer = b''  # A runaway line is dropped, not buffered forever
+        for raw in lines:
+            self.dispatch(raw)
+
+    def dispatch(self, raw):
+        line = raw.decode('utf-8', 'replace').strip()
+        if not line:
+            return
+        self.runtime.stats['lines'] += 1
+        try:
+            self.on_line(line)
+        except Exception as e:
+            self.runtime.stats['errors'] += 1
+            print(f"Error handling {self.name} line: {e}")
+
+    def connection_lost(self, exc):
+        if self.buffer:
+            self.dispatch(self.buffer)
+            self.buffer = b''
+        if not self.closed.done():
+            self.closed.set_result(exc)
+
+class Runtime:
+    """Event loop that owns every source of one tool; run() blocks until stop() or Ctrl+C
+
+    Signals, stop() and `duration` all go through self.shutdown: the loop leaves,
+    children are reaped, actions finish, then the tool's own on_flush/on_stats steps run.
+    """
+
+    def __init__(self, name='d01', action_workers=2, shutdown=None):
+        self.name = name
+        self.shutdown = shutdown or ShutdownCoordinator(name)
+        self.loop = asyncio.new_event_loop()
+        self.scheduler = LoopScheduler(self)
+        # Worker threads are only started by the first blocking action
+        self.executor = ThreadPoolExecutor(max_workers=action_workers, thread_name_prefix=f'{name}-action')
+        self.sources = []  # Coroutine factories started by run()
+        self.tasks = []
+        self.processes = set()
+        self.stopped = asyncio.Event()
+        self.running = False
+        self.thread_id = None
+        self.stats = {'lines': 0, 'reports': 0, 'actions': 0, 'errors': 0, 'restarts': 0}
+
+        # Children are reaped by the coordinator; queued actions finish before the flushes
+        self.shutdown.add_step('join', lambda: self.executor.shutdown(wait=True), 'actions')
+
+    def submit(self, callback, *args):
+        """Run callback(*args) on the loop; safe from source, HID and action threads"""
+        if threading.get_ident() == self.thread_id:
+            self.loop.call_soon(callback, *args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def add_source(self, factory):
+        """Start a coroutine (factory()) with the runtime and cancel it on stop"""
+        if self.running:
+            self.submit(lambda: self.tasks.append(self.loop.create_task(factory())))
+        else:
+            self.sources.append(factory)
+
+    def add_process(self, argv, on_line, name=None, restart=True, backoff=1.0):
+        """Read a child's stdout on the loop; on_line(line) gets every non-empty stripped line"""
+        name = name or os.path.basename(argv[0])
+        self.add_source(lambda: self.read_process(argv, on_line, name, restart, backoff))
+
+    def add_log_stream(self, predicate, on_line, name='log', style='compact', extra=()):
+        """`log stream --predicate ...` as a source (D01_LOG_COMMAND replaces `log`)"""
+        argv = log_command() + ['stream', '--predicate', predicate, '--style', style] + list(extra)
+        self.add_process(argv, on_line, name)
+
+    async def read_process(self, argv, on_line, name, restart, backoff):
+        delay = backoff
+        while not self.stopped.is_set():
+            try:
+                # Popen + a loop pipe reader: no child-watcher thread per source
+                process = subprocess.Popen(argv, stdout=subprocess.PIPE)
+            except OSError as e:
+                print(f"❌ {name}: cannot start {argv[0]}: {e}")
+                return
+            self.processes.add(process)
+            self.shutdown.add_process(process)
+            protocol = LineProtocol(self, on_line, name)
+            transport, _ = await self.loop.connect_read_pipe(lambda: protocol, process.stdout)
+            started = time.monotonic()
+            try:
+                await protocol.closed
+            finally:
+                transport.close()
+                if not self.stopped.is_set():
+                    # Exited on its own: reap it here; on stop the coordinator reaps them all
+                    self.processes.discard(process)
+                    await self.reap(process)
+                    self.shutdown.discard_process(process)
+
+            if not restart or self.stopped.is_set():
+                return
+            if time.monotonic() - started > 60:
+                delay = backoff
+            print(f"⚠️  {name}: exited with {process.returncode}, restarting in {delay:.1f}s")
+            self.stats['restarts'] += 1
+            try:
+                await asyncio.wait_for(self.stopped.wait(), delay)
+                return
+            except asyncio.TimeoutError:
+                delay = min(delay * 2, 30.0)
+
+    async def reap(self, process, timeout=2.0):
+        """Terminate a child and wait for it without blocking the loop"""
+        if process.poll() is None:
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        while process.poll() is None:
+            if time.monotonic() > deadline:
+                process.kill()
+                process.wait()
+                break
+            await asyncio.sleep(0.02)
+
+    def add_hid(self, vendor_id, product_id, on_report, length=None, name='hid'):
+        """Raw HID reports delivered on the loop as on_report(report)
+
+        hidapi has no pollable handle, so one reader thread blocks in read() and
+        hands reports over; its read timeout only bounds how fast it notices stop().
+        """
+        def reader():
+            try:
+                import hid
+            except ImportError:
+                print(f"{name}: hidapi not installed (pip3 install hidapi)")
+                return
+            device = None
+            try:
+                device = hid.device()
+                device.open(vendor_id, product_id)
+                while not self.shutdown.requested:
+                    report = device.read(64, timeout_ms=1000)
+                    if report and (length is None or len(report) == length):
+                        self.submit(self.deliver_report, on_report, report)
+            except Exception as e:
+                print(f"{name} unavailable: {e}")
+            finally:
+                if device:
+                    device.close()
+
+        async def run_reader():
+            thread = threading.Thread(target=reader, name=f'{self.name}-{name}')
+            thread.daemon = True
+            thread.start()
+            self.shutdown.add_thread(thread)
+            await self.stopped.wait()
+
+        self.add_source(run_reader)
+
+    def deliver_report(self, on_report, report):
+        self.stats['reports'] += 1
+        try:
+            on_report(report)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Error handling HID report: {e}")
+
+    def run_blocking(self, func, *args):
+        """Run a blocking action on the executor, never on the loop; returns its Future"""
+        self.stats['actions'] += 1
+        return self.executor.submit(self.guarded, func, args)
+
+    def guarded(self, func, args):
+        try:
+            return func(*args)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Error in action: {e}")
+
+    def run(self, duration=None):
+        """Run every source until stop(), SIGINT/SIGTERM or `duration` seconds, then shut down"""
+        self.thread_id = threading.get_ident()
+        self.running = True
+        try:
+            with self.shutdown:
+                try:
+                    self.loop.run_until_complete(self.main(duration))
+                finally:
+                    self.running = False
+        finally:
+            self.loop.close()
+
+    async def main(self, duration):
+        # The coordinator's wakeup pipe turns a signal or request() into a loop wakeup
+        self.loop.add_reader(self.shutdown.wakeup_fd, self.stopped.set)
+        self.tasks = [self.loop.create_task(factory()) for factory in self.sources]
+        if duration is not None:
+            self.loop.call_later(duration, self.shutdown.request, 'duration')
+
+        await self.stopped.wait()
+
+        self.loop.remove_reader(self.shutdown.wakeup_fd)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def stop(self, reason='stop'):
+        """Stop run(); callable from any thread, a handler on the loop or before run()"""
+        self.shutdown.request(reason)
+
+    def summary(self):
+        stats = self.stats
+        return (f"{self.name}: {stats['lines']} lines, {stats['reports']} HID reports, "
+                f"{stats['actions']} actions, {stats['restarts']} restarts, {stats['errors']} errors")
+
+# Stand-in source: silent for `idle` seconds, then a burst of timestamped buttonState lines
+EMITTER = (
+    "import sys, time\n"
+    "idle, burst, interval = float(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3])\n"
+    "time.sleep(idle)\n"
+    "for _ in range(burst):\n"
+    "    sys.stdout.write(f'{time.monotonic():.9f} buttonState changed (0->1)\\n')\n"
+    "    sys.stdout.flush()\n"
+    "    if interval:\n"
+    "        time.sleep(interval)\n"
+    "time.sleep(3600)\n"
+)
+
+def context_switches():
+    """Voluntary + involuntary context switches of every thread (Linux), or None"""
+    total = 0
+    try:
+        for task in os.listdir('/proc/self/task'):
+            with open(f'/proc/self/task/{task}/status') as handle:
+                for line in handle:
+                    if 'ctxt_switches' in line:
+                        total += int(line.split()[-1])
+    except OSError:
+        return None
+    return total
+
+class IdleSample:
+    """CPU time, wakeups and threads over a window of the process's life"""
+
+    def begin(self):
+        self.cpu = time.process_time()
+        self.switches = context_switches()
+        self.started = time.monotonic()
+
+    def end(self):
+        seconds = time.monotonic() - self.started
+        self.cpu_percent = (time.process_time() - self.cpu) / seconds * 100
+        switches = context_switches()
+        self.wakeups = None if switches is None else (switches - self.switches) / seconds
+        self.threads = threading.active_count()
+
+def latency_line(latencies):
+    latencies = sorted(latencies)
+    return (f"p50 {latencies[len(latencies) // 2] * 1e6:7.0f}µs  "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:7.0f}µs  max {latencies[-1] * 1e3:6.1f}ms")
+
+def run_threaded(sources, idle, burst, interval):
+    """The current pattern: a readline() thread per source, a timer thread, a sleep(0.1) main loop"""
+    from d01_scheduler import TimerScheduler
+
+    latencies = []
+    state = {'running': True}
+    processes = [subprocess.Popen([sys.executable, '-c', EMITTER, str(idle), str(burst), str(interval)],
+                                  stdout=subprocess.PIPE, text=True) for _ in range(sources)]
+
+    def reader(process):
+        while state['running']:
+            line = process.stdout.readline()
+            if not line:
+                break
+            latencies.append(time.monotonic() - float(line.split(' ', 1)[0]))
+
+    for process in processes:
+        thread = threading.Thread(target=reader, args=(process,))
+        thread.daemon = True
+        thread.start()
+    scheduler = TimerScheduler()
+    scheduler.start()
+
+    sample = IdleSample()
+    started = time.monotonic()
+    while time.monotonic() - started < 0.5:
+        time.sleep(0.1)
+    sample.begin()
+    while time.monotonic() - started < idle - 0.5:
+        time.sleep(0.1)
+    sample.end()
+    deadline = time.monotonic() + 30
+    while len(latencies) < sources * burst and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+    state['running'] = False
+    scheduler.stop()
+    for process in processes:
+        process.terminate()
+        process.wait()
+    return sample, latencies
+
+def run_async(sources, idle, burst, interval):
+    """The same sources on one Runtime"""
+    latencies = []
+    runtime = Runtime('benchmark')
+    sample = IdleSample()
+
+    def on_line(line):
+        latencies.append(time.monotonic() - float(line.split(' ', 1)[0]))
+        if len(latencies) == sources * burst:
+            runtime.stop()
+
+    for index in range(sources):
+        runtime.add_process([sys.executable, '-c', EMITTER, str(idle), str(burst), str(interval)], on_line,
+                            name=f'source-{index}', restart=False)
+    runtime.scheduler.call_later(0.5, sample.begin)
+    runtime.scheduler.call_later(idle - 0.5, sample.end)
+    runtime.run(duration=idle + 30)
+    return sample, latencies
+
+def benchmark(sources=6, idle=3.0, burst=2000, interval=0.001):
+    """Idle cost and burst latency: thread-per-source versus one event loop"""
+    print("⏱️  D01 runtime benchmark")
+    print(f"{sources} sources, {idle - 1:.0f}s idle window, then {burst} lines per source "
+          f"paced {interval * 1e3:g}ms apart, then the same burst unpaced (flood)")
+    results = {}
+    for label, run in (('threads', run_threaded), ('asyncio', run_async)):
+        sample, paced = run(sources, idle, burst, interval)
+        _, flood = run(sources, 1.5, burst, 0)
+        results[label] = (sample, paced, flood)
+        wakeups = f"{sample.wakeups:5.1f}/s" if sample.wakeups is not None else "    -"
+        print(f"{label:<8} idle: {sample.threads:2} threads, CPU {sample.cpu_percent:4.2f}%, wakeups {wakeups}")
+        print(f"         paced: {latency_line(paced)}")
+        print(f"         flood: {latency_line(flood)}")
+
+    threaded, runtime = results['threads'][0], results['asyncio'][0]
+    delivered = all(len(lines) == sources * burst for lines in results['asyncio'][1:])
+    ok = delivered and runtime.threads == 1 and runtime.cpu_percent <= threaded.cpu_percent + 0.05
+    if runtime.wakeups is not None and threaded.wakeups is not None:
+        ok = ok and runtime.wakeups < threaded.wakeups
+    print(f"{'✅' if ok else '❌'} one thread, fewer idle wakeups, every line delivered")
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='D01 asyncio runtime')
+    parser.add_argument('--benchmark', action='store_true', help='compare idle CPU and burst latency with threads')
+    parser.add_argument('--sources', type=int, default=6)
+    parser.add_argument('--burst', type=int, default=2000)
+    parser.add_argument('--interval', type=float, default=0.001, help='seconds between paced burst lines')
+    args = parser.parse_args()
+
+    sys.exit(0 if benchmark(args.sources, burst=args.burst, interval=args.interval) else 1)
+
+if __name__ == "__main__":
+    main()
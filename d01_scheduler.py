@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+D01 Scheduler - Monotonic timer heap for delays, multi-step actions and press timeouts
+Keeps sleeps off the input path; a virtual clock makes timing tests instant
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+class MonotonicClock:
+    """Wall-clock independent time source"""
+
+    def now(self):
+        return time.monotonic()
+
+class VirtualClock:
+    """Manually advanced clock for fast, deterministic tests"""
+
+    def __init__(self, start=0.0):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += seconds
+
+class Timer:
+    """Handle for a scheduled callback"""
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.fired = False
+
+    @property
+    def pending(self):
+        return not (self.cancelled or self.fired)
+
+    def cancel(self):
+        self.cancelled = True
+
+class Sequence:
+    """Steps run in order; numbers between callables are delays in seconds"""
+
+    def __init__(self, scheduler, steps, name=None, on_done=None):
+        self.scheduler = scheduler
+        self.steps = list(steps)
+        self.name = name
+        self.on_done = on_done
+        self.index = 0
+        self.timer = None
+        self.cancelled = False
+        self.finished = False
+
+    @property
+    def pending(self):
+        return not (self.cancelled or self.finished)
+
+    def start(self):
+        self.timer = self.scheduler.call_later(0, self.advance)
+        return self
+
+    def advance(self):
+        """Run callables until the next delay, then reschedule"""
+        while self.index < len(self.steps) and not self.cancelled:
+            step = self.steps[self.index]
+            self.index += 1
+            if callable(step):
+                step()
+            elif step:
+                self.timer = self.scheduler.call_later(step, self.advance)
+                return
+
+        if not self.cancelled:
+            self.finished = True
+            if self.on_done:
+                self.on_done(self)
+
+    def cancel(self):
+        """Drop the remaining steps"""
+        self.cancelled = True
+        if self.timer:
+            self.timer.cancel()
+
+class TimerScheduler:
+    """Heap of timers ordered by deadline, run by a worker thread or manually"""
+
+    def __init__(self, clock=None):
+        self.clock = clock or MonotonicClock()
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.fired = 0
+        self.errors = 0
+
+    def now(self):
+        return self.clock.now()
+
+    def call_at(self, deadline, callback, *args):
+        """Run callback(*args) at a clock deadline"""
+        timer = Timer(deadline, callback, args)
+        with self.condition:
+            heapq.heappush(self.heap, (deadline, next(self.counter), timer))
+            self.condition.notify()
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        """Run callback(*args) after `delay` seconds"""
+        return self.call_at(self.now() + delay, callback, *args)
+
+    def sequence(self, steps, name=None, on_done=None):
+        """Start a multi-step action, e.g. [stop_recording, 0.1, send_enter]"""
+        return Sequence(self, steps, name, on_done).start()
+
+    def next_deadline(self):
+        """Deadline of the earliest live timer, or None"""
+        with self.condition:
+            while self.heap and self.heap[0][2].cancelled:
+                heapq.heappop(self.heap)
+            return self.heap[0][0] if self.heap else None
+
+    def run_pending(self):
+        """Fire every timer that is due; returns how many ran"""
+        ran = 0
+        while True:
+            with self.condition:
+                if not self.heap or self.heap[0][0] > self.clock.now():
+                    return ran
+                _, _, timer = heapq.heappop(self.heap)
+            if timer.cancelled:
+                continue
+
+            timer.fired = True
+            ran += 1
+            self.fired += 1
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error in scheduled action: {e}")
+
+    def advance(self, seconds):
+        """Virtual clock only: move time forward, firing timers at their deadlines"""
+        target = self.clock.now() + seconds
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > target:
+                break
+            if deadline > self.clock.now():
+                self.clock.advance(deadline - self.clock.now())
+            self.run_pending()
+        self.clock.advance(target - self.clock.now())
+
+    def run_until_idle(self, limit=3600):
+        """Virtual clock only: fire everything scheduled (up to `limit` seconds ahead)"""
+        self.advance(0)
+        deadline = self.next_deadline()
+        while deadline is not None and deadline - self.clock.now() <= limit:
+            self.advance(deadline - self.clock.now())
+            deadline = self.next_deadline()
+
+    def start(self):
+        """Run timers on a background thread (real clock)"""
+        if self.thread:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._worker, name='d01-scheduler')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _worker(self):
+        while self.running:
+            self.run_pending()
+            with self.condition:
+                if not self.running:
+                    break
+                timeout = self.heap[0][0] - self.clock.now() if self.heap else None
+                if timeout is None or timeout > 0:
+                    self.condition.wait(timeout)
+
+    def stop(self):
+        """Stop the worker thread; pending timers are dropped"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        self.thread = None
+
+    def pending_count(self):
+        with self.condition:
+            return sum(1 for _, _, timer in self.heap if not timer.cancelled)
+
+def benchmark(timers=10000):
+    """Timer firing accuracy on the real clock"""
+    print("⏱️  D01 scheduler benchmark")
+    scheduler = TimerScheduler()
+    lateness = []
+    done = threading.Event()
+
+    def fire(deadline):
+        lateness.append(scheduler.now() - deadline)
+        if len(lateness) == timers:
+            done.set()
+
+    scheduler.start()
+    started = scheduler.now()
+    for index in range(timers):
+        deadline = started + 0.2 + (index % 500) * 0.002
+        scheduler.call_at(deadline, fire, deadline)
+    done.wait(10)
+    scheduler.stop()
+
+    lateness.sort()
+    print(f"Timers fired: {len(lateness)}/{timers}")
+    print(f"Lateness: p50 {lateness[len(lateness) // 2] * 1e6:.0f}µs, "
+          f"p99 {lateness[int(len(lateness) * 0.99)] * 1e6:.0f}µs, max {lateness[-1] * 1e6:.0f}µs")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+D01 Sequence Miner - Find recurring button and gesture signatures in event streams
+Events become (gap bucket, signature) tokens; frequent n-grams are kept in
+bounded space-saving summaries and ranked into candidate signatures
+"""
+
+import heapq
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+
+from d01_batch_analyzer import iter_records
+from d01_log_ingest import classify_message
+
+# Gap since the previous event -> bucket label; longer idle ends the sequence
+GAP_BUCKETS = ((0.05, '<50ms'), (0.15, '<150ms'), (0.4, '<400ms'), (1.0, '<1s'), (3.0, '<3s'))
+
+# Gaps that can separate the presses of one gesture (e.g. a double tap)
+GESTURE_GAPS = ('<50ms', '<150ms', '<400ms')
+
+IDLE = 'idle'
+
+# Capture records that describe our own output rather than the ring's input
+SKIP_TYPES = ('REMAPPED', 'ACTION', 'FLIGHT_DUMP', 'ERROR', 'PRESS')
+
+def report_signature(data):
+    """Exact bytes for short reports; for long (motion) reports only which bytes are active"""
+    if not any(data):
+        return IDLE
+    if len(data) <= 8:
+        return 'r:' + bytes(data).hex()
+    return f'm{len(data)}:' + ''.join('x' if value else '.' for value in data)
+
+def gap_label(gap):
+    for bound, label in GAP_BUCKETS:
+        if gap < bound:
+            return label
+    return None
+
+def is_rest(event):
+    return event == IDLE or (event.startswith('btn:') and event.endswith('->0'))
+
+def is_activation(event):
+    return not is_rest(event) and not event.startswith('hid:')
+
+class EventTokenizer:
+    """Capture records -> (gap, event) tokens; None marks a sequence break"""
+
+    def __init__(self):
+        self.previous_event = None
+        self.previous_time = None
+
+    def event_for(self, record):
+        if record.get('type') in SKIP_TYPES:
+            return None
+        if 'raw_data' in record:
+            return report_signature(record['raw_data'])
+        for key in ('report', 'hex_string', 'hex'):
+            if isinstance(record.get(key), str):
+                try:
+                    return report_signature(bytes.fromhex(record[key].replace(' ', '')))
+                except ValueError:
+                    return None
+        if 'old_state' in record and 'new_state' in record:
+            return f"btn:{record['old_state']}->{record['new_state']}"
+
+        event = classify_message(record.get('raw_line') or record.get('eventMessage') or '')
+        if not event:
+            return None
+        if event['type'] == 'button_event':
+            return f"btn:{event['old_state']}->{event['new_state']}"
+        return f"hid:{event['handle']}/{event['length']}"
+
+    def tokenize(self, record):
+        """Zero, one or two (break + token) tokens for a record"""
+        event = self.event_for(record)
+        if event is None or event == self.previous_event:
+            return ()  # Held-button repeats and duplicate sightings add nothing
+        self.previous_event = event
+
+        timestamp = record.get('timestamp')
+        if not isinstance(timestamp, (int, float)):
+            return ((None, event),)
+        previous, self.previous_time = self.previous_time, timestamp
+        if previous is None:
+            return ((None, event),)
+        gap = gap_label(timestamp - previous)
+        if gap is None:
+            return (None, (None, event))
+        return ((gap, event),)
+
+class SpaceSaving:
+    """Most frequent items in bounded memory; each count overestimates by at most its error"""
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.heap = []  # (count, item) per item, possibly stale low: fixed up on eviction
+        self.total = 0
+
+    def add(self, item):
+        self.total += 1
+        counts = self.counts
+        count = counts.get(item)
+        if count is not None:
+            counts[item] = count + 1
+            return
+        minimum = 0
+        if len(counts) >= self.capacity:
+            victim, minimum = self.pop_minimum()
+            del counts[victim]
+            del self.errors[victim]
+        counts[item] = minimum + 1
+        self.errors[item] = minimum
+        heapq.heappush(self.heap, (minimum + 1, item))
+
+    def pop_minimum(self):
+        heap = self.heap
+        counts = self.counts
+        while True:
+            count, item = heapq.heappop(heap)
+            current = counts[item]
+            if current == count:
+                return item, count
+            heapq.heappush(heap, (current, item))
+
+    def items(self):
+        """(item, count, error) tuples, most frequent first"""
+        return sorted(((item, count, self.errors[item]) for item, count in self.counts.items()),
+                      key=lambda entry: entry[1], reverse=True)
+
+class SequenceMiner:
+    """Frequent n-grams (2..max_n events) over a token stream"""
+
+    def __init__(self, max_n=4, capacity=4096):
+        self.max_n = max_n
+        self.tokenizer = EventTokenizer()
+        self.window = deque(maxlen=max_n)
+        self.summaries = [SpaceSaving(capacity) for _ in range(max_n + 1)]
+        self.stats = {'records': 0, 'tokens': 0, 'breaks': 0}
+
+    def add_record(self, record):
+        self.stats['records'] += 1
+        for token in self.tokenizer.tokenize(record):
+            self.add_token(token)
+
+    def add_token(self, token):
+        if token is None:
+            self.window.clear()
+            self.stats['breaks'] += 1
+            return
+        self.stats['tokens'] += 1
+        window = self.window
+        window.append(token)
+        tokens = tuple(window)
+        for n in range(2, len(tokens) + 1):
+            # The first event's gap belongs to whatever came before the n-gram
+            self.summaries[n].add(((None, tokens[-n][1]),) + tokens[-n + 1:])
+
+    def candidates(self, min_count=3, top=10):
+        """Activation...rest n-grams, ranked by the count left after longer signatures claim theirs"""
+        found = []
+        for n in range(2, self.max_n + 1):
+            for ngram, count, error in self.summaries[n].items():
+                if count - error < min_count:
+                    break
+                events = [event for _, event in ngram]
+                if not is_activation(events[0]) or not is_rest(events[-1]):
+                    continue
+                # Presses further apart than a gesture allows are separate actions
+                if any(is_activation(event) and gap not in GESTURE_GAPS for gap, event in ngram[1:]):
+                    continue
+                activations = [event for event in events if is_activation(event)]
+                kind = 'button' if len(activations) == 1 else 'gesture'
+                found.append({'kind': kind, 'ngram': ngram, 'count': count, 'error': error})
+
+        # Longest first: a double tap's presses are not also two single presses
+        found.sort(key=lambda candidate: len(candidate['ngram']), reverse=True)
+        kept = []
+        for candidate in found:
+            claimed = sum(occurrences(other['ngram'], candidate['ngram']) * other['count'] for other in kept)
+            if candidate['count'] - claimed >= min_count:
+                candidate['count'] -= claimed
+                candidate['description'] = describe(candidate['ngram'])
+                kept.append(candidate)
+        kept.sort(key=lambda candidate: candidate['count'], reverse=True)
+        return kept[:top]
+
+def occurrences(longer, shorter):
+    """How often `shorter` (first gap ignored) occurs contiguously in `longer`"""
+    found = 0
+    for start in range(len(longer) - len(shorter) + 1):
+        if longer[start][1] == shorter[0][1] and all(
+                longer[start + offset] == shorter[offset] for offset in range(1, len(shorter))):
+            found += 1
+    return found
+
+def describe(ngram):
+    parts = [ngram[0][1]]
+    for gap, event in ngram[1:]:
+        parts.append(f"─{gap}→ {event}")
+    return ' '.join(parts)
+
+def print_candidates(candidates, miner=None):
+    """Candidate signatures, as the scanners print them"""
+    if miner:
+        print(f"\n🧩 Candidate signatures ({miner.stats['records']} records, {miner.stats['tokens']} events):")
+    if not candidates:
+        print("  None yet - repeat each button or gesture a few times")
+    for candidate in candidates:
+        bound = f" (≥{candidate['count'] - candidate['error']})" if candidate['error'] else ''
+        icon = '🔘' if candidate['kind'] == 'button' else '👆'
+        print(f"  {icon} {candidate['kind']:<7} ×{candidate['count']}{bound}  {candidate['description']}")
+
+def mine_files(paths, max_n=4, capacity=4096):
+    """One miner per capture file, merged into one candidate ranking"""
+    miner = SequenceMiner(max_n, capacity)
+    for path in paths:
+        miner.tokenizer = EventTokenizer()
+        miner.window.clear()
+        for record in iter_records(path):
+            if isinstance(record, dict):
+                miner.add_record(record)
+    return miner
+
+# Planted signatures for replays: name -> [(report byte 1 or None for idle, seconds held/idle)]
+PLANTED = {
+    'bottom short': [(0x01, 0.2), (None, 0)],
+    'top long': [(0x02, 0.7), (None, 0)],
+    'bottom double tap': [(0x01, 0.08), (None, 0.1), (0x01, 0.08), (None, 0)],
+}
+
+def synthetic_capture(path, sessions=20000, seed=5):
+    """Capture file of planted presses in random order with unknown one-off reports as noise"""
+    rng = random.Random(seed)
+    now = 1700000000.0
+    records = 0
+    with open(path, 'w') as handle:
+        def write(code):
+            nonlocal records
+            data = [0x01, code, 0, 0, 0, 0, 0, 0] if code is not None else [0] * 8
+            handle.write(json.dumps({'timestamp': round(now, 4), 'raw_data': data,
+                                     'hex': bytes(data).hex().upper()}) + '\n')
+            records += 1
+
+        for _ in range(sessions):
+            if rng.random() < 0.15:
+                steps = [(rng.randrange(8, 256), rng.uniform(0.05, 0.5)), (None, 0)]
+            else:
+                steps = PLANTED[rng.choice(sorted(PLANTED))]
+            for code, duration in steps:
+                # Held buttons repeat their report every ~10 ms
+                for _ in range(max(1, int(duration / 0.01)) if code is not None else 1):
+                    write(code)
+                    now += 0.01
+                now += max(0.0, duration - 0.01 * max(1, int(duration / 0.01))) if code is not None else duration
+            now += rng.uniform(0.4, 2.5)
+    return records
+
+def benchmark(sessions=20000):
+    """Replay a synthetic capture: throughput, and whether the planted signatures come out on top"""
+    print("⏱️  D01 sequence miner benchmark")
+    directory = tempfile.mkdtemp(prefix='d01-miner-')
+    try:
+        path = os.path.join(directory, 'd01_capture_synthetic.jsonl')
+        records = synthetic_capture(path, sessions)
+
+        started = time.perf_counter()
+        parsed = [record for record in iter_records(path)]
+        parsing = time.perf_counter() - started
+
+        miner = SequenceMiner()
+        started = time.perf_counter()
+        for record in parsed:
+            miner.add_record(record)
+        mining = time.perf_counter() - started
+        print(f"{records:,} records: parse {records / parsing:,.0f}/s, tokenize+mine {records / mining:,.0f}/s "
+              f"({miner.stats['tokens']:,} events)")
+
+        candidates = miner.candidates(top=5)
+        print_candidates(candidates)
+        expected = {
+            'bottom short': ('r:0101000000000000', '<400ms', IDLE),
+            'top long': ('r:0102000000000000', '<1s', IDLE),
+            'bottom double tap': ('r:0101000000000000', '<150ms', IDLE, '<150ms', 'r:0101000000000000',
+                                  '<150ms', IDLE),
+        }
+        ok = True
+        for name, flat in expected.items():
+            ngram = ((None, flat[0]),) + tuple(zip(flat[1::2], flat[2::2]))
+            found = any(candidate['ngram'] == ngram for candidate in candidates[:3])
+            ok = ok and found
+            print(f"{'✅' if found else '❌'} {name} in the top 3")
+
+        # Bounded memory: a tiny summary still finds the heavy hitters
+        small = SequenceMiner(capacity=64)
+        for record in parsed:
+            small.add_record(record)
+        top = {candidate['description'] for candidate in small.candidates(top=3)}
+        same = top == {candidate['description'] for candidate in candidates[:3]}
+        ok = ok and same
+        print(f"{'✅' if same else '❌'} capacity 64 per n finds the same top 3")
+    finally:
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Mine D01 captures for button and gesture signatures')
+    parser.add_argument('captures', nargs='*', help='capture files (.json, .jsonl, .ndjson, .log)')
+    parser.add_argument('--max-n', type=int, default=4, help='longest sequence in events')
+    parser.add_argument('--capacity', type=int, default=4096, help='n-grams tracked per length')
+    parser.add_argument('--min-count', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--benchmark', action='store_true', help='replay a synthetic capture')
+    args = parser.parse_args()
+
+    if args.benchmark or not args.captures:
+        sys.exit(0 if benchmark() else 1)
+
+    miner = mine_files(args.captures, args.max_n, args.capacity)
+    print_candidates(miner.candidates(args.min_count, args.top), miner)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+D01 Shutdown - Stop every source in milliseconds and never lose captured data
+A signal sets an Event and writes a wakeup fd; cleanup then runs in fixed phases:
+stop sources, reap children, join threads, flush journals/captures, print stats
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from d01_journal import JournalWriter, read_journal
+
+PHASES = ('stop', 'reap', 'join', 'flush', 'stats')
+
+class ShutdownCoordinator:
+    """One shutdown path for a tool: signals, errors and normal exit all end up in shutdown()
+
+    Use as a context manager around the main loop: the body waits with wait(),
+    and leaving the block (Ctrl+C, SIGTERM, an exception or a return) runs every
+    registered step once, each guarded so one failure cannot skip a flush.
+    """
+
+    def __init__(self, name, signals=(signal.SIGINT, signal.SIGTERM), grace=2.0):
+        self.name = name
+        self.signals = signals
+        self.grace = grace  # Seconds a child gets after SIGTERM before SIGKILL
+
+        self.event = threading.Event()
+        # Never drained: readable from the first request on, for select()-based loops
+        self.wakeup_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.write_fd, False)
+
+        self.steps = {phase: [] for phase in PHASES}
+        self.processes = []
+        self.threads = []
+        self.previous = {}
+        self.reason = None
+        self.requested_at = None
+        self.lock = threading.Lock()
+        self.done = False
+        self.timings = {}
+        self.stats = {'reaped': 0, 'killed': 0, 'stragglers': 0, 'errors': 0}
+
+    def install(self):
+        """Handle the signals (main thread only); a second one forces the exit"""
+        if threading.current_thread() is not threading.main_thread():
+            return  # Signals only reach the main thread: request() stops this one
+        for signum in self.signals:
+            self.previous[signum] = signal.signal(signum, self.handle_signal)
+
+    def uninstall(self):
+        for signum, handler in self.previous.items():
+            signal.signal(signum, handler)
+        self.previous = {}
+
+    def handle_signal(self, signum, frame):
+        if self.event.is_set():
+            os.write(2, f"\n⚠️  {self.name}: second {signal.Signals(signum).name}, exiting now\n".encode())
+            os._exit(128 + signum)
+        self.request(signal.Signals(signum).name)
+
+    def request(self, reason='request'):
+        """Ask everything to stop; safe from signal handlers, threads and callbacks"""
+        if self.event.is_set():
+            return
+        self.reason = reason
+        self.requested_at = time.monotonic()
+        self.event.set()
+        try:
+            os.write(self.write_fd, b'!')
+        except OSError:
+            pass
+
+    @property
+    def requested(self):
+        return self.event.is_set()
+
+    def running(self):
+        """Loop condition, e.g. supervisor.run_until(shutdown.running)"""
+        return not self.event.is_set()
+
+    def wait(self, timeout=None):
+        """Block until shutdown is requested (True) or the timeout passes (False)"""
+        return self.event.wait(timeout)
+
+    def add_step(self, phase, callback, name=None):
+        self.steps[phase].append((name or getattr(callback, '__name__', 'step'), callback))
+        return callback
+
+    def on_stop(self, callback, name=None):
+        """Stop producing: set flags, stop supervisors/pollers/servers"""
+        return self.add_step('stop', callback, name)
+
+    def on_flush(self, callback, name=None):
+        """Persist: close journals, save capture buffers and calibration"""
+        return self.add_step('flush', callback, name)
+
+    def on_stats(self, callback, name=None):
+        """Report: summaries and analysis, after everything is safely written"""
+        return self.add_step('stats', callback, name)
+
+    def add_process(self, process):
+        """A child to terminate (then kill) and reap; its pipe readers see EOF"""
+        self.processes.append(process)
+        return process
+
+    def discard_process(self, process):
+        """Forget a child that exited and was reaped by its owner (e.g. before a restart)"""
+        if process in self.processes:
+            self.processes.remove(process)
+
+    def add_thread(self, thread):
+        """A thread to join once its sources are gone"""
+        self.threads.append(thread)
+        return thread
+
+    def reap(self):
+        live = [process for process in self.processes if process.poll() is None]
+        for process in live:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+        deadline = time.monotonic() + self.grace
+        for process in live:
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                self.stats['killed'] += 1
+            self.stats['reaped'] += 1
+
+    def join(self):
+        deadline = time.monotonic() + self.grace
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(max(0.0, deadline - time.monotonic()))
+                if thread.is_alive():
+                    self.stats['stragglers'] += 1
+
+    def shutdown(self, reason='exit'):
+        """Run every phase once (later calls return immediately); returns phase timings"""
+        with self.lock:
+            if self.done:
+                return self.timings
+            self.done = True
+        self.request(reason)
+
+        for phase in PHASES:
+            started = time.monotonic()
+            if phase == 'reap':
+                self.run_step(phase, 'children', self.reap)
+            elif phase == 'join':
+                self.run_step(phase, 'threads', self.join)
+            for name, callback in self.steps[phase]:
+                self.run_step(phase, name, callback)
+            self.timings[phase] = time.monotonic() - started
+
+        self.uninstall()
+        total = time.monotonic() - self.requested_at
+        self.timings['total'] = total
+        phases = ', '.join(f"{phase} {self.timings[phase] * 1000:.0f}ms" for phase in PHASES)
+        extra = f", {self.stats['reaped']} children reaped" if self.stats['reaped'] else ""
+        if self.stats['killed']:
+            extra += f" ({self.stats['killed']} killed)"
+        if self.stats['stragglers']:
+            extra += f", {self.stats['stragglers']} threads still running"
+        print(f"🧹 {self.name} shut down ({self.reason}) in {total * 1000:.0f}ms: {phases}{extra}")
+        return self.timings
+
+    def run_step(self, phase, name, callback):
+        try:
+            callback()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Error during shutdown ({phase}: {name}): {e}")
+
+    def close(self):
+        for fd in (self.wakeup_fd, self.write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            reason = self.reason or 'exit'
+        elif issubclass(exc_type, KeyboardInterrupt):
+            reason = 'SIGINT'
+        else:
+            reason = f"{exc_type.__name__}: {exc}"
+        self.shutdown(reason)
+        self.close()
+        # Ctrl+C that arrived before install() is a normal stop; real errors still propagate
+        return exc_type is not None and issubclass(exc_type, KeyboardInterrupt)
+
+# Stand-in source for the latency test: one line every 10ms, forever
+EMITTER = (
+    "import os, sys, time\n"
+    "try:\n"
+    "    while True:\n"
+    "        sys.stdout.write(f'{time.time():.6f} buttonState changed (0->1)\\n')\n"
+    "        sys.stdout.flush()\n"
+    "        time.sleep(0.01)\n"
+    "except (BrokenPipeError, KeyboardInterrupt):\n"
+    "    os._exit(0)\n"
+)
+
+def run_child(pattern, sources, journal_path):
+    """A capture tool with `sources` log readers, shut down by whatever signal arrives"""
+    journal = JournalWriter(journal_path, flush_interval=5.0)  # Only close() writes
+    captured = [0]
+    running = [True]
+    processes = [subprocess.Popen([sys.executable, '-c', EMITTER], stdout=subprocess.PIPE, text=True)
+                 for _ in range(sources)]
+
+    def reader(process):
+        while running[0]:
+            line = process.stdout.readline()
+            if not line:
+                break
+            captured[0] += 1
+            journal.write({'timestamp': time.time(), 'type': 'LINE', 'raw_line': line.strip()})
+
+    threads = [threading.Thread(target=reader, args=(process,), daemon=True) for process in processes]
+    for thread in threads:
+        thread.start()
+
+    def report():
+        print(json.dumps({'captured': captured[0], 'written': journal.stats['written']}), flush=True)
+
+    print('READY ' + ' '.join(str(process.pid) for process in processes), flush=True)
+
+    if pattern == 'polling':
+        # The loop this repo's tools used: sleep-poll a flag, join with a timeout, no terminate
+        try:
+            while running[0]:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            running[0] = False
+        for thread in threads:
+            thread.join(timeout=1)
+        journal.close()
+        report()
+        return
+
+    with ShutdownCoordinator('latency test') as shutdown:
+        shutdown.on_stop(lambda: running.__setitem__(0, False), 'readers')
+        for process in processes:
+            shutdown.add_process(process)
+        for thread in threads:
+            shutdown.add_thread(thread)
+        shutdown.on_flush(journal.close, 'journal')
+        shutdown.on_stats(report, 'report')
+        shutdown.wait()
+
+def measure(pattern, signum, sources):
+    """Signal → exit latency, children left running, captured records lost"""
+    handle, journal_path = tempfile.mkstemp(prefix='d01-shutdown-', suffix='.log')
+    os.close(handle)
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', pattern,
+                              '--sources', str(sources), '--journal', journal_path],
+                             stdout=subprocess.PIPE, text=True)
+    pids = [int(pid) for pid in child.stdout.readline().split()[1:]]
+    time.sleep(0.5)  # Let the readers capture something
+
+    started = time.perf_counter()
+    child.send_signal(signum)
+    output = child.stdout.read()
+    child.wait()
+    latency = time.perf_counter() - started
+
+    orphans = []
+    for pid in pids:
+        try:
+            os.kill(pid, 0)
+            orphans.append(pid)
+        except ProcessLookupError:
+            pass
+    for pid in orphans:
+        os.kill(pid, signal.SIGKILL)
+
+    report = {}
+    for line in output.splitlines():
+        if line.startswith('{'):
+            report = json.loads(line)
+    on_disk = sum(1 for _ in read_journal(journal_path))
+    os.unlink(journal_path)
+    return latency, orphans, report.get('captured'), on_disk
+
+def benchmark(sources=4, rounds=3):
+    """Shutdown latency and data safety: coordinator versus the sleep-poll loop"""
+    print("⏱️  D01 shutdown benchmark")
+    print(f"{sources} log-reading sources, signal sent after 0.5s of capture, {rounds} rounds each")
+    ok = True
+    for pattern, signum in (('coordinator', signal.SIGINT), ('coordinator', signal.SIGTERM),
+                            ('polling', signal.SIGINT), ('polling', signal.SIGTERM)):
+        latencies, orphaned, lost = [], 0, 0
+        for _ in range(rounds):
+            latency, orphans, captured, on_disk = measure(pattern, signum, sources)
+            latencies.append(latency)
+            orphaned += len(orphans)
+            # No report means the tool died before it could flush anything
+            lost += (captured - on_disk) if captured is not None else 1
+        latencies.sort()
+        passed = pattern != 'coordinator' or (orphaned == 0 and lost == 0 and latencies[-1] < 0.25)
+        ok = ok and passed
+        marker = ('✅' if passed else '❌') if pattern == 'coordinator' else '  '
+        print(f"{marker} {pattern:<11} {signal.Signals(signum).name:<7} exit in "
+              f"{latencies[len(latencies) // 2] * 1000:6.0f}ms (max {latencies[-1] * 1000:.0f}ms), "
+              f"{orphaned} children left running, "
+              f"{'records lost' if lost else 'every record flushed'}")
+    return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='D01 shutdown coordinator')
+    parser.add_argument('--benchmark', action='store_true', help='measure signal-to-exit latency')
+    parser.add_argument('--sources', type=int, default=4)
+    parser.add_argument('--child', choices=('coordinator', 'polling'), help=argparse.SUPPRESS)
+    parser.add_argument('--journal', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.sources, args.journal)
+        return
+    sys.exit(0 if benchmark(args.sources) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+D01 Snapshots - Structured ioreg/hidutil snapshots with semantic diffs
+Parses command output once into a keyed device tree, skips unchanged
+snapshots by hash, ignores volatile properties and backs off while idle
+"""
+
+import hashlib
+import re
+import subprocess
+import threading
+import time
+
+# Properties that change on every poll without meaning anything to us
+VOLATILE_PROPERTIES = {
+    'IOGeneralInterest', 'IOPowerManagement', 'IOReportLegend', 'IOReportLegendPublic',
+    'IOUserClientCreator', 'IOCFPlugInTypes', 'DebugState', 'HIDEventServiceProperties'
+}
+VOLATILE_SUFFIXES = ('Time', 'Timestamp', 'Count', 'Counter')
+
+NODE_RE = re.compile(r'\+-o (.+?)\s+<class ([^,>]+)(?:, id (0x[0-9a-fA-F]+))?')
+PROPERTY_RE = re.compile(r'"([^"]+)" = (.*)$')
+
+def is_volatile(name, volatile=VOLATILE_PROPERTIES):
+    """True for properties excluded from change detection"""
+    return name in volatile or name.endswith(VOLATILE_SUFFIXES)
+
+def parse_ioreg(text, volatile=VOLATILE_PROPERTIES):
+    """Parse `ioreg -r` output into {node_path: {property: value}}"""
+    tree = {}
+    stack = []  # (depth, path)
+    current = None
+
+    for line in text.splitlines():
+        node_match = NODE_RE.search(line)
+        if node_match:
+            depth = line.index('+-o')
+            while stack and stack[-1][0] >= depth:
+                stack.pop()
+
+            name, class_name, entry_id = node_match.groups()
+            label = f"{name}[{entry_id}]" if entry_id else name
+            path = f"{stack[-1][1]}/{label}" if stack else label
+            stack.append((depth, path))
+
+            current = tree[path] = {'class': class_name}
+            continue
+
+        if current is None:
+            continue
+        property_match = PROPERTY_RE.search(line)
+        if property_match:
+            name, value = property_match.groups()
+            if not is_volatile(name, volatile):
+                current[name] = value.strip()
+
+    return tree
+
+def parse_hidutil(text, volatile=VOLATILE_PROPERTIES):
+    """Parse `hidutil list` tables into {section/RegistryID: {column: value}}"""
+    tree = {}
+    section = 'Devices'
+    columns = None
+
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if line.rstrip().endswith(':') and ' ' not in line.strip():
+            section = line.strip()[:-1]
+            columns = None
+            continue
+
+        if columns is None:
+            # Header row: remember where each column starts
+            columns = [(match.group(0), match.start()) for match in re.finditer(r'\S+', line)]
+            continue
+
+        # Each word belongs to the last column starting at or before it, so
+        # values wider than their header do not bleed into the next column
+        values = {}
+        column = 0
+        for match in re.finditer(r'\S+', line):
+            while column + 1 < len(columns) and columns[column + 1][1] <= match.start():
+                column += 1
+            values.setdefault(columns[column][0], []).append(match.group(0))
+
+        row = {name: ' '.join(words) for name, words in values.items()
+               if not is_volatile(name, volatile)}
+
+        key = row.get('RegistryID') or ':'.join(
+            row.get(column, '') for column in ('VendorID', 'ProductID', 'LocationID', 'UsagePage', 'Usage'))
+        tree[f"{section}/{key}"] = row
+
+    return tree
+
+def diff_trees(old, new):
+    """Semantic change events between two parsed trees"""
+    events = []
+
+    for path in new.keys() - old.keys():
+        events.append({'type': 'node_added', 'node': path, 'properties': new[path]})
+    for path in old.keys() - new.keys():
+        events.append({'type': 'node_removed', 'node': path, 'properties': old[path]})
+
+    for path in new.keys() & old.keys():
+        old_props = old[path]
+        new_props = new[path]
+        if old_props == new_props:
+            continue
+        for name in new_props.keys() | old_props.keys():
+            before = old_props.get(name)
+            after = new_props.get(name)
+            if before != after:
+                events.append({
+                    'type': 'property_changed', 'node': path,
+                    'property': name, 'old': before, 'new': after
+                })
+
+    events.sort(key=lambda event: (event['node'], event.get('property', '')))
+    return events
+
+def describe_node(path, properties):
+    """Short human label for a node"""
+    product = properties.get('Product') or properties.get('"Product"')
+    if product:
+        return product.strip('"')
+    return path.rsplit('/', 1)[-1]
+
+def format_event(event):
+    """One printable line per change event"""
+    label = describe_node(event['node'], event.get('properties', {}))
+    if event['type'] == 'node_added':
+        return f"  + {label} ({event['node']})"
+    if event['type'] == 'node_removed':
+        return f"  - {label} ({event['node']})"
+    return f"  ~ {event['node']}: {event['property']} {event['old']} → {event['new']}"
+
+class SnapshotSource:
+    """A command whose output is parsed into a device tree"""
+
+    def __init__(self, name, command, parser, run_command=None):
+        self.name = name
+        self.command = command
+        self.parser = parser
+        self.run_command = run_command or self.default_run
+
+    def default_run(self, command):
+        result = subprocess.run(command, capture_output=True, text=True)
+        return result.stdout
+
+    def read(self):
+        return self.run_command(self.command)
+
+def ioreg_source(class_name='IOBluetoothHIDDriver', run_command=None):
+    """Snapshot source for `ioreg -n <class> -r`"""
+    return SnapshotSource('ioreg', ['ioreg', '-n', class_name, '-r'], parse_ioreg, run_command)
+
+def hidutil_source(run_command=None):
+    """Snapshot source for `hidutil list`"""
+    return SnapshotSource('hidutil', ['hidutil', 'list'], parse_hidutil, run_command)
+
+class SnapshotPoller:
+    """Poll a source, emit change events and back off while nothing changes"""
+
+    def __init__(self, source, callback, min_interval=0.5, max_interval=8.0, backoff=2.0):
+        self.source = source
+        self.callback = callback
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+
+        self.last_hash = None
+        self.tree = None
+        self.stop_event = threading.Event()
+        self.stats = {'polls': 0, 'unchanged_output': 0, 'unchanged_tree': 0, 'events': 0}
+
+    def poll(self):
+        """Take one snapshot; returns the change events (first poll only sets the baseline)"""
+        self.stats['polls'] += 1
+        output = self.source.read()
+
+        digest = hashlib.sha1(output.encode('utf-8', 'replace')).digest()
+        if digest == self.last_hash:
+            self.stats['unchanged_output'] += 1
+            return []
+        self.last_hash = digest
+
+        tree = self.source.parser(output)
+        if self.tree is None:
+            self.tree = tree
+            return []
+        if tree == self.tree:
+            # Only volatile properties moved
+            self.stats['unchanged_tree'] += 1
+            return []
+
+        events = diff_trees(self.tree, tree)
+        self.tree = tree
+        self.stats['events'] += len(events)
+        return events
+
+    def poke(self):
+        """Return to the fastest poll rate (e.g. after activity elsewhere)"""
+        self.interval = self.min_interval
+
+    def run(self, should_continue=lambda: True):
+        """Poll until stopped, sleeping longer after every quiet poll"""
+        while should_continue() and not self.stop_event.is_set():
+            try:
+                events = self.poll()
+            except Exception as e:
+                print(f"Error reading {self.source.name} snapshot: {e}")
+                events = []
+
+            if events:
+                self.interval = self.min_interval
+                self.callback(self.source.name, events)
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+def print_events(source_name, events):
+    """Default callback: print events grouped by source"""
+    print(f"🔄 {source_name} change detected ({len(events)} events):")
+    for event in events:
+        print(format_event(event))
+    print("-" * 60)
+
+# Canned command output used by the --demo replay
+SAMPLE_IOREG = """+-o IOBluetoothHIDDriver  <class IOBluetoothHIDDriver, id 0x100000a1f, registered, matched, active, busy 0 (0 ms), retain 9>
+  | {
+  |   "IOClass" = "IOBluetoothHIDDriver"
+  |   "Product" = "D01 Pro"
+  |   "VendorID" = 1452
+  |   "ProductID" = 556
+  |   "BatteryPercent" = 80
+  |   "LastInputReportTime" = 1000
+  | }
+  |
+  +-o IOHIDInterface  <class IOHIDInterface, id 0x100000a25, registered, matched, active, busy 0 (0 ms), retain 7>
+      {
+        "ReportInterval" = 11250
+        "MaxInputReportSize" = 30
+      }
+"""
+
+SAMPLE_HIDUTIL = """Services:
+VendorID ProductID LocationID UsagePage Usage RegistryID  Transport Class                    Product
+0x5ac    0x22c     0x0        1         6     0x100000a2b Bluetooth AppleUserHIDEventService D01 Pro
+0x5ac    0x281     0x0        1         6     0x100000544 SPI       AppleUserHIDEventService Apple Internal Keyboard
+"""
+
+def demo_outputs():
+    """Canned snapshot sequences: volatile-only change, property change, device removal"""
+    ioreg = [
+        SAMPLE_IOREG,
+        SAMPLE_IOREG,
+        SAMPLE_IOREG.replace('busy 0 (0 ms), retain 9', 'busy 0 (0 ms), retain 11')
+                    .replace('"LastInputReportTime" = 1000', '"LastInputReportTime" = 2000'),
+        SAMPLE_IOREG.replace('"BatteryPercent" = 80', '"BatteryPercent" = 75'),
+        ''
+    ]
+    hidutil = [
+        SAMPLE_HIDUTIL,
+        SAMPLE_HIDUTIL,
+        SAMPLE_HIDUTIL.replace('0x100000a2b Bluetooth', '0x100000a2b BluetoothLE'),
+        '\n'.join(line for line in SAMPLE_HIDUTIL.splitlines() if 'D01' not in line),
+        SAMPLE_HIDUTIL
+    ]
+    return {'ioreg': ioreg, 'hidutil': hidutil}
+
+def run_demo():
+    """Replay canned outputs and check the emitted events"""
+    print("🧪 D01 snapshot differ replay (canned command output)")
+    expected = {
+        'ioreg': [0, 0, 0, 1, 2],   # volatile-only change yields nothing; removal drops both nodes
+        'hidutil': [0, 0, 1, 1, 1]
+    }
+    ok = True
+
+    for name, outputs in demo_outputs().items():
+        replay = iter(outputs)
+        factory = ioreg_source if name == 'ioreg' else hidutil_source
+        poller = SnapshotPoller(factory(run_command=lambda command: next(replay)), print_events)
+
+        counts = []
+        for _ in outputs:
+            events = poller.poll()
+            counts.append(len(events))
+            if events:
+                print_events(name, events)
+
+        matched = counts == expected[name]
+        ok = ok and matched
+        print(f"{'✅' if matched else '❌'} {name}: events per poll {counts} "
+              f"(expected {expected[name]}), stats {poller.stats}")
+
+    return ok
+
+def main():
+    import sys
+
+    if '--demo' in sys.argv:
+        sys.exit(0 if run_demo() else 1)
+
+    sources = [ioreg_source(), hidutil_source()]
+    pollers = [SnapshotPoller(source, print_events) for source in sources]
+    threads = [threading.Thread(target=poller.run, daemon=True) for poller in pollers]
+
+    print("🔍 Watching ioreg/hidutil snapshots (Ctrl+C to stop)")
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        for poller in pollers:
+            poller.stop()
+            print(f"{poller.source.name}: {poller.stats}")
+
+if __name__ == "__main__":
+    main()